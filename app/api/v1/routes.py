@@ -19,6 +19,8 @@ from app.services.Adult.sentence_builder.sentence_builder_route import router as
 from app.services.Adult.phrase_maker.phrase_maker_route import router as phrase_maker_router
 from app.services.Adult.auditory_discrimination.auditory_discrimination_route import router as auditory_discrimination_router
 from app.services.Adult.phenome_mapping.phenome_mapping_route import router as phenome_mapping_router
+from app.api.v1.system_route import router as system_router
+from app.api.v1.tts_route import router as tts_router
 
 api_router = APIRouter()
 
@@ -44,4 +46,8 @@ api_router.include_router(word_parts_workshop_router, prefix="/adult/word-parts-
 api_router.include_router(sentence_builder_router, prefix="/adult/sentence-builder", tags=["adult"])
 api_router.include_router(phrase_maker_router, prefix="/adult/phrase-maker", tags=["adult"])
 api_router.include_router(auditory_discrimination_router, prefix="/adult/auditory-discrimination", tags=["adult"])
-api_router.include_router(phenome_mapping_router, prefix="/adult/phenome-mapping", tags=["adult"])
\ No newline at end of file
+api_router.include_router(phenome_mapping_router, prefix="/adult/phenome-mapping", tags=["adult"])
+
+api_router.include_router(tts_router, prefix="/tts", tags=["speech"])
+
+api_router.include_router(system_router, prefix="/system", tags=["system"])
\ No newline at end of file
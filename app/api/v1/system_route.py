@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir
+from app.utils.audio_store import audio_store
+from app.utils.pipeline import pipeline_metrics
+from app.utils.phonetic_scoring import scoring_metrics
+from app.utils.score_cache import score_cache
+from app.utils.openai_client import upstream_stats
+from app.utils.micro_batcher import batching_stats
+from app.utils.history_store import history_store
+from app.utils.dedup_filter import dedup_filter
+from app.utils.near_duplicate import near_duplicate_stats
+from app.utils.image_jobs import image_jobs
+from app.utils.image_store import image_files
+from app.utils.tts_scheduler import tts_scheduler
+
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
+
+@router.get("/reservoir")
+async def get_reservoir_stats():
+    return exercise_reservoir.stats()
+
+@router.get("/audio-store")
+async def get_audio_store_stats():
+    return audio_store.stats()
+
+@router.get("/pipelines")
+async def get_pipeline_stats():
+    return pipeline_metrics.stats()
+
+@router.get("/scoring")
+async def get_scoring_stats():
+    return scoring_metrics
+
+@router.get("/score-cache")
+async def get_score_cache_stats():
+    return score_cache.stats()
+
+@router.get("/upstream")
+async def get_upstream_stats():
+    return upstream_stats()
+
+@router.get("/batching")
+async def get_batching_stats():
+    return batching_stats()
+
+@router.get("/history")
+async def get_history_stats():
+    return history_store.stats()
+
+@router.get("/dedup")
+async def get_dedup_stats():
+    return dedup_filter.stats()
+
+@router.get("/near-duplicates")
+async def get_near_duplicate_stats():
+    return near_duplicate_stats()
+
+@router.get("/image-jobs")
+async def get_image_job_stats():
+    return image_jobs.stats()
+
+@router.get("/image-store")
+async def get_image_store_stats():
+    return image_files.stats()
+
+@router.get("/tts")
+async def get_tts_stats():
+    return tts_scheduler.stats()
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.utils.verify_auth import verify_auth_token
+from app.utils.text_to_speech import stream_text_to_speech
+
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
+
+@router.get("/stream")
+async def stream_speech(
+    text: str = Query(..., min_length=1, max_length=4096, description="Text to speak, e.g. a listen-speak sentence or a comprehension passage"),
+    voice: str = Query("alloy", pattern="^(alloy|echo|fable|onyx|nova|shimmer)$"),
+    cache: bool = Query(True, description="Keep the clip in the audio cache once it has been streamed in full"),
+):
+    """Audio starts playing as soon as the first chunk is synthesized"""
+    try:
+        return await stream_text_to_speech(text, voice, cache)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error converting text to speech: {str(e)}")
@@ -1,74 +1,89 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
 from app.services.Adult.auditory_discrimination.auditory_discrimination_schema import AuditoryDiscriminationResponse
 from app.utils.text_to_speech import generate_parallel_audio_files
+from app.utils.audio_sprite import build_audio_sprite
+from app.utils.dedup_filter import dedup_filter, dedup_key
 import json
 import re
+from typing import List, Optional
 
 
 class AuditoryDiscrimination:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.word_cache = []  # Store last 5 word pairs
-        
-    async def get_auditory_discrimination(self) -> AuditoryDiscriminationResponse:
-        prompt = self.create_prompt()
-        response = self.get_openai_response(prompt)
-        
-        print(f"Raw OpenAI response: {response}")
+        self.client = get_openai_client(api_key)
         
+    async def get_auditory_discrimination(self, exclude: Optional[List[str]] = None, sprite: bool = False,
+                                          user_id: Optional[str] = None) -> AuditoryDiscriminationResponse:
         try:
-            # Simple JSON cleaning
-            cleaned = response.strip()
-            if cleaned.startswith('```json'):
-                cleaned = cleaned[7:]
-            if cleaned.endswith('```'):
-                cleaned = cleaned[:-3]
-            cleaned = cleaned.strip()
-            
-            parsed_response = json.loads(cleaned)
-            word_pairs_raw = parsed_response.get('word_pairs', [])
-            
-            # Extract word pairs and answers for flat format
-            word_pairs = []
-            answers = []
-            
-            for pair_data in word_pairs_raw:
-                word_pair = {
-                    "word1": pair_data.get('word1', ''),
-                    "word2": pair_data.get('word2', ''),
-                    "answer": pair_data.get('answer', '')
-                }
-                word_pairs.append(word_pair)
-            
-            print(f"Extracted word_pairs: {word_pairs}")
+            # Each step needs the whole result of the one before: every pair comes from one
+            # model response, and the sprite joins the clips once they all exist
+            word_pairs = await self.generate_word_pairs(exclude or [], user_id)
             
             if not word_pairs:
                 print("Warning: Empty word_pairs detected")
                 return {"word_pairs": []}
             
-            # Update cache with new response (keep last 5 responses)
-            response_pairs = [(pair["word1"], pair["word2"]) for pair in word_pairs]
-            self.word_cache.append(response_pairs)  # Store complete response
-            self.word_cache = self.word_cache[-5:]  # Keep only last 5 responses
-            
-            # Generate audio using the original optimized method
             enriched_word_pairs = await self.generate_optimized_audio(word_pairs)
-            
             return {
-                "word_pairs": enriched_word_pairs
+                "word_pairs": enriched_word_pairs,
+                "sprite": await self.generate_sprite(enriched_word_pairs, sprite)
             }
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
-            print(f"Raw response was: {response}")
             return {"word_pairs": [], "answers": []}
         except Exception as e:
             print(f"Unexpected error: {e}")
-            print(f"Raw response was: {response}")
             return {"word_pairs": [], "answers": []}
     
+    async def generate_word_pairs(self, exclude: List[str], user_id: Optional[str] = None) -> list:
+        # A pair counts as a repeat when its first word does, which lines up with the
+        # learner's history (stored per word) and keeps one pair per word in an exercise
+        return await dedup_filter.generate_unique(
+            "auditory_discrimination",
+            self.request_word_pairs,
+            5,
+            key=lambda pair: dedup_key(pair["word1"]),
+            exclude=["ship", "pen", "cat", "bear", "thick", "bat", "sing", "make"] + list(exclude),
+            user_id=user_id,
+        )
+    
+    async def request_word_pairs(self, count: int) -> list:
+        prompt = self.create_prompt(count)
+        response = await self.get_openai_response(prompt)
+        try:
+            return await self.parse_word_pairs(response)
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON response: {e}")
+            return []
+    
+    async def parse_word_pairs(self, response: str) -> list:
+        print(f"Raw OpenAI response: {response}")
+        
+        # Simple JSON cleaning
+        cleaned = response.strip()
+        if cleaned.startswith('```json'):
+            cleaned = cleaned[7:]
+        if cleaned.endswith('```'):
+            cleaned = cleaned[:-3]
+        cleaned = cleaned.strip()
+        
+        parsed_response = json.loads(cleaned)
+        word_pairs_raw = parsed_response.get('word_pairs', [])
+        
+        # Extract word pairs and answers for flat format
+        word_pairs = []
+        for pair_data in word_pairs_raw:
+            word_pair = {
+                "word1": pair_data.get('word1', ''),
+                "word2": pair_data.get('word2', ''),
+                "answer": pair_data.get('answer', '')
+            }
+            word_pairs.append(word_pair)
+        
+        print(f"Extracted word_pairs: {word_pairs}")
+        return word_pairs
+    
     async def generate_optimized_audio(self, word_pairs: list) -> list:
         """
         Generate audio files optimally - only generate once for same words, twice for different words
@@ -134,6 +149,21 @@ class AuditoryDiscrimination:
         
         return enriched_word_pairs
     
+    async def generate_sprite(self, enriched_word_pairs: list, build_sprite: bool) -> Optional[dict]:
+        """One MP3 holding every word of the exercise, with start/end offsets per word"""
+        if not build_sprite:
+            return None
+        # Joins the clips generate_optimized_audio already produced; nothing is synthesized again
+        words, urls = [], []
+        for pair in enriched_word_pairs:
+            words.append(pair['word1'])
+            urls.append(pair['audio_file1'])
+            # A "same" pair plays word1 twice, so word2 has no clip of its own
+            if pair['audio_file2'] != pair['audio_file1']:
+                words.append(pair['word2'])
+                urls.append(pair['audio_file2'])
+        return await build_audio_sprite(words, urls, "word_pair")
+    
     async def generate_optimized_audio_for_lists(self, word_pairs_lists: list) -> list:
         """
         Generate audio files for the list of dictionaries format
@@ -173,30 +203,18 @@ class AuditoryDiscrimination:
         return enriched_word_pairs
         
     
-    def create_prompt(self) -> str:
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_words = "ship/sheep, pen/pin, cat/cut, bear/beer, thick/sick, bat/pat, sing/ring, make/rake"
-        if self.word_cache:
-            # Flatten all cached responses into one list
-            cached_pairs = [pair for response in self.word_cache for pair in response]
-            cache_words = [f"{pair[0]}/{pair[1]}" for pair in cached_pairs]
-            excluded_words += ", " + ", ".join(cache_words)
-        
+    def create_prompt(self, count: int = 5) -> str:
         prompt = f"""
         You are an expert language learning specialist creating auditory discrimination exercises. Generate high-quality word pairs for pronunciation practice.
         
         Requirements:
-        - Generate exactly 5 word pairs
+        - Generate exactly {count} word pairs, each starting with a different word
         - Mix identical pairs (same word twice) with similar-sounding but different pairs
         - Focus on minimal pairs that differ by one sound
         - Use meaningful, common English words (NOT function words like "to", "a", "the")
         - Use words that are at least 3 letters long
         - Avoid proper nouns, abbreviations, or uncommon words
         
-        ⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE SELECTING ANY WORDS: {excluded_words}
-        
-        ❌ ABSOLUTE RULE: NEVER use words from the exclusion list above. Verify EACH word is NOT in the list!
-        
         Sound difference types to focus on:
         - Vowel contrasts (long vs short, similar sounds)
         - Consonant substitutions (voiced vs unvoiced pairs)  
@@ -212,8 +230,8 @@ class AuditoryDiscrimination:
         """  
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}],
             temperature=0.7,  # Balanced creativity with JSON structure
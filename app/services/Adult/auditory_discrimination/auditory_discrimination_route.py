@@ -1,25 +1,23 @@
-from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi import APIRouter, HTTPException, Header, Query, Depends
 from .auditory_discrimination_schema import AuditoryDiscriminationResponse
 from .auditory_discrimination import AuditoryDiscrimination
-from app.utils.verify_auth import verify_token
+from app.utils.verify_auth import verify_auth_token
+from app.utils.history_store import history_store, exercise_items
 
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 auditory_discrimination= AuditoryDiscrimination()
 
 
 @router.get("/get_auditory_discrimination", response_model=AuditoryDiscriminationResponse)
 async def get_auditory_discrimination(
     user_id: str = Query(...),
-    authtoken: str = Header(...)
+    sprite: bool = Query(False, description="Also return all clips as one MP3 with per-word offsets")
 ):
     try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
-    try:
-        response = await auditory_discrimination.get_auditory_discrimination()
+        seen = await history_store.recent(user_id, "auditory_discrimination")
+        response = await auditory_discrimination.get_auditory_discrimination(exclude=seen, sprite=sprite, user_id=user_id)
+        await history_store.record(user_id, "auditory_discrimination", exercise_items(response))
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -3,3 +3,5 @@ from typing import Optional, Any
 
 class AuditoryDiscriminationResponse(BaseModel):
     word_pairs: list[dict[str, Any]]
+    # Set when requested with sprite=true: {"url", "duration_ms", "clips": {word: {"start", "end"}}} in milliseconds
+    sprite: Optional[dict[str, Any]] = None
@@ -1,63 +1,29 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
 from app.services.Adult.phenome_mapping.phenome_mapping_schema import PhenomeMappingResponse, PhenomeMappingItem
 from app.utils.text_to_speech import generate_parallel_audio_files
+from app.utils.audio_sprite import build_audio_sprite
+from app.utils.dedup_filter import dedup_filter, dedup_key
 import json
 import re
+from typing import List, Optional
 
 
 class PhenomeMapping:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.exercise_cache = []  # Store last 5 exercises
-        
-    async def get_phenome_mapping(self) -> PhenomeMappingResponse:
-        prompt = self.create_prompt()
-        response = self.get_openai_response(prompt)
-        print(f"Raw OpenAI response: {response}")
+        self.client = get_openai_client(api_key)
         
+    async def get_phenome_mapping(self, exclude: Optional[List[str]] = None, sprite: bool = False,
+                                  user_id: Optional[str] = None) -> PhenomeMappingResponse:
         try:
-            # Simple JSON cleaning
-            cleaned = response.strip()
-            if cleaned.startswith('```json'):
-                cleaned = cleaned[7:]
-            if cleaned.endswith('```'):
-                cleaned = cleaned[:-3]
-            cleaned = cleaned.strip()
-            
-            parsed_response = json.loads(cleaned)
-            exercises_data = parsed_response.get('exercises', [])
-            
-            # Extract all words for audio generation
-            words = [exercise.get('word', '') for exercise in exercises_data]
-            
-            # Generate audio for all words in parallel
-            audio_files = await generate_parallel_audio_files(words, "word")
-            
-            # Create exercise items with audio URLs
-            exercises = []
-            for i, exercise_data in enumerate(exercises_data):
-                word = exercise_data.get('word', '')
-                options = exercise_data.get('options', [])
-                word_url = audio_files[i] if i < len(audio_files) and audio_files[i] else ""
-                
-                exercises.append(PhenomeMappingItem(
-                    word=word,
-                    word_url=word_url,
-                    options=options
-                ))
-            
-            # Update cache with new response (keep last 5 responses)
-            response_words = [ex.word for ex in exercises]
-            print(f"DEBUG: New response words: {response_words}")
-            print(f"DEBUG: Cache before update: {self.exercise_cache}")
-            self.exercise_cache.append(response_words)  # Store complete response
-            self.exercise_cache = self.exercise_cache[-5:]  # Keep only last 5 responses
-            print(f"DEBUG: Cache after update: {self.exercise_cache}")
-            
-            return PhenomeMappingResponse(exercises=exercises)
+            # Each step needs the whole result of the one before: every word comes from one
+            # model response, and the sprite joins the clips once they all exist
+            exercises_data = await self.generate_exercises_data(exclude or [], user_id)
+            audio_files = await self.generate_word_audio(exercises_data)
+            return PhenomeMappingResponse(
+                exercises=await self.build_exercises(exercises_data, audio_files),
+                sprite=await self.generate_sprite(exercises_data, audio_files, sprite)
+            )
             
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
@@ -66,27 +32,74 @@ class PhenomeMapping:
             print(f"Unexpected error in phenome mapping: {e}")
             return PhenomeMappingResponse(exercises=[])
     
-
+    async def generate_exercises_data(self, exclude: List[str], user_id: Optional[str] = None) -> list:
+        # Repeats (including words this learner has already practised) are dropped after parsing
+        return await dedup_filter.generate_unique(
+            "phenome_mapping",
+            self.request_exercises,
+            5,
+            key=lambda exercise: dedup_key(exercise.get('word', '')),
+            exclude=["should", "apple", "think", "green", "catch", "cat", "dog", "run", "jump", "play"] + list(exclude),
+            user_id=user_id,
+        )
+    
+    async def request_exercises(self, count: int) -> list:
+        prompt = self.create_prompt(count)
+        response = await self.get_openai_response(prompt)
+        try:
+            return [exercise for exercise in await self.parse_exercises(response) if isinstance(exercise, dict)]
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON response: {e}")
+            return []
+    
+    async def parse_exercises(self, response: str) -> list:
+        print(f"Raw OpenAI response: {response}")
+        
+        # Simple JSON cleaning
+        cleaned = response.strip()
+        if cleaned.startswith('```json'):
+            cleaned = cleaned[7:]
+        if cleaned.endswith('```'):
+            cleaned = cleaned[:-3]
+        cleaned = cleaned.strip()
         
+        parsed_response = json.loads(cleaned)
+        return parsed_response.get('exercises', [])
     
-    def create_prompt(self) -> str:
-        # Create exclusion list from cache (flatten all previous responses)
-        print(f"DEBUG: Current exercise_cache: {self.exercise_cache}")
-        excluded_words = "should, apple, think, green, catch, cat, dog, run, jump, play"
-        if self.exercise_cache:
-            # Flatten all cached responses into one list
-            cached_words = [word for response in self.exercise_cache for word in response]
-            excluded_words += ", " + ", ".join(cached_words)
-        print(f"DEBUG: Excluded words list: {excluded_words}")
+    async def generate_word_audio(self, exercises_data: list) -> list:
+        # Extract all words for audio generation
+        words = [exercise.get('word', '') for exercise in exercises_data]
         
+        # Generate audio for all words in parallel
+        return await generate_parallel_audio_files(words, "word")
+    
+    async def build_exercises(self, exercises_data: list, audio_files: list) -> list:
+        # Create exercise items with audio URLs
+        exercises = []
+        for i, exercise_data in enumerate(exercises_data):
+            word = exercise_data.get('word', '')
+            options = exercise_data.get('options', [])
+            word_url = audio_files[i] if i < len(audio_files) and audio_files[i] else ""
+            
+            exercises.append(PhenomeMappingItem(
+                word=word,
+                word_url=word_url,
+                options=options
+            ))
+        return exercises
+    
+    async def generate_sprite(self, exercises_data: list, audio_files: list, build_sprite: bool) -> Optional[dict]:
+        """One MP3 holding every word of the exercise, with start/end offsets per word"""
+        if not build_sprite:
+            return None
+        # Joins the clips audio_files already produced; nothing is synthesized again
+        return await build_audio_sprite([exercise.get('word', '') for exercise in exercises_data], audio_files, "word")
+    
+    def create_prompt(self, count: int = 5) -> str:
         prompt = f"""
-        ⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE SELECTING ANY WORDS: {excluded_words}
-        
         You are an expert phonics instructor creating phoneme mapping exercises.
         
-        Generate 5 words for phoneme mapping practice.
-        
-        ❌ ABSOLUTE RULE: NEVER use words from the exclusion list above. Verify EACH word is NOT in the list!
+        Generate {count} different words for phoneme mapping practice.
         
         For each word, provide:
         1. The target word
@@ -99,7 +112,7 @@ class PhenomeMapping:
         Requirements:
         - Mix correct phonemes with similar-sounding distractors
         - Use clear, pronounceable segments
-        - Be creative and avoid the excluded words!
+        - Be creative with fresh vocabulary!
         
         Return ONLY this JSON format:
         {{
@@ -110,8 +123,8 @@ class PhenomeMapping:
         """  
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}],
             temperature=0.7,  
@@ -1,25 +1,23 @@
-from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi import APIRouter, HTTPException, Header, Query, Depends
 from .phenome_mapping_schema import PhenomeMappingResponse
 from .phenome_mapping import PhenomeMapping
-from app.utils.verify_auth import verify_token
+from app.utils.verify_auth import verify_auth_token
+from app.utils.history_store import history_store, exercise_items
 
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 phenome_mapping = PhenomeMapping()
 
 
 @router.get("/get_phenome_mapping", response_model=PhenomeMappingResponse)
 async def get_phenome_mapping(
     user_id: str = Query(...),
-    authtoken: str = Header(...)
+    sprite: bool = Query(False, description="Also return all clips as one MP3 with per-word offsets")
 ):
     try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
-    try:
-        response = await phenome_mapping.get_phenome_mapping()
+        seen = await history_store.recent(user_id, "phenome_mapping")
+        response = await phenome_mapping.get_phenome_mapping(exclude=seen, sprite=sprite, user_id=user_id)
+        await history_store.record(user_id, "phenome_mapping", exercise_items(response))
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Any, Dict, List, Optional
 
 class PhenomeMappingItem(BaseModel):
     word: str
@@ -8,4 +8,6 @@ class PhenomeMappingItem(BaseModel):
 
 class PhenomeMappingResponse(BaseModel):
     exercises: List[PhenomeMappingItem]
+    # Set when requested with sprite=true: {"url", "duration_ms", "clips": {word: {"start", "end"}}} in milliseconds
+    sprite: Optional[Dict[str, Any]] = None
 
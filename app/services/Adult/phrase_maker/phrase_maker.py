@@ -1,38 +1,49 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.dedup_filter import dedup_filter, dedup_key
 from app.services.Adult.phrase_maker.phrase_maker_schema import PhraseMakerResponse, PhraseItem
 import json
 import re
+from typing import List, Optional
 
 
 class PhraseMaker:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.phrase_cache = []  # Store last 5 phrases
+        self.client = get_openai_client(api_key)
+        self.batcher = MicroBatcher("phrase_maker", self.get_phrase_sets, fallback=PhraseMakerResponse)
         
-    def get_phrases(self) -> PhraseMakerResponse:
-        prompt = self.create_prompt()
-        response = self.get_openai_response(prompt)
+    async def get_phrases(self, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> PhraseMakerResponse:
+        if exclude or user_id:
+            # A learner's own history cannot go into a shared batch, so their set is generated alone
+            sets = await self.get_phrase_sets(1, exclude, user_id)
+            return sets[0] if sets else PhraseMakerResponse()
+        # Concurrent requests share one model call that returns a set per caller
+        return await self.batcher.get()
+    
+    async def get_phrase_sets(self, count: int, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> List[PhraseMakerResponse]:
+        # Phrases are deduplicated locally, then dealt out in sets of 5 (one per caller)
+        phrases = await dedup_filter.generate_unique(
+            "phrase_maker",
+            self.request_phrases,
+            count * 5,
+            key=lambda item: dedup_key(item.phrase),
+            exclude=["under the bridge", "very important", "in the morning", "red sports car", "extremely difficult"] + list(exclude or []),
+            user_id=user_id,
+        )
+        return [PhraseMakerResponse(phrases=phrases[i:i + 5]) for i in range(0, len(phrases) - 4, 5)]
+    
+    async def request_phrases(self, count: int) -> List[PhraseItem]:
+        prompt = self.create_prompt(count)
+        response = await self.get_openai_response(prompt)
         return self.format_response(response)
     
-    def create_prompt(self) -> str:
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_phrases = "under the bridge, very important, in the morning, red sports car, extremely difficult"
-        if self.phrase_cache:
-            # Flatten all cached responses into one list
-            cached_phrases = [phrase for response in self.phrase_cache for phrase in response]
-            excluded_phrases += ", " + ", ".join(cached_phrases)
-        
+    def create_prompt(self, count: int = 5) -> str:
         prompt = f"""
         You are an English vocabulary instructor creating fresh phrase-building exercises.
         
-        Generate 5 COMPLETELY NEW phrases (NOT complete sentences).
-        
-        ⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE CREATING ANY PHRASES: {excluded_phrases}
-        
-        ❌ ABSOLUTE RULE: NEVER use phrases from the exclusion list above. Verify EACH phrase is completely new!
+        Generate {count} COMPLETELY NEW phrases (NOT complete sentences).
+        No phrase may appear twice.
         
         STRICT REQUIREMENTS:
         - Generate PHRASES only (noun phrases, verb phrases, prepositional phrases)
@@ -46,7 +57,7 @@ class PhraseMaker:
         - Verb phrases: "[verb] [adverb]" or "[adverb] [verb]"
         - Descriptive phrases: "[very/quite/extremely] [adjective]"
         
-        Return ONLY valid JSON format:
+        Return ONLY valid JSON format, with exactly {count} entries in "phrases":
         {{
             "phrases": [
                 {{"phrase": "fresh_example_phrase", "phrase_options": ["fresh", "example", "phrase"]}},
@@ -56,8 +67,8 @@ class PhraseMaker:
         """
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}],
             temperature=0.7,  # Balanced creativity with JSON structure
@@ -69,7 +80,7 @@ class PhraseMaker:
     
 
     
-    def format_response(self, response: str) -> PhraseMakerResponse:
+    def format_response(self, response: str) -> List[PhraseItem]:
         try:
             # Simple JSON cleaning
             cleaned = response.strip()
@@ -80,30 +91,21 @@ class PhraseMaker:
             cleaned = cleaned.strip()
             
             parsed_data = json.loads(cleaned)
-            phrases_data = parsed_data.get('phrases', [])
             
             # Convert each phrase dict to PhraseItem
             phrase_items = []
-            new_phrases = []
-            for phrase_dict in phrases_data:
+            for phrase_dict in parsed_data.get('phrases', []):
                 if isinstance(phrase_dict, dict) and 'phrase' in phrase_dict and 'phrase_options' in phrase_dict:
-                    phrase_text = phrase_dict['phrase']
-                    new_phrases.append(phrase_text)
-                    
                     phrase_items.append(PhraseItem(
-                        phrase=phrase_text,
+                        phrase=phrase_dict['phrase'],
                         phrase_options=phrase_dict['phrase_options']
                     ))
             
-            # Update cache with new response (keep last 5 responses)
-            self.phrase_cache.append(new_phrases)  # Store complete response
-            self.phrase_cache = self.phrase_cache[-5:]  # Keep only last 5 responses
-            
-            return PhraseMakerResponse(phrases=phrase_items)
+            return phrase_items
             
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
-            return PhraseMakerResponse()
+            return []
         except Exception as e:
             print(f"Error creating PhraseMakerResponse: {e}")
-            return PhraseMakerResponse()
\ No newline at end of file
+            return []
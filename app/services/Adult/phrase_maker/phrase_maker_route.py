@@ -1,23 +1,19 @@
-from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi import APIRouter, HTTPException, Header, Query, Depends
 from .phrase_maker import PhraseMaker
 from .phrase_maker_schema import PhraseMakerResponse
-from app.utils.verify_auth import verify_token
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 phrase_maker = PhraseMaker()
+exercise_reservoir.register("phrase_maker", lambda band, **learner: phrase_maker.get_phrases(**learner))
 
 @router.get("/get_phrases", response_model=PhraseMakerResponse)
 async def get_phrases(
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
-    try:
-        response = phrase_maker.get_phrases()
+        response = await exercise_reservoir.get("phrase_maker", user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
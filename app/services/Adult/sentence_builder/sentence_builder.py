@@ -1,38 +1,52 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.dedup_filter import dedup_filter, dedup_key
+from app.utils.near_duplicate import NearDuplicateIndex
 from app.services.Adult.sentence_builder.sentence_builder_schema import SentenceBuilderResponse, SentenceItem
 import json
 import re
+from typing import List, Optional
 
 
 class SentenceBuilder:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.sentence_cache = []  # Store last 5 sentences
+        self.client = get_openai_client(api_key)
+        self.sentence_index = NearDuplicateIndex("sentence_builder", shingle_size=1)
+        self.batcher = MicroBatcher("sentence_builder", self.get_sentence_sets, fallback=SentenceBuilderResponse)
         
-    def get_sentences(self) -> SentenceBuilderResponse:
-        prompt = self.create_prompt()
-        response = self.get_openai_response(prompt)
+    async def get_sentences(self, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> SentenceBuilderResponse:
+        if exclude or user_id:
+            # A learner's own history cannot go into a shared batch, so their set is generated alone
+            sets = await self.get_sentence_sets(1, exclude, user_id)
+            return sets[0] if sets else SentenceBuilderResponse()
+        # Concurrent requests share one model call that returns a set per caller
+        return await self.batcher.get()
+    
+    async def get_sentence_sets(self, count: int, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> List[SentenceBuilderResponse]:
+        # Sentences are deduplicated (exact and near-duplicate) locally, then dealt out in sets of 5 (one per caller)
+        sentences = await dedup_filter.generate_unique(
+            "sentence_builder",
+            self.request_sentences,
+            count * 5,
+            key=lambda item: dedup_key(item.sentence),
+            exclude=["I love reading books", "The cat is sleeping", "Where are you going?", "She runs very fast", "We eat dinner together"] + list(exclude or []),
+            user_id=user_id,
+            near=[(self.sentence_index, lambda item: item.sentence)],
+        )
+        return [SentenceBuilderResponse(sentences=sentences[i:i + 5]) for i in range(0, len(sentences) - 4, 5)]
+    
+    async def request_sentences(self, count: int) -> List[SentenceItem]:
+        prompt = self.create_prompt(count)
+        response = await self.get_openai_response(prompt)
         return self.format_response(response)
     
-    def create_prompt(self) -> str:
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_sentences = "I love reading books, The cat is sleeping, Where are you going?, She runs very fast, We eat dinner together"
-        if self.sentence_cache:
-            # Flatten all cached responses into one list
-            cached_sentences = [sentence for response in self.sentence_cache for sentence in response]
-            excluded_sentences += ", " + ", ".join(cached_sentences)
-        
+    def create_prompt(self, count: int = 5) -> str:
         prompt = f"""
         You are an English grammar instructor creating fresh sentence building exercises.
         
-        Generate 5 COMPLETELY NEW sentences. 
-        
-        ⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE CREATING ANY SENTENCES: {excluded_sentences}
-        
-        ❌ ABSOLUTE RULE: NEVER use sentences from the exclusion list above. Verify EACH sentence is completely new!
+        Generate {count} COMPLETELY NEW sentences.
+        No sentence may appear twice.
         
         Requirements:
         - Mix different tenses and sentence types
@@ -50,7 +64,7 @@ class SentenceBuilder:
         - Sentence: "I love pizza." → Options: ["I", "love", "pizza."]
         - Sentence: "Help me now!" → Options: ["Help", "me", "now!"]
         
-        Return ONLY valid JSON:
+        Return ONLY valid JSON, with exactly {count} entries in "sentences":
         {{
             "sentences": [
                 {{"sentence": "example sentence here", "sentence_options": ["example", "sentence", "here"]}},
@@ -60,8 +74,8 @@ class SentenceBuilder:
         """
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}],
             temperature=0.7,  # Balanced creativity with JSON structure
@@ -73,7 +87,7 @@ class SentenceBuilder:
     
 
     
-    def format_response(self, response: str) -> SentenceBuilderResponse:
+    def format_response(self, response: str) -> List[SentenceItem]:
         try:
             # Simple JSON cleaning
             cleaned = response.strip()
@@ -84,20 +98,15 @@ class SentenceBuilder:
             cleaned = cleaned.strip()
             
             parsed_data = json.loads(cleaned)
-            sentences_data = parsed_data.get('sentences', [])
             
             # Convert each sentence dict to SentenceItem
             sentence_items = []
-            new_sentences = []
-            for sentence_dict in sentences_data:
+            for sentence_dict in parsed_data.get('sentences', []):
                 if isinstance(sentence_dict, dict) and 'sentence' in sentence_dict and 'sentence_options' in sentence_dict:
-                    sentence_text = sentence_dict['sentence']
-                    new_sentences.append(sentence_text)
-                    
                     # Clean up sentence options - merge standalone punctuation with previous word
                     options = sentence_dict['sentence_options'].copy()
                     cleaned_options = []
-                    
+                
                     for i, option in enumerate(options):
                         # If this option is just punctuation and there's a previous word
                         if option.strip() in ['.', '?', '!', ',', ';', ':'] and cleaned_options:
@@ -105,22 +114,17 @@ class SentenceBuilder:
                             cleaned_options[-1] += option.strip()
                         else:
                             cleaned_options.append(option)
-                    
+                
                     sentence_items.append(SentenceItem(
-                        sentence=sentence_text,
+                        sentence=sentence_dict['sentence'],
                         sentence_options=cleaned_options
                     ))
             
-            # Update cache with new response (keep last 5 responses)
-            self.sentence_cache.append(new_sentences)  # Store complete response
-            self.sentence_cache = self.sentence_cache[-5:]  # Keep only last 5 responses
-            
-            return SentenceBuilderResponse(sentences=sentence_items)
+            return sentence_items
             
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
-            return SentenceBuilderResponse()
+            return []
         except Exception as e:
             print(f"Error creating SentenceBuilderResponse: {e}")
-            return SentenceBuilderResponse()
-        
+            return []
@@ -1,23 +1,19 @@
-from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi import APIRouter, HTTPException, Header, Query, Depends
 from .sentence_builder import SentenceBuilder
 from .sentence_builder_schema import SentenceBuilderResponse
-from app.utils.verify_auth import verify_token
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 sentence_builder = SentenceBuilder()
+exercise_reservoir.register("sentence_builder", lambda band, **learner: sentence_builder.get_sentences(**learner))
 
 @router.get("/get_sentences", response_model=SentenceBuilderResponse)
 async def get_sentences(
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
-    try:
-        response = sentence_builder.get_sentences()
+        response = await exercise_reservoir.get("sentence_builder", user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
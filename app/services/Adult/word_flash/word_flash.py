@@ -1,20 +1,29 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
+from app.utils.score_cache import cached_score
+from app.utils.phonetic_scoring import score_word
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.dedup_filter import dedup_filter
 from app.services.Adult.word_flash.word_flash_schema import WordFlashRequest, WordFlashResponse
 import json
 import re
+from typing import List, Optional
 
 
 class WordFlash:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.word_cache = []  # Store last 5 words
+        self.client = get_openai_client(api_key)
+        self.batcher = MicroBatcher("word_flash", self.generate_word_flash_batch, fallback=lambda: {"words": []})
+        
+    @cached_score("word_flash", lambda input: input.word)
+    async def word_flash_score(self,input:WordFlashRequest, transcript) -> WordFlashResponse:
+        # Clear matches and clear misses are scored locally; only ambiguous cases reach the LLM
+        local_score = score_word(input.word, transcript)
+        if local_score:
+            return WordFlashResponse(**local_score)
         
-    def word_flash_score(self,input:WordFlashRequest, transcript) -> WordFlashResponse:
         prompt = self.create_prompt(input,transcript)
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         return self.format_response(response)
     
     def create_prompt(self, input:WordFlashRequest, transcript) -> str:
@@ -23,7 +32,7 @@ class WordFlash:
         you will receive the following:
         word: {input.word}
         user transcript: {transcript}
-        score each aspect on a scale of 1-100 and provide constructive feedback and suggestions for improvement.
+        score each aspect on a scale of 1-10 and provide constructive feedback and suggestions for improvement.
         Make the feedback concise and vary the phrasing across requests to avoid repetition
         The json response must be exactly in this format
         {{
@@ -37,8 +46,8 @@ class WordFlash:
         """  
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}],
             temperature=0.7,  # Balanced creativity with JSON structure
@@ -61,6 +70,10 @@ class WordFlash:
             cleaned = cleaned.strip()
             
             parsed_data = json.loads(cleaned)
+            score = parsed_data.get("score")
+            if isinstance(score, (int, float)) and score > 10:
+                # Same 1-10 scale as the local score_word path, even if the model answers out of 100
+                parsed_data["score"] = max(1, min(10, round(score / 10)))
             return WordFlashResponse(**parsed_data)
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
@@ -69,23 +82,32 @@ class WordFlash:
             print(f"Error creating WordFlashResponse: {e}")
             return WordFlashResponse()
         
-    def generate_word_flash(self) -> dict:
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_words = ""
-        if self.word_cache:
-            # Flatten all cached responses into one list
-            cached_words = [word for response in self.word_cache for word in response]
-            excluded_words = f"⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE SELECTING ANY WORDS: {', '.join(cached_words)}\n\n❌ ABSOLUTE RULE: NEVER use words from the exclusion list above. Verify EACH word is NOT in the list!\n\n"
+    async def generate_word_flash(self, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> dict:
+        if exclude or user_id:
+            # A learner's own history cannot go into a shared batch, so their set is generated alone
+            sets = await self.generate_word_flash_batch(1, exclude, user_id)
+            return sets[0] if sets else {"words": []}
+        # Concurrent requests share one model call that returns a set per caller
+        return await self.batcher.get()
+
+    async def generate_word_flash_batch(self, count: int, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> list:
+        # Words are deduplicated locally, then dealt out in sets of 5 (one per caller)
+        words = await dedup_filter.generate_unique("word_flash", self.request_words, count * 5,
+                                                   exclude=exclude or (), user_id=user_id)
+        return [{"words": words[i:i + 5]} for i in range(0, len(words) - 4, 5)]
+
+    async def request_words(self, count: int) -> list:
+        prompt = f"""You are expert speaking coach. In order to improve speaking skills, you will provide a list of {count} challenging words.
         
-        prompt = f"""You are expert speaking coach. In order to improve speaking skills, you will provide a list of 5 challenging words.
+        No word may appear twice in the list.
         
-        {excluded_words}Return ONLY a JSON object in this exact format:
+        Return ONLY a JSON object in this exact format, with exactly {count} entries in "words":
         {{
-            "words": ["word1", "word2", "word3", "word4", "word5"]
+            "words": ["word1", "word2", "word3"]
         }}
         
         Do not include any additional text or formatting."""
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         try:
             # Simple JSON cleaning
             cleaned = response.strip()
@@ -96,15 +118,7 @@ class WordFlash:
             cleaned = cleaned.strip()
             
             parsed_response = json.loads(cleaned)
-            words = parsed_response.get('words', [])
-            
-            # Update cache with new response (keep last 5 responses)
-            self.word_cache.append(words)  # Store complete response
-            self.word_cache = self.word_cache[-5:]  # Keep only last 5 responses
-            
-            return {
-                "words": words
-            }
+            return [word for word in parsed_response.get('words', []) if isinstance(word, str)]
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
-            return {"words": []}
\ No newline at end of file
+            return []
@@ -1,43 +1,37 @@
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query
+from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query, Depends
 from .word_flash import WordFlash
 from .word_flash_schema import WordFlashRequest, WordFlashResponse
-from app.utils.verify_auth import verify_token
-from app.utils.speech_to_text import convert_audio_to_text
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir
+from app.utils.speech_to_text import convert_audio_to_text, no_speech_response, transcription_error_response
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 word_flash= WordFlash()
+exercise_reservoir.register("word_flash", lambda band, **learner: word_flash.generate_word_flash(**learner))
 
 @router.post("/word_flash", response_model=WordFlashResponse)
 async def word_flash_score(
     word: str = Form(...),
-    file: UploadFile = File(...),
-    authtoken: str = Header(...)
+    file: UploadFile = File(...)
 ):
-    try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
     try:
         transcript = await convert_audio_to_text(file)
+        if not transcript['success']:
+            return transcription_error_response(transcript)
+        if transcript['no_speech']:
+            return no_speech_response()
         request = WordFlashRequest(word=word)
-        response = word_flash.word_flash_score(request, transcript['text'])
+        response = await word_flash.word_flash_score(request, transcript['text'])
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.get("/get_word_flash")
 async def get_word_flash(
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
-    try:
-        response = word_flash.generate_word_flash()
+        response = await exercise_reservoir.get("word_flash", user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
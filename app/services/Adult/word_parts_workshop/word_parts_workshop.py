@@ -1,38 +1,50 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.dedup_filter import dedup_filter, dedup_key
 from app.services.Adult.word_parts_workshop.word_parts_workshop_schema import WordPartsResponse
 import json
 import re
+from typing import List, Optional
+
+WORD_PART_FIELDS = ("prefix", "root", "suffix", "prefix_meaning", "root_meaning", "suffix_meaning")
 
 
 class WordPartsWorkshop:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.word_cache = []  # Store last 5 words
+        self.client = get_openai_client(api_key)
+        self.batcher = MicroBatcher("word_parts_workshop", self.get_word_parts_sets, fallback=WordPartsResponse)
         
-    def get_word_parts(self) -> WordPartsResponse:
-        prompt = self.create_prompt()
-        response = self.get_openai_response(prompt)
+    async def get_word_parts(self, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> WordPartsResponse:
+        if exclude or user_id:
+            # A learner's own history cannot go into a shared batch, so their set is generated alone
+            sets = await self.get_word_parts_sets(1, exclude, user_id)
+            return sets[0] if sets else WordPartsResponse()
+        # Concurrent requests share one model call that returns an exercise per caller
+        return await self.batcher.get()
+    
+    async def get_word_parts_sets(self, count: int, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> List[WordPartsResponse]:
+        # Word part sets are deduplicated on the whole word, then dealt out 3 per exercise
+        parts = await dedup_filter.generate_unique(
+            "word_parts_workshop",
+            self.request_word_parts,
+            count * 3,
+            key=lambda part: dedup_key(part.get("word") or part["prefix"] + part["root"] + part["suffix"]),
+            exclude=["unhappiness", "reaction", "action", "happiness"] + list(exclude or []),
+            user_id=user_id,
+        )
+        return [self.build_exercise(parts[i:i + 3]) for i in range(0, len(parts) - 2, 3)]
+    
+    async def request_word_parts(self, count: int) -> List[dict]:
+        prompt = self.create_prompt(count)
+        response = await self.get_openai_response(prompt)
         return self.format_response(response)
     
-    def create_prompt(self) -> str:
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_words = "unhappiness, reaction, action, happiness"
-        if self.word_cache:
-            # Flatten all cached responses into one list
-            cached_words = [word for response in self.word_cache for word in response]
-            excluded_words += ", " + ", ".join(cached_words)
-        
+    def create_prompt(self, count: int = 3) -> str:
         prompt = f"""
-        ⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE SELECTING ANY WORDS: {excluded_words}
-        
         You are a vocabulary building expert creating fresh word parts exercises.
         
-        Generate 3 DIFFERENT word part sets.
-        
-        ❌ ABSOLUTE RULE: NEVER use words from the exclusion list above. Verify EACH word is NOT in the list!
+        Generate {count} DIFFERENT word part sets, each built from a different word.
         
         Requirements:
         - Each set should have prefix, root, and suffix components
@@ -40,20 +52,25 @@ class WordPartsWorkshop:
         - Provide clear, simple meanings for each part
         - Be creative with fresh vocabulary!
         
-        Return ONLY valid JSON format:
+        Return ONLY valid JSON format, with exactly {count} entries in "word_parts":
         {{
-            "prefix": ["prefix1", "prefix2", "prefix3"],
-            "root": ["root1", "root2", "root3"], 
-            "suffix": ["suffix1", "suffix2", "suffix3"],
-            "prefix_meaning": ["meaning1", "meaning2", "meaning3"],
-            "root_meaning": ["meaning1", "meaning2", "meaning3"],
-            "suffix_meaning": ["meaning1", "meaning2", "meaning3"]
+            "word_parts": [
+                {{
+                    "word": "full word",
+                    "prefix": "prefix",
+                    "root": "root",
+                    "suffix": "suffix",
+                    "prefix_meaning": "meaning",
+                    "root_meaning": "meaning",
+                    "suffix_meaning": "meaning"
+                }}
+            ]
         }}
         """  
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}],
             temperature=0.7,  # Balanced creativity with JSON structure
@@ -65,7 +82,7 @@ class WordPartsWorkshop:
     
 
     
-    def format_response(self, response: str) -> WordPartsResponse:
+    def format_response(self, response: str) -> List[dict]:
         try:
             # Simple JSON cleaning
             cleaned = response.strip()
@@ -77,23 +94,19 @@ class WordPartsWorkshop:
             
             parsed_data = json.loads(cleaned)
             
-            # Update cache with new response (keep last 5 responses)
-            response_words = parsed_data.get('prefix', []) + parsed_data.get('root', []) + parsed_data.get('suffix', [])
-            self.word_cache.append(response_words)  # Store complete response
-            self.word_cache = self.word_cache[-5:]  # Keep only last 5 responses
-            
-            return WordPartsResponse(
-                prefix=parsed_data.get('prefix', []),
-                root=parsed_data.get('root', []),
-                suffix=parsed_data.get('suffix', []),
-                prefix_meaning=parsed_data.get('prefix_meaning', []),
-                root_meaning=parsed_data.get('root_meaning', []),
-                suffix_meaning=parsed_data.get('suffix_meaning', [])
-            )
+            parts = []
+            for part in parsed_data.get('word_parts', []):
+                if not isinstance(part, dict) or not all(isinstance(part.get(field), str) for field in WORD_PART_FIELDS):
+                    continue
+                parts.append({field: part.get(field) or "" for field in ("word",) + WORD_PART_FIELDS})
+            return parts
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
-            return WordPartsResponse()
+            return []
         except Exception as e:
             print(f"Error creating WordPartsResponse: {e}")
-            return WordPartsResponse()
+            return []
+    
+    def build_exercise(self, parts: List[dict]) -> WordPartsResponse:
+        return WordPartsResponse(**{field: [part[field] for part in parts] for field in WORD_PART_FIELDS})
         
@@ -1,25 +1,21 @@
-from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi import APIRouter, HTTPException, Header, Query, Depends
 from .word_parts_workshop import WordPartsWorkshop
 from .word_parts_workshop_schema import WordPartsResponse
-from app.utils.verify_auth import verify_token
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 word_parts_workshop = WordPartsWorkshop()
+exercise_reservoir.register("word_parts_workshop", lambda band, **learner: word_parts_workshop.get_word_parts(**learner))
 
 
     
 @router.get("/get_word_parts", response_model=WordPartsResponse)
 async def get_word_parts(
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
-    try:
-        response = word_parts_workshop.get_word_parts()
+        response = await exercise_reservoir.get("word_parts_workshop", user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,19 +1,26 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
+from app.utils.score_cache import cached_score
+from app.utils.dedup_filter import dedup_filter, dedup_key
 from app.services.Presentation.context_spin.context_spin_schema import ContextSpinRequest, ContextSpinResponse
 import json
+import re
+from typing import List, Optional
+
+
+def scenario_key(scenario: str) -> str:
+    """Dedup on the setting itself, not the "suppose you are speaking at" lead-in"""
+    return dedup_key(re.sub(r"^\s*suppose you are speaking at\s+((an?|the)\s+)?", "", scenario, flags=re.I))
 
 
 class ContextSpin:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.content_cache = []  # Cache for last 5 generated content
+        self.client = get_openai_client(api_key)
         
-    def context_spin_score(self,input:ContextSpinRequest, transcript) -> ContextSpinResponse:
+    @cached_score("context_spin", lambda input: input.scenario + "|" + ",".join(input.words))
+    async def context_spin_score(self,input:ContextSpinRequest, transcript) -> ContextSpinResponse:
         prompt = self.create_prompt(input,transcript)
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         return self.format_response(response)
     
     def create_prompt(self, input:ContextSpinRequest, transcript) -> str:
@@ -35,8 +42,8 @@ class ContextSpin:
         """  
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}]
         )
@@ -53,38 +60,61 @@ class ContextSpin:
             print(f"Error creating ContextSpinResponse: {e}")
             return ContextSpinResponse()
         
-    def generate_context_spin(self) -> dict:
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_words = "motivation, leadership, innovation, success"
-        excluded_scenarios = "wedding reception, press conference, TED talk, team meeting"
-        if self.content_cache:
-            # Flatten all cached responses
-            cached_words = [word for response in self.content_cache for word in response.get('words', [])]
-            cached_scenarios = [response.get('scenario', '') for response in self.content_cache if response.get('scenario')]
-            
-            if cached_words:
-                excluded_words += ", " + ", ".join(cached_words)
-            if cached_scenarios:
-                excluded_scenarios += ", " + ", ".join(cached_scenarios)
-                
-        prompt = f"""⚠️ FIRST: CHECK THESE EXCLUSION LISTS BEFORE SELECTING ANY CONTENT:
-        EXCLUDED WORDS: {excluded_words}
-        EXCLUDED SCENARIOS: {excluded_scenarios}
+    async def generate_context_spin(self, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> dict:
+        # Repeats are dropped after parsing instead of being listed in the prompt.
+        # Each call offers a few scenarios; the first one not used recently is picked.
+        scenarios = []
         
-        You are expert presentation coach. In order to improve spontaneous verbal thinking and vocabulary integration.
+        async def request_words(count: int) -> list:
+            content = await self.request_context_spin(count)
+            scenarios.extend(content.get("scenarios", []))
+            return content.get("words", [])
         
-        ❌ ABSOLUTE RULE: NEVER use words or scenarios from the exclusion lists above. Verify EACH item is completely new!
+        async def request_scenarios(count: int) -> list:
+            # The first round uses the options that came with the words
+            if scenarios:
+                options = list(scenarios)
+                scenarios.clear()
+                return options
+            content = await self.request_context_spin(count)
+            return content.get("scenarios", [])
         
-        Give 5 key vocabulary words and 1 random scenario for presentation practice.
+        words = await dedup_filter.generate_unique(
+            "context_spin",
+            request_words,
+            5,
+            exclude=["motivation", "leadership", "innovation", "success"] + list(exclude or []),
+            user_id=user_id,
+        )
+        scenario = await dedup_filter.generate_unique(
+            "context_spin:scenario",
+            request_scenarios,
+            1,
+            key=scenario_key,
+            exclude=["wedding reception", "press conference", "TED talk", "team meeting"]
+            + [scenario_key(item) for item in exclude or []],
+            user_id=user_id,
+        )
+        if not words or not scenario:
+            return {"words": [], "scenario": ""}
+        return {
+            "words": words,
+            "scenario": scenario[0]
+        }
+    
+    async def request_context_spin(self, count: int) -> dict:
+        prompt = f"""You are expert presentation coach. In order to improve spontaneous verbal thinking and vocabulary integration.
+        
+        Give {count} key vocabulary words and 3 different random scenarios for presentation practice.
         
         Return ONLY a JSON object in this exact format:
         {{
-            "words": ["word1", "word2", "word3", "word4", "word5"],
-            "scenario": "suppose you are speaking at [new scenario]"
+            "words": ["word1", "word2", "word3", "..."],
+            "scenarios": ["suppose you are speaking at [scenario 1]", "suppose you are speaking at [scenario 2]", "suppose you are speaking at [scenario 3]"]
         }}
         
         Do not include any additional text or formatting."""
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         try:
             # Simple JSON cleaning
             cleaned = response.strip()
@@ -95,15 +125,10 @@ class ContextSpin:
             cleaned = cleaned.strip()
             
             parsed_response = json.loads(cleaned)
-            
-            # Update cache with new response (keep last 5 responses)
-            self.content_cache.append(parsed_response)  # Store complete response
-            self.content_cache = self.content_cache[-5:]  # Keep only last 5 responses
-            
             return parsed_response
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
-            return {"words": [], "scenario": ""}
+            return {}
         except Exception as e:
             print(f"Error creating context spin response: {e}")
-            return {"words": [], "scenario": ""}
\ No newline at end of file
+            return {}
@@ -1,23 +1,20 @@
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query
+from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query, Depends
 from .context_spin import ContextSpin
 from .context_spin_schema import ContextSpinRequest, ContextSpinResponse
-from app.utils.verify_auth import verify_token
-from app.utils.speech_to_text import convert_audio_to_text
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir
+from app.utils.speech_to_text import convert_audio_to_text, no_speech_response, transcription_error_response
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 context_spin= ContextSpin()   
+exercise_reservoir.register("context_spin", lambda band, **learner: context_spin.generate_context_spin(**learner))
 
 @router.post("/context_spin", response_model=ContextSpinResponse)
 async def  context_spin_score(
     scenario: str = Form(...),
     words: str = Form(...), 
-    file: UploadFile = File(...),
-    authtoken: str = Header(...)
+    file: UploadFile = File(...)
 ):
-    try:
-        authtoken=verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
     try:
         try:
             words_list = json.loads(words)
@@ -34,22 +31,21 @@ async def  context_spin_score(
         request = ContextSpinRequest(scenario=scenario, words=words_list)
         
         transcript = await convert_audio_to_text(file)
-        response = context_spin.context_spin_score(request,transcript['text'])
+        if not transcript['success']:
+            return transcription_error_response(transcript)
+        if transcript['no_speech']:
+            return no_speech_response()
+        response = await context_spin.context_spin_score(request,transcript['text'])
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.get("/get_context_spin")
 async def  get_context_spin(
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken=verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    try:
-        response = context_spin.generate_context_spin()
+        response = await exercise_reservoir.get("context_spin", user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
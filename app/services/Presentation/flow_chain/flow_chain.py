@@ -1,26 +1,25 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
+from app.utils.dedup_filter import dedup_filter
 from app.services.Presentation.flow_chain.flow_chain_schema import FlowChainRequest, FlowChainResponse
 import json
+from typing import List, Optional
 
 
 class FlowChain:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.word_cache = []  # Cache for last 5 generated word chains
+        self.client = get_openai_client(api_key)
         
-    def flow_chain_score(self, input: FlowChainRequest,transcript) -> FlowChainResponse:
-        prompt = self.create_prompt(input,transcript)
-        response = self.get_openai_response(prompt)
+    async def flow_chain_score(self, input: FlowChainRequest,transcript, metrics: dict = None) -> FlowChainResponse:
+        prompt = self.create_prompt(input,transcript,metrics)
+        response = await self.get_openai_response(prompt)
         return self.format_response(response)
     
-    def create_prompt(self, input: FlowChainRequest,transcript) -> str:
+    def create_prompt(self, input: FlowChainRequest,transcript, metrics: dict = None) -> str:
         prompt = f"""you are an expert presentation coach. Evaluate the following connected words based on their flow and relevance.
         connected words: {input.word_list}
         user pronounced words: {transcript}
-        score it based on how many wors were used correctly in context on a scale of 0-100 and provide constructive feedback and suggestions for improvement.
+{self.describe_fluency(metrics)}        score it based on how many wors were used correctly in context on a scale of 0-100 and provide constructive feedback and suggestions for improvement.
         The json response must be exactly in this format
         {{
             "score": 86,
@@ -34,8 +33,21 @@ class FlowChain:
         
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    def describe_fluency(self, metrics: dict = None) -> str:
+        """Measured delivery numbers, so the model judges flow from timings instead of guessing from text"""
+        if not metrics or metrics["words_per_minute"] is None:
+            return ""
+        lines = [
+            f"speaking pace: {metrics['words_per_minute']:.0f} words per minute",
+            f"pauses: {metrics['pause_count']} ({metrics['long_pause_count']} longer than a second, longest {metrics['max_pause_seconds']}s)",
+        ]
+        if metrics["low_confidence_words"]:
+            lines.append(f"unclear words: {', '.join(metrics['low_confidence_words'])}")
+        lines.append("use these measurements when judging flow")
+        return "".join(f"        {line}\n" for line in lines)
+    
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}]
         )
@@ -52,29 +64,30 @@ class FlowChain:
             print(f"Error creating FlowChainResponse: {e}")
             return FlowChainResponse()
     
-    def generate_flow_chain(self) -> list:
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_words = "vision, action, growth, impact, legacy, success, innovation, leadership"
-        if self.word_cache:
-            # Flatten all cached word chains
-            cached_words = [word for word_chain in self.word_cache for word in word_chain]
-            excluded_words += ", " + ", ".join(cached_words)
-            
-        prompt = f"""⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE SELECTING ANY WORDS: {excluded_words}
-        
-        Create 10 connected words to enhance fluency and neural speed by chaining related vocabulary into cohesive micro-speeches.
-        
-        ❌ ABSOLUTE RULE: NEVER use words from the exclusion list above. Verify EACH word is NOT in the list!
+    async def generate_flow_chain(self, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> list:
+        # Repeats are dropped after parsing instead of being listed in the prompt;
+        # the chain keeps the model's order, so words of two responses are never mixed
+        return await dedup_filter.generate_unique(
+            "flow_chain",
+            self.request_word_chain,
+            10,
+            exclude=["vision", "action", "growth", "impact", "legacy", "success", "innovation", "leadership"] + list(exclude or []),
+            user_id=user_id,
+            ordered=True,
+        )
+    
+    async def request_word_chain(self, count: int) -> list:
+        prompt = f"""Create {count} connected words to enhance fluency and neural speed by chaining related vocabulary into cohesive micro-speeches.
         
         Create a logical flow where each word connects meaningfully to the next (e.g., vision → strategy → execution → results → celebration).
         
         Return ONLY a JSON object in this exact format:
         {{
-            "words": ["word1", "word2", "word3", "word4", "word5", "word6", "word7", "word8", "word9", "word10"]
+            "words": ["word1", "word2", "word3", "..."]
         }}
         
         Do not include any additional text or formatting."""
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         try:
             # Simple JSON cleaning
             cleaned = response.strip()
@@ -85,16 +98,10 @@ class FlowChain:
             cleaned = cleaned.strip()
             
             parsed_response = json.loads(cleaned)
-            word_chain = parsed_response.get("words", [])
-            
-            # Update cache with new response (keep last 5 responses)
-            self.word_cache.append(word_chain)  # Store complete word chain
-            self.word_cache = self.word_cache[-5:]  # Keep only last 5 responses
-            
-            return word_chain
+            return parsed_response.get("words", [])
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
             return []
         except Exception as e:
             print(f"Error creating flow chain response: {e}")
-            return []
\ No newline at end of file
+            return []
@@ -1,22 +1,20 @@
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query
+from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query, Depends
 from .flow_chain import FlowChain
 from .flow_chain_schema import FlowChainRequest, FlowChainResponse
-from app.utils.verify_auth import verify_token
-from app.utils.speech_to_text import convert_audio_to_text
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir
+from app.utils.speech_to_text import convert_audio_to_text, no_speech_response, transcription_error_response
+from app.utils.fluency import fluency_metrics
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 flow_chain= FlowChain()   
+exercise_reservoir.register("flow_chain", lambda band, **learner: flow_chain.generate_flow_chain(**learner))
 
 @router.post("/flow_chain", response_model=FlowChainResponse)
 async def  flow_chain_score(
     word_list: str = Form(...),  # JSON string for list
-    file: UploadFile = File(...),
-    authtoken: str = Header(...)
+    file: UploadFile = File(...)
 ):
-    try:
-        authtoken=verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
     try:
         # Parse word_list - support both JSON array and comma-separated formats
         try:
@@ -37,22 +35,21 @@ async def  flow_chain_score(
         request = FlowChainRequest(word_list=word_list_parsed)
         
         transcript = await convert_audio_to_text(file)
-        response = flow_chain.flow_chain_score(request, transcript['text'])
+        if not transcript['success']:
+            return transcription_error_response(transcript)
+        if transcript['no_speech']:
+            return no_speech_response()
+        response = await flow_chain.flow_chain_score(request, transcript['text'], fluency_metrics(transcript))
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.get("/get_flow_chain")
 async def  generate_flow_chain(
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken=verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    try:
-        response = flow_chain.generate_flow_chain()
+        response = await exercise_reservoir.get("flow_chain", user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,20 +1,21 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
+from app.utils.score_cache import cached_score
+from app.utils.dedup_filter import dedup_filter
 from app.services.Presentation.power_words.power_words_schema import PowerWordsRequest, PowerWordsResponse
 import json
 import random
+from typing import List, Optional
 
 
 class PowerWords:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.word_cache = []  # Cache for last 5 generated power words
+        self.client = get_openai_client(api_key)
         
-    def power_words_score(self, input: PowerWordsRequest, definition: str, sentence: str) -> PowerWordsResponse:
+    @cached_score("power_words", lambda input: input.word)
+    async def power_words_score(self, input: PowerWordsRequest, definition: str, sentence: str) -> PowerWordsResponse:
         prompt = self.create_prompt(input, definition, sentence)
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         return self.format_response(response)
     
     def create_prompt(self, input: PowerWordsRequest, definition: str, sentence: str) -> str:
@@ -42,8 +43,8 @@ class PowerWords:
     """
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}]
         )
@@ -61,30 +62,29 @@ class PowerWords:
             return PowerWordsResponse()
     
     
-    def generate_power_words(self) -> list:
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_words = "motivation, leadership, innovation, teamwork, success, creativity, growth, inspiration"
-        if self.word_cache:
-            # Flatten all cached word lists
-            cached_words = [word for word_list in self.word_cache for word in word_list]
-            excluded_words += ", " + ", ".join(cached_words)
-            
+    async def generate_power_words(self, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> list:
         themes = ["Motivation", "Leadership", "Innovation", "Teamwork", "Success", "Creativity", "Growth", "Inspiration", "Change", "Resilience"]
         theme_of_the_day=random.choice(themes)
         
-        prompt=f"""⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE SELECTING ANY WORDS: {excluded_words}
-        
-        Generate a list of 10 high-impact, industry-neutral power words used frequently by presenters, educators, leaders, and broadcasters.
-        
-        ❌ ABSOLUTE RULE: NEVER use words from the exclusion list above. Verify EACH word is NOT in the list!
+        # Repeats are dropped after parsing instead of being listed in the prompt
+        return await dedup_filter.generate_unique(
+            "power_words",
+            lambda count: self.request_power_words(theme_of_the_day, count),
+            10,
+            exclude=["motivation", "leadership", "innovation", "teamwork", "success", "creativity", "growth", "inspiration"] + list(exclude or []),
+            user_id=user_id,
+        )
+    
+    async def request_power_words(self, theme_of_the_day: str, count: int) -> list:
+        prompt=f"""Generate a list of {count} high-impact, industry-neutral power words used frequently by presenters, educators, leaders, and broadcasters.
         
         Focus on the theme: {theme_of_the_day}
         
         Return ONLY a JSON object in this exact format:
-        {{"words": ["word1", "word2", "word3", "word4", "word5", "word6", "word7", "word8", "word9", "word10"]}}
+        {{"words": ["word1", "word2", "word3", "..."]}}
         
         Do not include definitions or example sentences. Only return the word strings in the array."""
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         try:
             # Simple JSON cleaning
             cleaned = response.strip()
@@ -95,16 +95,10 @@ class PowerWords:
             cleaned = cleaned.strip()
             
             parsed_response = json.loads(cleaned)
-            word_list = parsed_response.get("words", [])
-            
-            # Update cache with new response (keep last 5 responses)
-            self.word_cache.append(word_list)  # Store complete word list
-            self.word_cache = self.word_cache[-5:]  # Keep only last 5 responses
-            
-            return word_list
+            return parsed_response.get("words", [])
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
             return []
         except Exception as e:
             print(f"Error creating power words response: {e}")
-            return []
\ No newline at end of file
+            return []
@@ -1,29 +1,30 @@
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query
+from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query, Depends
 from .power_words import PowerWords
 from .power_words_schema import PowerWordsRequest, PowerWordsResponse
-from app.utils.verify_auth import verify_token
-from app.utils.speech_to_text import convert_audio_to_text
-router = APIRouter()
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir
+from app.utils.speech_to_text import convert_audio_files_to_text, no_speech_response, transcription_error_response
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 power_words= PowerWords()     
+exercise_reservoir.register("power_words", lambda band, **learner: power_words.generate_power_words(**learner))
 
 @router.post("/power_words", response_model=PowerWordsResponse)
 async def  power_words_score(
     word: str = Form(...),
     defintion_file: UploadFile = File(...),
-    sentence_file: UploadFile = File(...),
-    authtoken: str = Header(...)
+    sentence_file: UploadFile = File(...)
 ):
-    try:
-        authtoken=verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
     try:
         # Create request object
         request = PowerWordsRequest(word=word)
         
-        defintion = await convert_audio_to_text(defintion_file)
-        sentence = await convert_audio_to_text(sentence_file)
-        response = power_words.power_words_score(request,defintion['text'],sentence['text'])
+        defintion, sentence = await convert_audio_files_to_text([defintion_file, sentence_file])
+        for transcript in (defintion, sentence):
+            if not transcript['success']:
+                return transcription_error_response(transcript)
+        if defintion['no_speech'] or sentence['no_speech']:
+            return no_speech_response()
+        response = await power_words.power_words_score(request,defintion['text'],sentence['text'])
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -31,15 +32,10 @@ async def  power_words_score(
 
 @router.get("/get_power_words")
 async def  generate_power_words(
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken=verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    try:
-        response = power_words.generate_power_words()
+        response = await exercise_reservoir.get("power_words", user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,85 +1,105 @@
 import os
-from openai import OpenAI
+import math
+from app.utils.openai_client import get_openai_client
+from app.utils.dedup_filter import dedup_filter
+from app.utils.fluency import PACE_TARGETS, NATURAL_PACE, match_target_words, pace_label, pace_score
 from app.services.Presentation.precision_drill.precision_drill_schema import PrecisionDrillRequest, PrecisionDrillResponse
 import json
+from typing import List, Optional
 
 
 class PrecisionDrill:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.word_cache = []  # Cache for last 5 generated precision drills
+        self.client = get_openai_client(api_key)
         
-    def precision_drill_score(self, input: PrecisionDrillRequest, transcript: str) -> PrecisionDrillResponse:
-        prompt = self.create_prompt(input, transcript)
-        response = self.get_openai_response(prompt)
-        return self.format_response(response)
+    async def precision_drill_score(self, input: PrecisionDrillRequest, transcript: str, metrics: dict) -> PrecisionDrillResponse:
+        """Deterministic score from word coverage, pace and hesitations; no model call"""
+        said, missed = match_target_words(input.wordlist, transcript)
+        accuracy = len(said) / len(input.wordlist) if input.wordlist else 0.0
+        pace = pace_score(metrics["words_per_minute"], input.pace)
+        steadiness = max(0.0, 1.0 - 0.25 * metrics["long_pause_count"])
+        
+        if pace is None:
+            raw_score = 0.85 * accuracy + 0.15 * steadiness
+        else:
+            raw_score = 0.6 * accuracy + 0.3 * pace + 0.1 * steadiness
+        score = max(1, min(10, round(raw_score * 10)))
+        
+        return PrecisionDrillResponse(
+            score=score,
+            feedback=self.create_feedback(input, missed, metrics, pace),
+            status="success",
+            message="Evaluation completed successfully.",
+            words_per_minute=metrics["words_per_minute"],
+            pace=pace_label(metrics["words_per_minute"]),
+            missed_words=missed,
+            unclear_words=metrics["low_confidence_words"]
+        )
     
-    def create_prompt(self, input: PrecisionDrillRequest, transcript: str) -> str:
-        prompt = f"""You will recieve a word list and a voice transcript of user saying those words for a precision drill. Evaluate the user's performance based on clarity, speed, and accuracy in pronouncing the words. Provide a score out of 10, constructive feedback, and suggestions for improvement in JSON format.
-        You will get the following by:
-        Word List: {input.wordlist}
-        User Transcript: {transcript}
-        Now, analyze the user's performance and provide the evaluation in the following JSON format:
-        {{
-            "score": 8,
-            "feedback": "Good clarity but needs to improve speed on certain words.", "Practice tongue twisters to enhance articulation.",
-                "Focus on pacing to maintain consistent speed."
-            "status": "success",
-            "message": "Evaluation completed successfully."
-
-        }}"""
+    def create_feedback(self, input: PrecisionDrillRequest, missed: list, metrics: dict, pace) -> str:
+        parts = []
+        if not missed:
+            parts.append(f"You said all {len(input.wordlist)} words")
+        else:
+            parts.append(f"You missed {len(missed)} of {len(input.wordlist)} words ({', '.join(missed[:3])})")
         
-        return prompt
+        wpm = metrics["words_per_minute"]
+        if wpm is not None:
+            low, high = PACE_TARGETS.get(input.pace, NATURAL_PACE)
+            target = f"the {input.pace} interval" if input.pace in PACE_TARGETS else "a natural pace"
+            if pace == 1.0:
+                parts.append(f"your pace of {wpm:.0f} words per minute fits {target}")
+            elif wpm < low:
+                parts.append(f"at {wpm:.0f} words per minute you were slower than {target} ({low}-{high})")
+            else:
+                parts.append(f"at {wpm:.0f} words per minute you were faster than {target} ({low}-{high})")
+        
+        if metrics["long_pause_count"]:
+            parts.append(f"try to avoid the {metrics['long_pause_count']} long pause(s)")
+        if metrics["low_confidence_words"]:
+            parts.append(f"articulate {', '.join(metrics['low_confidence_words'][:3])} more clearly")
+        
+        feedback = "; ".join(parts) + "."
+        return feedback[0].upper() + feedback[1:]
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}]
         )
         return response.choices[0].message.content
     
-    def format_response(self, response: str) -> PrecisionDrillResponse:
-        try:
-            parsed_data = json.loads(response)
-            return PrecisionDrillResponse(**parsed_data)
-        except json.JSONDecodeError as e:
-            print(f"Error parsing JSON response: {e}")
-            return PrecisionDrillResponse()
-        except Exception as e:
-            print(f"Error creating PrecisionDrillResponse: {e}")
-            return PrecisionDrillResponse()
-        
-    def generate_precision_drill(self) -> dict:
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_words = "perception, integrity, articulate, emphasize, synergy, paradigm, ubiquitous, quintessential"
-        if self.word_cache:
-            # Flatten all cached drill sets
-            cached_words = []
-            for drill_set in self.word_cache:
-                cached_words.extend(drill_set.get('slow', []))
-                cached_words.extend(drill_set.get('medium', []))
-                cached_words.extend(drill_set.get('fast', []))
-            excluded_words += ", " + ", ".join(cached_words)
-            
-        prompt=f"""⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE SELECTING ANY WORDS: {excluded_words}
-        
-        Generate a timed articulation drill with 30 words that challenge clarity and speed for adult presenters.
-        
-        ❌ ABSOLUTE RULE: NEVER use words from the exclusion list above. Verify EACH word is NOT in the list!
+    async def generate_precision_drill(self, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> dict:
+        # Repeats are dropped after parsing instead of being listed in the prompt. The
+        # words come back easiest first and are split into the three pacing intervals.
+        words = await dedup_filter.generate_unique(
+            "precision_drill",
+            self.request_drill_words,
+            30,
+            exclude=["perception", "integrity", "articulate", "emphasize", "synergy", "paradigm", "ubiquitous", "quintessential"] + list(exclude or []),
+            user_id=user_id,
+            ordered=True,
+        )
+        # A short list still makes a drill, just with shorter intervals
+        size = max(1, math.ceil(len(words) / 3))
+        return {
+            "slow": words[:size],
+            "medium": words[size:2 * size],
+            "fast": words[2 * size:3 * size]
+        }
+    
+    async def request_drill_words(self, count: int) -> list:
+        prompt=f"""Generate a timed articulation drill with {count} words that challenge clarity and speed for adult presenters.
         
-        Words should include a mix of abstract nouns, action verbs, and tone-related adjectives. Increase difficulty gradually and provide pacing intervals (slow, medium, fast).
+        Words should include a mix of abstract nouns, action verbs, and tone-related adjectives. Order them from easiest to hardest so difficulty increases gradually.
         
         Return ONLY a JSON object in this exact format:
         {{
-            "slow": ["word1", "word2", "word3", "word4", "word5", "word6", "word7", "word8", "word9", "word10"],
-            "medium": ["word11", "word12", "word13", "word14", "word15", "word16", "word17", "word18", "word19", "word20"],
-            "fast": ["word21", "word22", "word23", "word24", "word25", "word26", "word27", "word28", "word29", "word30"]
+            "words": ["word1", "word2", "word3", "..."]
         }}
         
         Do not include any additional text or formatting."""
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         try:
             # Simple JSON cleaning
             cleaned = response.strip()
@@ -90,15 +110,10 @@ class PrecisionDrill:
             cleaned = cleaned.strip()
             
             parsed_response = json.loads(cleaned)
-            
-            # Update cache with new response (keep last 5 responses)
-            self.word_cache.append(parsed_response)  # Store complete drill set
-            self.word_cache = self.word_cache[-5:]  # Keep only last 5 responses
-            
-            return parsed_response
+            return parsed_response.get("words", [])
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
-            return {"slow": [], "medium": [], "fast": []}
+            return []
         except Exception as e:
             print(f"Error creating precision drill response: {e}")
-            return {"slow": [], "medium": [], "fast": []}
\ No newline at end of file
+            return []
@@ -1,23 +1,23 @@
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query
+from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query, Depends
 from .precision_drill import PrecisionDrill
 from .precision_drill_schema import PrecisionDrillRequest, PrecisionDrillResponse
-from app.utils.verify_auth import verify_token
-from app.utils.speech_to_text import convert_audio_to_text
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir
+from app.utils.speech_to_text import convert_audio_to_text, no_speech_response, transcription_error_response
+from app.utils.fluency import fluency_metrics, PACE_TARGETS
+from typing import Optional
 import json
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 precision_drill= PrecisionDrill()     
+exercise_reservoir.register("precision_drill", lambda band, **learner: precision_drill.generate_precision_drill(**learner))
 
 @router.post("/precision_drill", response_model=PrecisionDrillResponse)
 async def  precision_drill_score(
     wordlist: str = Form(...),  # JSON string for list
     file: UploadFile = File(...),
-    authtoken: str = Header(...)
+    pace: Optional[str] = Form(None)  # slow, medium or fast
 ):
-    try:
-        authtoken=verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
     try:
         # Parse wordlist - support both JSON array and comma-separated formats
         try:
@@ -34,26 +34,30 @@ async def  precision_drill_score(
             except Exception as e:
                 raise HTTPException(status_code=400, detail=f"Invalid wordlist format. Use JSON array like [\"word1\",\"word2\"] or comma-separated like \"word1,word2\": {str(e)}")
         
+        if pace is not None and pace not in PACE_TARGETS:
+            raise HTTPException(status_code=400, detail=f"Invalid pace. Use one of: {', '.join(PACE_TARGETS)}")
+        
         # Create request object
-        request = PrecisionDrillRequest(wordlist=wordlist_parsed)
+        request = PrecisionDrillRequest(wordlist=wordlist_parsed, pace=pace)
         
         transcript = await convert_audio_to_text(file)
-        response = precision_drill.precision_drill_score(request, transcript['text'])
+        if not transcript['success']:
+            return transcription_error_response(transcript)
+        if transcript['no_speech']:
+            return no_speech_response()
+        response = await precision_drill.precision_drill_score(request, transcript['text'], fluency_metrics(transcript))
         return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.get("/get_precision_drill")
 async def  get_precision_drill(
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken=verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    try:
-        response = precision_drill.generate_precision_drill()
+        response = await exercise_reservoir.get("precision_drill", user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -4,9 +4,14 @@ from typing import List, Optional
 
 class PrecisionDrillRequest(BaseModel):
     wordlist: List[str]
+    pace: Optional[str] = None
 class PrecisionDrillResponse(BaseModel):
     score:int
     feedback:str
     status:str
     message:str
+    words_per_minute: Optional[float] = None
+    pace: Optional[str] = None
+    missed_words: List[str] = []
+    unclear_words: List[str] = []
     
\ No newline at end of file
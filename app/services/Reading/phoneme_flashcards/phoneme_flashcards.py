@@ -1,16 +1,21 @@
 import os
-import openai
+from app.utils.openai_client import get_openai_client
 import json
 import random
+import re
+from typing import List, Optional
 from dotenv import load_dotenv
 from .phoneme_flashcards_schema import PhonemeFlashcardsResponse
+from app.utils.dedup_filter import dedup_filter
 
 load_dotenv()
 
+# Recently generated flashcard words to avoid per word length
+FLASHCARD_WORD_MEMORY = 50
+
 class PhonemeFlashcards:
     def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.word_cache = []  # Cache for last 5 generated words
+        self.client = get_openai_client()
         
         # Age-appropriate word lists (backup) - organized by word length
         self.words_by_age = {
@@ -35,11 +40,13 @@ class PhonemeFlashcards:
             "18": ["MAGIC", "POWER", "ROYAL", "GLORY", "HONOR", "TRUTH", "VALUE", "TRUST", "BLEND", "GRAND"]
         }
 
-    def generate_flashcards(self, age: str) -> PhonemeFlashcardsResponse:
+    async def generate_flashcards(self, age: str, exclude: Optional[List[str]] = None,
+                                  user_id: Optional[str] = None) -> PhonemeFlashcardsResponse:
         """Generate a phoneme flashcard with a word and its characters based on age-appropriate word length"""
         
+        exclude = list(exclude or [])[-FLASHCARD_WORD_MEMORY:]
         try:
-            word = self._generate_word_with_ai(age)
+            word = await self._generate_word_with_ai(age, exclude, user_id)
         except Exception as e:
             print(f"AI generation failed for age {age}: {e}")
             age_int = int(age)
@@ -54,7 +61,9 @@ class PhonemeFlashcards:
             fallback_age = random.choice(fallback_ages)
             print(f"Using fallback age {fallback_age} for input age {age}")  # Debug log
             word_list = self.words_by_age.get(fallback_age, self.words_by_age["8"])
-            word = random.choice(word_list)
+            # Prefer a fallback word this learner has not had recently
+            unseen = [candidate for candidate in word_list if candidate.lower() not in exclude]
+            word = random.choice(unseen or word_list)
             print(f"Selected word: {word} from fallback_age {fallback_age}")  # Debug log
         
         # Convert word to uppercase and split into characters
@@ -67,7 +76,7 @@ class PhonemeFlashcards:
             age=age
         )
     
-    def _generate_word_with_ai(self, age: str) -> str:
+    async def _generate_word_with_ai(self, age: str, exclude: List[str] = (), user_id: Optional[str] = None) -> str:
         """Generate an age-appropriate word using OpenAI with dynamic word length based on age"""
         
         age_int = int(age)
@@ -89,47 +98,52 @@ class PhonemeFlashcards:
             complexity = "moderate to complex"
             examples = "plant, dream, beach, heart, world, light, smile, happy"
         
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_words = examples.replace(", ", ", ")
-        if self.word_cache:
-            cached_words = [word for word in self.word_cache]
-            excluded_words += ", " + ", ".join(cached_words)
-            
-        prompt = f"""⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE SELECTING ANY WORDS: {excluded_words}
+        # Repeats are dropped after parsing instead of being listed in the prompt;
+        # a few candidates are requested so one that was not used recently can be picked
+        words = await dedup_filter.generate_unique(
+            f"phoneme_flashcards:{target_length}",
+            lambda count: self._request_words(age, word_length, target_length, complexity, count),
+            1,
+            exclude=examples.split(", ") + list(exclude),
+            capacity=FLASHCARD_WORD_MEMORY,
+            user_id=user_id,
+        )
         
-        Generate ONE single {complexity} word that is appropriate for {age}-year-old children learning phonics.
-
-        ❌ ABSOLUTE RULE: NEVER use words from the exclusion list above. Verify the word is NOT in the list!
+        # If nothing of the right length came back, raise so the fallback list is used
+        if not words:
+            raise ValueError(f"No {target_length}-letter word generated")
+        
+        return words[0]
+    
+    async def _request_words(self, age: str, word_length: str, target_length: int, complexity: str, count: int) -> list:
+        """Ask for candidate words and keep the ones of the right length"""
+        
+        prompt = f"""Generate {count} different {complexity} words that are appropriate for {age}-year-old children learning phonics.
         
         Requirements:
-        - The word MUST be EXACTLY {word_length} long ({target_length} characters only)
+        - Each word MUST be EXACTLY {word_length} long ({target_length} characters only)
         - Use common, familiar words that kids of age {age} would know
-        - The word should be easy to sound out and phonetically regular
-        - Return ONLY the word in uppercase, nothing else
-        - No punctuation, no explanation, just ONE word
-        - Make sure the word is exactly {target_length} letters long
+        - The words should be easy to sound out and phonetically regular
+        - Return ONLY the words in uppercase, separated by commas, nothing else
+        - No punctuation other than the commas, no explanation
+        - Make sure each word is exactly {target_length} letters long
         """
         
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
-                {"role": "system", "content": "You are a phonics teacher. Generate a single word of the exact specified length only."},
+                {"role": "system", "content": "You are a phonics teacher. Generate words of the exact specified length only."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=10,
+            max_tokens=10 * count,
             temperature=0.8
         )
         
-        word = response.choices[0].message.content.strip().upper()
-        # Remove any punctuation or extra characters
-        word = ''.join(c for c in word if c.isalpha())
-        
-        # Validate word length - if not correct, raise exception to use fallback
-        if len(word) != target_length:
-            raise ValueError(f"Generated word '{word}' is not {target_length} letters long")
-        
-        # Update cache with new word (keep last 5 words)
-        self.word_cache.append(word)
-        self.word_cache = self.word_cache[-5:]
-        
-        return word
\ No newline at end of file
+        words = []
+        for candidate in re.split(r"[,\s]+", response.choices[0].message.content.upper()):
+            # Remove any punctuation or extra characters
+            word = ''.join(c for c in candidate if c.isalpha())
+            # Words of the wrong length are skipped
+            if len(word) == target_length:
+                words.append(word)
+        return words
@@ -1,22 +1,21 @@
-from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi import APIRouter, HTTPException, Header, Query, Depends
 from .phoneme_flashcards import PhonemeFlashcards
 from .phoneme_flashcards_schema import PhonemeFlashcardsResponse
-from app.utils.verify_auth import verify_token
+from app.utils.verify_auth import verify_auth_token
+from app.utils.history_store import history_store, exercise_items
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 
 @router.get("/generate_phoneme_flashcards", response_model=PhonemeFlashcardsResponse)
-async def generate_phoneme_flashcards(age: str = Query(..., description="Child's age "), user_id: str = Query(...), authtoken: str = Header(...)):
-    # Verify authentication token
-    if not verify_token(authtoken):
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
+async def generate_phoneme_flashcards(age: str = Query(..., description="Child's age "), user_id: str = Query(...)):
     try:
         print(f"[PHONEME_ROUTE] Received request with age: {age} (type: {type(age)})")
         
         # Create fresh instance for each request to avoid caching issues
         phoneme_flashcards_service = PhonemeFlashcards()
-        response = phoneme_flashcards_service.generate_flashcards(age)
+        seen = await history_store.recent(user_id, "phoneme_flashcards")
+        response = await phoneme_flashcards_service.generate_flashcards(age, exclude=seen, user_id=user_id)
+        await history_store.record(user_id, "phoneme_flashcards", exercise_items(response))
         
         print(f"[PHONEME_ROUTE] Generated response - word: {response.word}, age: {response.age}, word_length: {len(response.word)}")
         
@@ -1,17 +1,27 @@
 import os 
-import openai
+from app.utils.openai_client import get_openai_client
 import json
+import base64
+from typing import List, Optional
 from dotenv import load_dotenv
 from .reading_comprehension_schema import ReadingComprehensionResponse, QuestionAnswer
+from app.utils.dedup_filter import dedup_filter, dedup_key
+from app.utils.near_duplicate import NearDuplicateIndex
+from app.utils.image_jobs import image_jobs
+from app.utils.image_store import save_image
 
 load_dotenv()
 
 class ReadingComprehension:
     def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.passage_cache = []  # Cache for last 5 generated reading passages
+        self.client = get_openai_client()
+        # Reordered or lightly reworded titles, and retold stories under a new title
+        self.title_index = NearDuplicateIndex("reading_comprehension:title", shingle_size=1)
+        self.passage_index = NearDuplicateIndex("reading_comprehension:passage", shingle_size=3, threshold=0.5)
+        image_jobs.register("comprehension_image", lambda payload: self._generate_image(**payload))
 
-    def generate_comprehension(self, age: str) -> ReadingComprehensionResponse:
+    async def generate_comprehension(self, age: str, exclude: Optional[List[str]] = None,
+                                     user_id: Optional[str] = None) -> ReadingComprehensionResponse:
         """Generate age-appropriate reading comprehension passage with questions and answers"""
         
         # Age-appropriate complexity levels
@@ -24,22 +34,51 @@ class ReadingComprehension:
         
         guidance = age_guidance.get(age, age_guidance["6"])
         
-        # Create exclusion list from cache (flatten all previous passages)
-        excluded_topics = "friendly cat, garden adventure, butterfly chase"
-        if self.passage_cache:
-            cached_topics = [passage.get('passage_name', '') for passage in self.passage_cache if passage.get('passage_name')]
-            if cached_topics:
-                excluded_topics += ", " + ", ".join(cached_topics)
-        
-        prompt = f"""⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE CREATING ANY CONTENT: {excluded_topics}
+        try:
+            # A passage whose title or story is the same as, or close to, a recent one is
+            # regenerated instead of listing past titles in the prompt
+            passages = await dedup_filter.generate_unique(
+                f"reading_comprehension:{age}",
+                lambda count: self._request_passage(age, guidance),
+                1,
+                key=lambda data: dedup_key(data.get("passage_name", "")),
+                exclude=["The Friendly Cat"] + list(exclude or []),
+                near=[
+                    (self.title_index, lambda data: data.get("passage_name", "")),
+                    (self.passage_index, lambda data: data.get("text", "")),
+                ],
+                user_id=user_id,
+            )
+            data = passages[0]
+            
+            # Convert to proper schema format
+            questions = [QuestionAnswer(**q) for q in data["questions"]]
+            
+            # The illustration takes 10-20 s, so it is generated in the background;
+            # clients poll the image job for its URL
+            image_job_id = await self._submit_image_job(data["passage_name"], data["text"], age)
+            
+            return ReadingComprehensionResponse(
+                passage_name=data["passage_name"],
+                text=data["text"],
+                questions=questions,
+                age=age,
+                image="",
+                image_job_id=image_job_id
+            )
+            
+        except Exception as e:
+            # Fallback response if AI fails
+            return self._fallback_passage(age)
+    
+    async def _request_passage(self, age: str, guidance: dict) -> list:
+        """Ask the model for one passage; returns it as a one-item list, or [] if it could not be parsed"""
         
-        You are an educational content creator. Generate a complete reading comprehension exercise for {age}-year-old children ({guidance['grade']} level).
-
-        ❌ ABSOLUTE RULE: NEVER use topics or titles from the exclusion list above. Verify your content is completely new!
+        prompt = f"""You are an educational content creator. Generate a complete reading comprehension exercise for {age}-year-old children ({guidance['grade']} level).
         
         Create:
         1. A short, engaging passage ({guidance['words']} words) that is {guidance['level']} and age-appropriate
-        2. A creative title for the passage (NOT from exclusion list)
+        2. A creative, original title for the passage
         3. Exactly 3 multiple-choice comprehension questions about the passage
         4. For each question, provide exactly 3 options and indicate which one is correct
 
@@ -80,7 +119,7 @@ IMPORTANT:
 Return ONLY valid JSON, nothing else."""
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an educational content creator who generates reading comprehension materials for children. Always respond with valid JSON only."},
@@ -101,61 +140,59 @@ Return ONLY valid JSON, nothing else."""
             
             # Parse JSON response
             data = json.loads(content)
+            if not data.get("passage_name") or not data.get("text"):
+                return []
+            return [data]
             
-            # Convert to proper schema format
-            questions = [QuestionAnswer(**q) for q in data["questions"]]
-            
-            # Update cache with new passage (keep last 5 responses)
-            self.passage_cache.append({
-                'passage_name': data["passage_name"],
-                'text': data["text"]
-            })
-            self.passage_cache = self.passage_cache[-5:]
-            
-            # Generate image based on the passage
-            image_url = self._generate_image(data["passage_name"], data["text"], age)
-            
-            return ReadingComprehensionResponse(
-                passage_name=data["passage_name"],
-                text=data["text"],
-                questions=questions,
-                age=age,
-                image=image_url
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON response: {e}")
+            return []
+    
+    def _fallback_passage(self, age: str) -> ReadingComprehensionResponse:
+        return ReadingComprehensionResponse(
+            passage_name="The Friendly Cat",
+            text="There was a small cat named Fluffy. Fluffy liked to play in the garden. She would chase butterflies and climb trees. One day, Fluffy made a new friend.",
+            questions=[
+                QuestionAnswer(
+                    question="What was the cat's name?",
+                    options=["Fluffy", "Mittens", "Whiskers"],
+                    correct_answer="Fluffy"
+                ),
+                QuestionAnswer(
+                    question="Where did Fluffy like to play?",
+                    options=["In the house", "In the garden", "At the park"],
+                    correct_answer="In the garden"
+                ),
+                QuestionAnswer(
+                    question="What did Fluffy do one day?",
+                    options=["Took a nap", "Made a new friend", "Ate food"],
+                    correct_answer="Made a new friend"
+                )
+            ],
+            age=age,
+            image=""
+        )
+    
+    async def _submit_image_job(self, passage_name: str, passage_text: str, age: str) -> str:
+        """Queue the illustration; returns the job id, or "" if it could not be queued"""
+        try:
+            return await image_jobs.submit(
+                "comprehension_image",
+                {"passage_name": passage_name, "passage_text": passage_text, "age": age},
             )
-            
         except Exception as e:
-            # Fallback response if AI fails
-            return ReadingComprehensionResponse(
-                passage_name="The Friendly Cat",
-                text="There was a small cat named Fluffy. Fluffy liked to play in the garden. She would chase butterflies and climb trees. One day, Fluffy made a new friend.",
-                questions=[
-                    QuestionAnswer(
-                        question="What was the cat's name?",
-                        options=["Fluffy", "Mittens", "Whiskers"],
-                        correct_answer="Fluffy"
-                    ),
-                    QuestionAnswer(
-                        question="Where did Fluffy like to play?",
-                        options=["In the house", "In the garden", "At the park"],
-                        correct_answer="In the garden"
-                    ),
-                    QuestionAnswer(
-                        question="What did Fluffy do one day?",
-                        options=["Took a nap", "Made a new friend", "Ate food"],
-                        correct_answer="Made a new friend"
-                    )
-                ],
-                age=age,
-                image=""
-            )
+            print(f"Image job submit error: {str(e)}")
+            return ""
     
-    def _generate_image(self, passage_name: str, passage_text: str, age: str) -> str:
-        """Generate a child-friendly illustration for the passage using DALL-E"""
+    async def _generate_image(self, passage_name: str, passage_text: str, age: str) -> dict:
+        """
+        Generate a child-friendly illustration for the passage using DALL-E and keep it in the local image store
+        (run by the image job queue, which retries on errors)
+        """
+        
+        # Create a prompt for child-friendly illustration
+        image_prompt = f"""Create a colorful, child-friendly, cartoon-style illustration for a children's story titled "{passage_name}". 
         
-        try:
-            # Create a prompt for child-friendly illustration
-            image_prompt = f"""Create a colorful, child-friendly, cartoon-style illustration for a children's story titled "{passage_name}". 
-            
 The illustration should depict: {passage_text[:200]}
 
 Style requirements:
@@ -166,19 +203,15 @@ Style requirements:
 - Clear and easy to understand
 - Engaging and fun for kids"""
 
-            # Generate image using DALL-E
-            response = self.client.images.generate(
-                model="dall-e-3",
-                prompt=image_prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1
-            )
-            
-            # Return the image URL
-            return response.data[0].url
-            
-        except Exception as e:
-            print(f"Image generation error: {str(e)}")
-            # Return empty string if image generation fails
-            return ""
\ No newline at end of file
+        # Generate image using DALL-E
+        response = await self.client.images.generate(
+            model="dall-e-3",
+            prompt=image_prompt,
+            size="1024x1024",
+            quality="standard",
+            n=1,
+            response_format="b64_json"
+        )
+        
+        # The image comes back inline, so it is stored once and never fetched from the upstream host
+        return await save_image(base64.b64decode(response.data[0].b64_json))
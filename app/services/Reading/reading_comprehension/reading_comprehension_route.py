@@ -1,17 +1,16 @@
-from fastapi import APIRouter, HTTPException, Header, Query
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Header, Query, Depends
 from .reading_comprehension import ReadingComprehension
-from .reading_comprehension_schema import ReadingComprehensionResponse
-from app.utils.verify_auth import verify_token
+from .reading_comprehension_schema import ReadingComprehensionResponse, ImageJobResponse
+from app.utils.image_jobs import image_jobs
+from app.utils.verify_auth import verify_auth_token
+from app.utils.history_store import history_store, exercise_items
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 reading_comprehension_service = ReadingComprehension()
 
 @router.get("/generate_comprehension", response_model=ReadingComprehensionResponse)
-async def generate_comprehension(age: str = Query(..., description="Child's age (5-8)"), authtoken: str = Header(...)):
-    # Verify authentication token
-    if not verify_token(authtoken):
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
+async def generate_comprehension(age: str = Query(..., description="Child's age (5-8)"), user_id: Optional[str] = Query(None)):
     # Validate age
     if age not in ["5", "6", "7", "8"]:
         try:
@@ -26,7 +25,17 @@ async def generate_comprehension(age: str = Query(..., description="Child's age
             age = "6"
     
     try:
-        response = reading_comprehension_service.generate_comprehension(age)
+        seen = await history_store.recent(user_id, "reading_comprehension") if user_id else []
+        response = await reading_comprehension_service.generate_comprehension(age, exclude=seen, user_id=user_id)
+        if user_id:
+            await history_store.record(user_id, "reading_comprehension", exercise_items([response.passage_name]))
         return response
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/image_job/{job_id}", response_model=ImageJobResponse)
+async def get_image_job(job_id: str, wait: float = Query(0, ge=0, le=30, description="Seconds to wait for the job to finish before answering")):
+    job = await image_jobs.wait(job_id, wait) if wait else await image_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Image job not found")
+    return job
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List
 
 class QuestionAnswer(BaseModel):
     question: str
@@ -11,4 +11,13 @@ class ReadingComprehensionResponse(BaseModel):
     text: str
     questions: List[QuestionAnswer]
     age: str #### No need for age in response . Instead it is only necessary in input
-    image: str = ""  # Optional image URL
\ No newline at end of file
+    image: str = ""  # Optional image URL; empty until the image job finishes
+    image_job_id: str = ""  # Poll /image_job/{image_job_id} for the illustration
+
+class ImageJobResponse(BaseModel):
+    job_id: str
+    status: str  # queued, running, done or failed
+    image: str = ""  # Largest JPEG variant
+    variants: Dict[str, Dict[str, str]] = {}  # size -> {"webp": url, "jpg": url}
+    attempts: int = 0
+    error: str = ""
@@ -1,33 +1,84 @@
 import os
-import openai
+import asyncio
+from app.utils.openai_client import get_openai_client
 import random
+from typing import List, Optional
 from dotenv import load_dotenv
 from .sight_word_practice_schema import SightWordRequest, SightWordResponse, SightWordItem
 from app.utils.text_to_speech import generate_parallel_audio_files
+from app.utils.concurrency import gather_limited
+from app.utils.pipeline import Pipeline
+from app.utils.dedup_filter import dedup_filter
 
 load_dotenv()
 
+# Item-building calls in flight across all sight word requests; one request (5 words)
+# fans out to 11 calls, so the default lets three requests run in a single round-trip
+SIGHT_WORD_CONCURRENCY = int(os.getenv("SIGHT_WORD_CONCURRENCY", "33"))
+_item_semaphore: Optional[asyncio.Semaphore] = None
+# Recently served sight words to avoid per age
+SIGHT_WORD_MEMORY = 40
+
+
+def _get_item_semaphore() -> asyncio.Semaphore:
+    # Created lazily so it binds to the server's event loop, not the import-time one
+    global _item_semaphore
+    if _item_semaphore is None:
+        _item_semaphore = asyncio.Semaphore(max(1, SIGHT_WORD_CONCURRENCY))
+    return _item_semaphore
+
 class SightWordPractice:
     def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.sentence_cache = []     
-        self.sight_word_cache = [] 
+        self.client = get_openai_client()
+        
+        # Audio for the selected words does not depend on the quiz content,
+        # so TTS and item generation run side by side once the words are known
+        self.pipeline = Pipeline("sight_word_practice")
+        self.pipeline.stage("sight_words", self._generate_sight_words_with_ai, depends_on=["age", "exclude", "user_id"])
+        self.pipeline.stage("audio", self._generate_word_audio, depends_on=["sight_words"])
+        self.pipeline.stage("items", self._generate_sight_word_items_with_ai, depends_on=["sight_words", "age"])
+        self.pipeline.stage("response", self._attach_audio, depends_on=["items", "audio"])
     
-    async def generate_sentence(self, request: SightWordRequest) -> SightWordResponse:
+    async def generate_sentence(self, request: SightWordRequest, exclude: Optional[List[str]] = None,
+                                user_id: Optional[str] = None) -> SightWordResponse:
         """Generate sight word items with definitions, sentences, and quiz questions"""
         
         age = str(request.age) if request.age else "6"      
-        selected_words = self._generate_sight_words_with_ai(age)
+        results = await self.pipeline.run(age=age, exclude=exclude or [], user_id=user_id)
+        
+        return SightWordResponse(response=results["response"])
+
+    async def _generate_word_audio(self, sight_words: list) -> list:
+        """Generate audio for each sight word"""
+        return await generate_parallel_audio_files(sight_words, prefix="sight_word")
+
+    async def _attach_audio(self, items: list, audio: list) -> list:
+        """Fill in each item's audio URL once both stages are done"""
+        for i, item in enumerate(items):
+            item.audio_url = audio[i] if i < len(audio) else ""
+        return items
+
+    async def _generate_sight_words_with_ai(self, age: str, exclude: List[str], user_id: Optional[str] = None) -> list:
+        """Generate 5 age-appropriate sight words using AI"""
         
-        # Generate audio for each sight word
-        audio_urls = await generate_parallel_audio_files(selected_words, prefix="sight_word")
+        # Repeats are dropped after parsing instead of being listed in the prompt.
+        # Sight word vocabularies are small, so only the last few dozen are avoided.
+        sight_words = await dedup_filter.generate_unique(
+            f"sight_words:{age}",
+            lambda count: self._request_sight_words(age, count),
+            5,
+            exclude=["basic", "example", "word", "sight"] + list(exclude)[-SIGHT_WORD_MEMORY:],
+            capacity=SIGHT_WORD_MEMORY,
+            user_id=user_id,
+        )
         
-        sight_word_items = self._generate_sight_word_items_with_ai(selected_words, age, audio_urls)
+        if len(sight_words) != 5:
+            raise ValueError(f"Expected 5 words, got {len(sight_words)}")
         
-        return SightWordResponse(response=sight_word_items)
+        return sight_words
 
-    def _generate_sight_words_with_ai(self, age: str) -> list:
-        """Generate 5 age-appropriate sight words using AI"""
+    async def _request_sight_words(self, age: str, count: int) -> list:
+        """Ask the model for a number of sight words"""
         
         age_int = int(age)
         if age_int <= 6:
@@ -46,16 +97,7 @@ class SightWordPractice:
             complexity = "sophisticated sight words (although, environment, necessary, organization, opportunity, immediately, definitely, experience)"
             level = "high school"
         
-        excluded_words = "basic, example, word, sight"
-        if self.sight_word_cache:
-            cached_words = [word for word_list in self.sight_word_cache for word in word_list]
-            excluded_words += ", " + ", ".join(cached_words)
-            
-        prompt = f"""⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE SELECTING ANY WORDS: {excluded_words}
-        
-        Generate exactly 5 age-appropriate sight words for {age}-year-old learners ({level} level).
-        
-        ❌ ABSOLUTE RULE: NEVER use words from the exclusion list above. Verify EACH word is NOT in the list!
+        prompt = f"""Generate exactly {count} age-appropriate sight words for {age}-year-old learners ({level} level).
         
         Requirements:
         - Select {complexity}
@@ -67,20 +109,20 @@ class SightWordPractice:
         
         Return ONLY a JSON object in this exact format:
         {{
-            "words": ["word1", "word2", "word3", "word4", "word5"]
+            "words": ["word1", "word2", "word3", "..."]
         }}
         
         Do not include any additional text or formatting."""
         
         try:
-            completion = self.client.chat.completions.create(
+            completion = await self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an educational expert who selects age-appropriate sight words for reading instruction. Always respond with valid JSON only."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.8,
-                max_tokens=150
+                max_tokens=200
             )
             
             content = completion.choices[0].message.content.strip()
@@ -95,35 +137,32 @@ class SightWordPractice:
             
             import json
             data = json.loads(content)
-            sight_words = data.get('words', [])
-
-            if len(sight_words) != 5:
-                raise ValueError(f"Expected 5 words, got {len(sight_words)}")
-
-            self.sight_word_cache.append(sight_words)
-            self.sight_word_cache = self.sight_word_cache[-5:]
-            
-            return sight_words
+            return data.get('words', [])
             
         except Exception as e:
             print(f"Error generating sight words: {e}")
-            raise
+            return []
 
-    def _generate_sight_word_items_with_ai(self, sight_words: list, age: str, audio_urls: list) -> list:
+    async def _generate_sight_word_items_with_ai(self, sight_words: list, age: str) -> list:
         """Use OpenAI to generate comprehensive sight word items with definitions, sentences, and quizzes"""
         
-        # Step 1: Generate base info (definition + example sentence) for each sight word
-        base_items = self._generate_base_info(sight_words, age)
+        # Base info for all words and the per-word quiz sentences are independent,
+        # so they run together instead of one round-trip after another
+        calls = [self._generate_base_info(sight_words, age)]
+        for word in sight_words:
+            calls.append(self._generate_correct_sentence(word, age))
+            calls.append(self._generate_wrong_sentences_avoiding_word(word, age, 2))
+        results = await gather_limited(calls, SIGHT_WORD_CONCURRENCY, semaphore=_get_item_semaphore())
+        base_items = results[0]
         
-        # Step 2: For each word, generate correct quiz sentence and wrong options in parallel
         sight_word_items = []
         
         for i, word in enumerate(sight_words):
             base_info = base_items[i]
             
-            # Generate correct sentence using the word and wrong sentences avoiding the word
-            correct_sentence_blank, correct_sentence_filled = self._generate_correct_sentence(word, age)
-            wrong_sentences = self._generate_wrong_sentences_avoiding_word(word, age, 2)
+            # Correct sentence uses the word, wrong sentences avoid it
+            correct_sentence_blank, correct_sentence_filled = results[1 + 2 * i]
+            wrong_sentences = results[2 + 2 * i]
             
             # Randomly shuffle quiz options (use blank version for quiz)
             import random
@@ -133,21 +172,16 @@ class SightWordPractice:
             # Create the final item
             sight_word_items.append(SightWordItem(
                 word=word,
-                audio_url=audio_urls[i] if i < len(audio_urls) else "",
+                audio_url="",
                 definition=base_info['definition'],
                 sentence=base_info['example_sentence'],
                 quiz=quiz,
                 answer=correct_sentence_filled
             ))
         
-        # Cache sentences
-        cache_content = [item.sentence for item in sight_word_items]
-        self.sentence_cache.extend(cache_content)
-        self.sentence_cache = self.sentence_cache[-25:]
-        
         return sight_word_items
     
-    def _generate_base_info(self, sight_words: list, age: str) -> list:
+    async def _generate_base_info(self, sight_words: list, age: str) -> list:
         """Generate definition and example sentence for each sight word"""
         
         words_list = ", ".join(sight_words)
@@ -172,7 +206,7 @@ Return JSON:
 Create items for: {words_list}"""
 
         try:
-            completion = self.client.chat.completions.create(
+            completion = await self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an educational content creator. Always respond with valid JSON only."},
@@ -200,7 +234,7 @@ Create items for: {words_list}"""
             print(f"Error generating base info: {e}")
             raise
     
-    def _generate_correct_sentence(self, word: str, age: str) -> str:
+    async def _generate_correct_sentence(self, word: str, age: str) -> str:
         """Generate a quiz sentence using the specific sight word"""
         
         prompt = f"""Create ONE simple sentence for {age}-year-old children that uses the word "{word}".
@@ -218,7 +252,7 @@ Return JSON:
 Create sentence for word: {word}"""
 
         try:
-            completion = self.client.chat.completions.create(
+            completion = await self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an educational content creator. Always respond with valid JSON only."},
@@ -249,7 +283,7 @@ Create sentence for word: {word}"""
             print(f"Error generating correct sentence: {e}")
             raise
     
-    def _generate_wrong_sentences_avoiding_word(self, word_to_avoid: str, age: str, count: int) -> list:
+    async def _generate_wrong_sentences_avoiding_word(self, word_to_avoid: str, age: str, count: int) -> list:
         """Generate sentences that specifically DO NOT use the given sight word"""
         
         prompt = f"""Generate {count} simple sentences for {age}-year-old children.
@@ -277,7 +311,7 @@ Return JSON:
 Generate {count} sentences that DO NOT need the word "{word_to_avoid}"."""
 
         try:
-            completion = self.client.chat.completions.create(
+            completion = await self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an educational content creator. Always respond with valid JSON only."},
@@ -1,18 +1,18 @@
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Body, Query
+from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Body, Query, Depends
 from .sight_word_practice import SightWordPractice
 from .sight_word_practice_schema import SightWordRequest, SightWordResponse
-from app.utils.verify_auth import verify_token
+from app.utils.verify_auth import verify_auth_token
+from app.utils.history_store import history_store, exercise_items
 
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 sight_word_service = SightWordPractice()
 
 @router.post("/sight_words", response_model=SightWordResponse)
-async def get_sightwords(request_data: SightWordRequest = Body(...), user_id: str = Query(...), authtoken: str = Header(...)):
-    if not verify_token(authtoken):
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
+async def get_sightwords(request_data: SightWordRequest = Body(...), user_id: str = Query(...)):
     try:
-        response = await sight_word_service.generate_sentence(request_data)
+        seen = await history_store.recent(user_id, "sight_words")
+        response = await sight_word_service.generate_sentence(request_data, exclude=seen, user_id=user_id)
+        await history_store.record(user_id, "sight_words", exercise_items([item.word for item in response.response]))
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
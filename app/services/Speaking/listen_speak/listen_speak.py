@@ -1,27 +1,39 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
+from app.utils.score_cache import cached_score
+from app.utils.dedup_filter import dedup_filter
+from app.utils.near_duplicate import NearDuplicateIndex
+from app.utils.word_alignment import score_sentence, SENTENCE_LLM_FEEDBACK
 from app.services.Speaking.listen_speak.listen_speak_schema import ListenSpeakRequest, ListenSpeakResponse
 import json
+from typing import List, Optional
 
 
 class ListenSpeak:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.sentence_cache = []  # Cache for last 5 generated sentences
+        self.client = get_openai_client(api_key)
+        self.sentence_index = NearDuplicateIndex("listen_speak", shingle_size=1)
         
-    def listen_speak_score(self,input:ListenSpeakRequest, transcript) -> ListenSpeakResponse:
-        prompt = self.create_prompt(input,transcript)
-        response = self.get_openai_response(prompt)
-        return self.format_response(response)
+    @cached_score("listen_speak", lambda input: input.sentence)
+    async def listen_speak_score(self,input:ListenSpeakRequest, transcript) -> ListenSpeakResponse:
+        # Word alignment gives an exact score and the missed words without a round-trip
+        result = score_sentence(input.sentence, transcript)
+        if SENTENCE_LLM_FEEDBACK:
+            prompt = self.create_prompt(input,transcript,result)
+            response = await self.get_openai_response(prompt)
+            llm_result = self.format_response(response)
+            if llm_result.status == "success":
+                result["feedback"] = llm_result.feedback
+        return ListenSpeakResponse(**result)
     
-    def create_prompt(self, input:ListenSpeakRequest, transcript) -> str:
+    def create_prompt(self, input:ListenSpeakRequest, transcript, alignment: dict = None) -> str:
         prompt = f"""
         You are an expert speaking practice coach.
         you will recive the following by:
         senetence: {input.sentence}
         user transcript: {transcript}
+        missed words: {", ".join(alignment["missed_words"]) if alignment else "unknown"}
+        score (already decided, keep it): {alignment["score"] if alignment else "unknown"}
         score each aspect on a scale of 1-10 and provide constructive feedback and suggestions for improvement
         The json response must be exactly in this format
         {{
@@ -35,8 +47,8 @@ class ListenSpeak:
         """  
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}]
         )
@@ -53,7 +65,22 @@ class ListenSpeak:
             print(f"Error creating ListenSpeakResponse: {e}")
             return ListenSpeakResponse()
         
-    async def generate_listen_speak(self, age) -> dict:
+    async def generate_listen_speak(self, age, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> dict:
+        # Repeats and near-repeats (one word swapped or added) are dropped after parsing
+        # instead of being listed in the prompt
+        sentences = await dedup_filter.generate_unique(
+            f"listen_speak:{age}",
+            lambda count: self.request_sentences(age, count),
+            5,
+            exclude=["I like cats", "The sun is hot", "My dog runs fast", "Birds can fly"] + list(exclude or []),
+            user_id=user_id,
+            near=[(self.sentence_index, lambda sentence: sentence)],
+        )
+        return {
+            "sentences": sentences
+        }
+    
+    async def request_sentences(self, age, count: int) -> list:
         age_int = int(age)
         
         # Define age-appropriate sentence guidelines
@@ -82,19 +109,8 @@ class ListenSpeak:
                 "examples": "The talented musician practiced diligently every day to improve their performance skills significantly"
             }
         
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_sentences = "I like cats, The sun is hot, My dog runs fast, Birds can fly"
-        if self.sentence_cache:
-            # Flatten all cached responses into one list
-            cached_sentences = [sentence for sentences in self.sentence_cache for sentence in sentences]
-            excluded_sentences += ", " + ", ".join(cached_sentences)
-        
-        prompt = f"""⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE CREATING ANY SENTENCES: {excluded_sentences}
-        
-        You are an expert speaking coach. Generate 5 age-appropriate sentences for a {age}-year-old child to practice speaking.
+        prompt = f"""You are an expert speaking coach. Generate {count} age-appropriate sentences for a {age}-year-old child to practice speaking.
 
-        ❌ ABSOLUTE RULE: NEVER use sentences from the exclusion list above. Verify EACH sentence is completely new!
-        
         STRICT REQUIREMENTS FOR AGE {age}:
         - Each sentence must be {sentence_guide['length']}
         - Use {sentence_guide['complexity']} vocabulary appropriate for age {age}
@@ -110,11 +126,11 @@ class ListenSpeak:
 
         Return ONLY a JSON object in this exact format:
         {{
-            "sentences": ["sentence1", "sentence2", "sentence3", "sentence4", "sentence5"]
+            "sentences": ["sentence1", "sentence2", "sentence3", "..."]
         }}
 
         Make sure each sentence is appropriate for a {age}-year-old's speaking ability."""
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         try:
             # Simple JSON cleaning
             cleaned = response.strip()
@@ -125,18 +141,10 @@ class ListenSpeak:
             cleaned = cleaned.strip()
             
             parsed_response = json.loads(cleaned)
-            sentences = parsed_response.get('sentences', [])
-            
-            # Update cache with new response (keep last 5 responses)
-            self.sentence_cache.append(sentences)  # Store complete sentence list
-            self.sentence_cache = self.sentence_cache[-5:]  # Keep only last 5 responses
-            
-            return {
-                "sentences": sentences
-            }
+            return parsed_response.get('sentences', [])
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
-            return {"sentences": []}
+            return []
         except Exception as e:
             print(f"Error creating listen speak response: {e}")
-            return {"sentences": []}
\ No newline at end of file
+            return []
@@ -1,27 +1,27 @@
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query
+from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query, Depends
 from .listen_speak import ListenSpeak
 from .listen_speak_schema import ListenSpeakRequest, ListenSpeakResponse
-from app.utils.verify_auth import verify_token
-from app.utils.speech_to_text import convert_audio_to_text
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir, age_band, AGE_BANDS
+from app.utils.speech_to_text import convert_audio_to_text, no_speech_response, transcription_error_response
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 listen_speak= ListenSpeak()   
+exercise_reservoir.register("listen_speak", lambda band, **learner: listen_speak.generate_listen_speak(AGE_BANDS[band], **learner), bands=AGE_BANDS)
 
 @router.post("/listen_speak", response_model=ListenSpeakResponse)
 async def listen_speak_score(
     sentence: str = Form(...),
-    file: UploadFile = File(...),
-    authtoken: str = Header(...)
+    file: UploadFile = File(...)
 ):
-    try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
     try:
         transcript = await convert_audio_to_text(file)
+        if not transcript['success']:
+            return transcription_error_response(transcript)
+        if transcript['no_speech']:
+            return no_speech_response()
         request = ListenSpeakRequest(sentence=sentence)
-        response = listen_speak.listen_speak_score(request, transcript['text'])
+        response = await listen_speak.listen_speak_score(request, transcript['text'])
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -29,16 +29,10 @@ async def listen_speak_score(
 @router.get("/get_listen_speak")
 async def get_listen_speak(
     age: str = Query(...),
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
-    try:
-        response = await listen_speak.generate_listen_speak(age)
+        response = await exercise_reservoir.get("listen_speak", age_band(age), user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
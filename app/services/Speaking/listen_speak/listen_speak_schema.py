@@ -1,12 +1,20 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class ListenSpeakRequest(BaseModel):
     sentence: str
 
+class WordSubstitution(BaseModel):
+    expected: str
+    heard: str
+
 class ListenSpeakResponse(BaseModel):
     score: int = 0
     feedback: str = "No feedback available"
     status: str = "error"
     message: str = "Evaluation failed"
+    wer: Optional[float] = None
+    missed_words: List[str] = []
+    inserted_words: List[str] = []
+    substituted_words: List[WordSubstitution] = []
     
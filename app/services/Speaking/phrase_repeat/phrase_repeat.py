@@ -1,27 +1,39 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
+from app.utils.score_cache import cached_score
+from app.utils.dedup_filter import dedup_filter
+from app.utils.near_duplicate import NearDuplicateIndex
+from app.utils.word_alignment import score_sentence, SENTENCE_LLM_FEEDBACK
 from app.services.Speaking.phrase_repeat.phrase_repeat_schema import PhraseRepeatRequest, PhraseRepeatResponse
 import json
+from typing import List, Optional
 
 
 class PhraseRepeat:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.phrase_cache = []  # Cache for last 5 generated phrases
+        self.client = get_openai_client(api_key)
+        self.phrase_index = NearDuplicateIndex("phrase_repeat", shingle_size=1)
         
-    def phrase_repeat_score(self,input:PhraseRepeatRequest, transcript) -> PhraseRepeatResponse:
-        prompt = self.create_prompt(input,transcript)
-        response = self.get_openai_response(prompt)
-        return self.format_response(response)
+    @cached_score("phrase_repeat", lambda input: input.phrase)
+    async def phrase_repeat_score(self,input:PhraseRepeatRequest, transcript) -> PhraseRepeatResponse:
+        # Word alignment gives an exact score and the missed words without a round-trip
+        result = score_sentence(input.phrase, transcript)
+        if SENTENCE_LLM_FEEDBACK:
+            prompt = self.create_prompt(input,transcript,result)
+            response = await self.get_openai_response(prompt)
+            llm_result = self.format_response(response)
+            if llm_result.status == "success":
+                result["feedback"] = llm_result.feedback
+        return PhraseRepeatResponse(**result)
     
-    def create_prompt(self, input:PhraseRepeatRequest, transcript) -> str:
+    def create_prompt(self, input:PhraseRepeatRequest, transcript, alignment: dict = None) -> str:
         prompt = f"""
         You are an expert speaking coach. Evaluate the user's pronunciation based on the following criteria: clarity, fluency, intonation, and overall effectiveness in conveying the intended message.
         you will recive the following by:
         phrase: {input.phrase}
         user transcript: {transcript}
+        missed words: {", ".join(alignment["missed_words"]) if alignment else "unknown"}
+        score (already decided, keep it): {alignment["score"] if alignment else "unknown"}
         score each aspect on a scale of 1-10 and provide constructive feedback and suggestions for improvement
         The json response must be exactly in this format
         {{
@@ -35,8 +47,8 @@ class PhraseRepeat:
         """  
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}]
         )
@@ -53,19 +65,23 @@ class PhraseRepeat:
             print(f"Error creating ContextSpinResponse: {e}")
             return PhraseRepeatResponse()
         
-    async def generate_phrase_repeat(self, age) -> dict:
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_phrases = "Good morning, All is well, Thank you, How are you, See you later"
-        if self.phrase_cache:
-            # Flatten all cached responses into one list
-            cached_phrases = [phrase for phrases in self.phrase_cache for phrase in phrases]
-            excluded_phrases += ", " + ", ".join(cached_phrases)
-            
-        prompt = f"""⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE CREATING ANY PHRASES: {excluded_phrases}
-        
-        You are an expert speaking coach. Generate exactly 5 SHORT phrases for pronunciation practice based on the user's age.
-
-        ❌ ABSOLUTE RULE: NEVER use phrases from the exclusion list above. Verify EACH phrase is completely new!
+    async def generate_phrase_repeat(self, age, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> dict:
+        # Repeats and near-repeats (one word swapped or added) are dropped after parsing
+        # instead of being listed in the prompt
+        phrases = await dedup_filter.generate_unique(
+            f"phrase_repeat:{age}",
+            lambda count: self.request_phrases(age, count),
+            5,
+            exclude=["Good morning", "All is well", "Thank you", "How are you", "See you later"] + list(exclude or []),
+            user_id=user_id,
+            near=[(self.phrase_index, lambda phrase: phrase)],
+        )
+        return {
+            "phrases": phrases
+        }
+    
+    async def request_phrases(self, age, count: int) -> list:
+        prompt = f"""You are an expert speaking coach. Generate exactly {count} SHORT phrases for pronunciation practice based on the user's age.
         
         STRICT REQUIREMENTS:
         - Each phrase must be 2-4 words maximum
@@ -78,11 +94,11 @@ class PhraseRepeat:
 
         Return ONLY a JSON object in this exact format with NO additional text:
         {{
-            "phrases": ["phrase1", "phrase2", "phrase3", "phrase4", "phrase5"]
+            "phrases": ["phrase1", "phrase2", "phrase3", "..."]
         }}
 
         Each phrase MUST be short and commonly used in daily conversation."""
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         try:
             # Simple JSON cleaning
             cleaned = response.strip()
@@ -93,18 +109,10 @@ class PhraseRepeat:
             cleaned = cleaned.strip()
             
             parsed_response = json.loads(cleaned)
-            phrases = parsed_response.get('phrases', [])
-            
-            # Update cache with new response (keep last 5 responses)
-            self.phrase_cache.append(phrases)  # Store complete phrase list
-            self.phrase_cache = self.phrase_cache[-5:]  # Keep only last 5 responses
-            
-            return {
-                "phrases": phrases
-            }
+            return parsed_response.get('phrases', [])
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
-            return {"phrases": []}
+            return []
         except Exception as e:
             print(f"Error creating phrase repeat response: {e}")
-            return {"phrases": []}
\ No newline at end of file
+            return []
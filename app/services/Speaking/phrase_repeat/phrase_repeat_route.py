@@ -1,27 +1,27 @@
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query
+from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query, Depends
 from .phrase_repeat import PhraseRepeat
 from .phrase_repeat_schema import PhraseRepeatRequest, PhraseRepeatResponse
-from app.utils.verify_auth import verify_token
-from app.utils.speech_to_text import convert_audio_to_text
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir, age_band, AGE_BANDS
+from app.utils.speech_to_text import convert_audio_to_text, no_speech_response, transcription_error_response
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 phrase_repeat = PhraseRepeat()   
+exercise_reservoir.register("phrase_repeat", lambda band, **learner: phrase_repeat.generate_phrase_repeat(AGE_BANDS[band], **learner), bands=AGE_BANDS)
 
 @router.post("/phrase_repeat", response_model=PhraseRepeatResponse)
 async def phrase_repeat_score(
     phrase: str = Form(...),
-    file: UploadFile = File(...),
-    authtoken: str = Header(...)
+    file: UploadFile = File(...)
 ):
-    try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-
     try: 
         transcript = await convert_audio_to_text(file)
-        request = PhraseRepeatRequest(phrase_list=phrase)
-        response = phrase_repeat.phrase_repeat_score(request, transcript['text'])
+        if not transcript['success']:
+            return transcription_error_response(transcript)
+        if transcript['no_speech']:
+            return no_speech_response()
+        request = PhraseRepeatRequest(phrase=phrase)
+        response = await phrase_repeat.phrase_repeat_score(request, transcript['text'])
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -29,16 +29,10 @@ async def phrase_repeat_score(
 @router.get("/get_phrase_repeat")
 async def get_phrase_repeat(
     age: str = Query(...),
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
-    try:
-        response = await phrase_repeat.generate_phrase_repeat(age)
+        response = await exercise_reservoir.get("phrase_repeat", age_band(age), user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,27 +1,27 @@
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query
+from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query, Depends
 from .pronunciation import Pronunciation
 from .pronunciation_schema import PronunciationRequest, PronunciationResponse
-from app.utils.verify_auth import verify_token
-from app.utils.speech_to_text import convert_audio_to_text
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir, age_band, AGE_BANDS
+from app.utils.speech_to_text import convert_audio_to_text, no_speech_response, transcription_error_response
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 pronunciation= Pronunciation()   
+exercise_reservoir.register("pronunciation", lambda band, **learner: pronunciation.generate_pronunciation(AGE_BANDS[band], **learner), bands=AGE_BANDS)
 
 @router.post("/pronunciation", response_model=PronunciationResponse)
 async def pronunciation_score(
     word: str = Form(...),
-    file: UploadFile = File(...),
-    authtoken: str = Header(...)
+    file: UploadFile = File(...)
 ):
-    try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
     try:
         transcript = await convert_audio_to_text(file)
+        if not transcript['success']:
+            return transcription_error_response(transcript)
+        if transcript['no_speech']:
+            return no_speech_response()
         request = PronunciationRequest(word=word)
-        response = pronunciation.pronunciation_score(request, transcript['text'])
+        response = await pronunciation.pronunciation_score(request, transcript['text'])
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -29,16 +29,10 @@ async def pronunciation_score(
 @router.get("/get_pronunciation")
 async def get_pronunciation(
     age: str = Query(...),
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
-    try:
-        response = await pronunciation.generate_pronunciation(age)
+        response = await exercise_reservoir.get("pronunciation", age_band(age), user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
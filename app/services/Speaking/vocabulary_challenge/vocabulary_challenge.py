@@ -1,19 +1,26 @@
 import os
-from openai import OpenAI
+from app.utils.openai_client import get_openai_client
+from app.utils.score_cache import cached_score
+from app.utils.dedup_filter import dedup_filter
+from app.utils.phonetic_scoring import score_word
 from app.services.Speaking.vocabulary_challenge.vocabulary_challenge_schema import VocabularyRequest, VocabularyResponse
 import json
+from typing import List, Optional
 
 
 class VocabularyChallenge:
     def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
-        self.word_cache = []  # Cache for last 5 generated vocabulary words
+        self.client = get_openai_client(api_key)
+        
+    @cached_score("vocabulary_challenge", lambda input: input.word)
+    async def vocabulary_score(self,input:VocabularyRequest, transcript) -> VocabularyResponse:
+        # Clear matches and clear misses are scored locally; only ambiguous cases reach the LLM
+        local_score = score_word(input.word, transcript)
+        if local_score:
+            return VocabularyResponse(**local_score)
         
-    def vocabulary_score(self,input:VocabularyRequest, transcript) -> VocabularyResponse:
         prompt = self.create_prompt(input,transcript)
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         return self.format_response(response)
     
     def create_prompt(self, input:VocabularyRequest, transcript) -> str:
@@ -35,8 +42,8 @@ class VocabularyChallenge:
         """  
         return prompt
     
-    def get_openai_response(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+    async def get_openai_response(self, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[ {"role": "user", "content": prompt}]
         )
@@ -53,29 +60,31 @@ class VocabularyChallenge:
             print(f"Error creating VocabularyResponse: {e}")
             return VocabularyResponse()
         
-    async def generate_vocabulary(self, age) -> dict:
-        # Create exclusion list from cache (flatten all previous responses)
-        excluded_words = "vocabulary, challenge, speaking, language, communication, expression"
-        if self.word_cache:
-            # Flatten all cached responses into one list
-            cached_words = [word for words in self.word_cache for word in words]
-            excluded_words += ", " + ", ".join(cached_words)
-            
-        prompt = f"""⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE SELECTING ANY WORDS: {excluded_words}
-        
-        You are expert speaking coach. In order to improve speaking skills, you will provide a list of 5 challenging vocabulary words based on their age.
-        
-        ❌ ABSOLUTE RULE: NEVER use words from the exclusion list above. Verify EACH word is NOT in the list!
+    async def generate_vocabulary(self, age, exclude: Optional[List[str]] = None, user_id: Optional[str] = None) -> dict:
+        # Repeats are dropped after parsing instead of being listed in the prompt
+        words = await dedup_filter.generate_unique(
+            f"vocabulary_challenge:{age}",
+            lambda count: self.request_vocabulary_words(age, count),
+            5,
+            exclude=["vocabulary", "challenge", "speaking", "language", "communication", "expression"] + list(exclude or []),
+            user_id=user_id,
+        )
+        return {
+            "words": words
+        }
+    
+    async def request_vocabulary_words(self, age, count: int) -> list:
+        prompt = f"""You are expert speaking coach. In order to improve speaking skills, you will provide a list of {count} challenging vocabulary words based on their age.
         
         User age is {age}. Select age-appropriate vocabulary challenges that expand their word knowledge.
         
         Return ONLY a JSON object in this exact format:
         {{
-            "words": ["word1", "word2", "word3", "word4", "word5"]
+            "words": ["word1", "word2", "word3", "..."]
         }}
         
         Do not include any additional text or formatting."""
-        response = self.get_openai_response(prompt)
+        response = await self.get_openai_response(prompt)
         try:
             # Simple JSON cleaning
             cleaned = response.strip()
@@ -86,18 +95,10 @@ class VocabularyChallenge:
             cleaned = cleaned.strip()
             
             parsed_response = json.loads(cleaned)
-            words = parsed_response.get('words', [])
-            
-            # Update cache with new response (keep last 5 responses)
-            self.word_cache.append(words)  # Store complete word list
-            self.word_cache = self.word_cache[-5:]  # Keep only last 5 responses
-            
-            return {
-                "words": words
-            }
+            return parsed_response.get('words', [])
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
-            return {"words": []}
+            return []
         except Exception as e:
             print(f"Error creating vocabulary challenge response: {e}")
-            return {"words": []}
\ No newline at end of file
+            return []
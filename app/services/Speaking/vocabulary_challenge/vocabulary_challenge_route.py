@@ -1,27 +1,27 @@
-from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query
+from fastapi import APIRouter, HTTPException, Header, UploadFile, File, Form, Query, Depends
 from .vocabulary_challenge import VocabularyChallenge
 from .vocabulary_challenge_schema import VocabularyRequest, VocabularyResponse
-from app.utils.verify_auth import verify_token
-from app.utils.speech_to_text import convert_audio_to_text
+from app.utils.verify_auth import verify_auth_token
+from app.utils.exercise_reservoir import exercise_reservoir, age_band, AGE_BANDS
+from app.utils.speech_to_text import convert_audio_to_text, no_speech_response, transcription_error_response
 import json
-router = APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 vocabulary_challenge= VocabularyChallenge()   
+exercise_reservoir.register("vocabulary_challenge", lambda band, **learner: vocabulary_challenge.generate_vocabulary(AGE_BANDS[band], **learner), bands=AGE_BANDS)
 
 @router.post("/vocabulary_challenge", response_model=VocabularyResponse)
 async def vocabulary_challenge_score(
     word: str = Form(...),
-    file: UploadFile = File(...),
-    authtoken: str = Header(...)
+    file: UploadFile = File(...)
 ):
-    try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
     try:
         transcript = await convert_audio_to_text(file)
+        if not transcript['success']:
+            return transcription_error_response(transcript)
+        if transcript['no_speech']:
+            return no_speech_response()
         request = VocabularyRequest(word=word)
-        response = vocabulary_challenge.vocabulary_score(request, transcript['text'])
+        response = await vocabulary_challenge.vocabulary_score(request, transcript['text'])
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -29,16 +29,10 @@ async def vocabulary_challenge_score(
 @router.get("/get_vocabulary")
 async def get_vocabulary(
     age: str = Query(...),
-    user_id: str = Query(...),
-    authtoken: str = Header(...)
+    user_id: str = Query(...)
 ):
     try:
-        authtoken = verify_token(authtoken)
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
-    try:
-        response = await vocabulary_challenge.generate_vocabulary(age)
+        response = await exercise_reservoir.get("vocabulary_challenge", age_band(age), user_id=user_id)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,8 +1,10 @@
 import os
 import json
-import openai
+from app.utils.openai_client import get_openai_client
+from app.utils.dedup_filter import dedup_filter
 import random
 import re
+from typing import List, Optional
 from dotenv import load_dotenv
 from .writing_schema import InitialTopicResponse, FinalScoreRequest, FinalScoreResponse, TopicRequest
 
@@ -10,45 +12,46 @@ load_dotenv ()
 
 class Writing:
     def __init__(self):
-        self.client=openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = get_openai_client()
         self.available_topics = [
             "Sports", "Dance", "Cooking", "Food", "Nature", 
             "Art", "Music", "Travel", "Science", "Movies", 
             "Meditation", "Gaming", "Animals"
         ]
-        self.word_cache = {}  # Cache for last 5 generated words per topic
 
-    def get_topic(self, topic_request: TopicRequest = None) -> InitialTopicResponse:
+    async def get_topic(self, topic_request: TopicRequest = None, exclude: Optional[List[str]] = None,
+                        user_id: Optional[str] = None) -> InitialTopicResponse:
         # Use provided topic or randomly select one if not provided
         if topic_request and topic_request.topic:
             selected_topic = topic_request.topic.value
         else:
             selected_topic = random.choice(self.available_topics)
         
-        # Initialize cache for topic if not exists
-        if selected_topic not in self.word_cache:
-            self.word_cache[selected_topic] = []
-            
-        # Create exclusion list from cache (flatten all previous responses for this topic)
-        excluded_words = "basic, simple, common, related, topic"
-        if self.word_cache[selected_topic]:
-            # Flatten all cached word lists for this topic
-            cached_words = [word for word_list in self.word_cache[selected_topic] for word in word_list]
-            excluded_words += ", " + ", ".join(cached_words)
-        
-        # Create prompt to get 5 related words for the selected topic
-        prompt = f"""⚠️ FIRST: CHECK THIS EXCLUSION LIST BEFORE SELECTING ANY WORDS: {excluded_words}
+        # Repeats are dropped after parsing instead of being listed in the prompt
+        related_words = await dedup_filter.generate_unique(
+            f"writing:{selected_topic}",
+            lambda count: self._request_related_words(selected_topic, count),
+            5,
+            exclude=["basic", "simple", "common", "related", "topic"] + list(exclude or []),
+            user_id=user_id,
+        )
         
-        You are a helpful assistant that provides exactly 5 related words for a given topic.
+        # If we get fewer than 5 words, pad with generic topic-related words
+        while len(related_words) < 5:
+            related_words.append(f"{selected_topic.lower()}_word_{len(related_words) + 1}")
         
-        ❌ ABSOLUTE RULE: NEVER use words from the exclusion list above. Verify EACH word is NOT in the list!
+        return InitialTopicResponse(topic=selected_topic, related_words=related_words)
+    
+    async def _request_related_words(self, selected_topic: str, count: int) -> list:
+        # Create prompt to get related words for the selected topic
+        prompt = f"""You are a helpful assistant that provides exactly {count} related words for a given topic.
         
-        Provide exactly 5 words related to the topic '{selected_topic}'. 
-        Return only the 5 words separated by commas, nothing else.
+        Provide exactly {count} words related to the topic '{selected_topic}'. 
+        Return only the {count} words separated by commas, nothing else.
         The words should be simple and commonly used words related to the topic."""
         
         # Get AI response for related words
-        response = self.get_openai_response(prompt, selected_topic)
+        response = await self.get_openai_response(prompt, selected_topic)
         
         try:
             # Simple cleaning and parsing
@@ -59,42 +62,27 @@ class Writing:
                 cleaned = cleaned[:-3]
             cleaned = cleaned.strip()
             
-            # Parse the response to extract the 5 words
+            # Parse the response to extract the words
             related_words = [word.strip().rstrip('.').rstrip(',') for word in cleaned.split(',')]
-            
-            # Ensure we have exactly 5 words
-            if len(related_words) > 5:
-                related_words = related_words[:5]
-            elif len(related_words) < 5:
-                # If we get fewer than 5 words, pad with generic topic-related words
-                while len(related_words) < 5:
-                    related_words.append(f"{selected_topic.lower()}_word_{len(related_words)}")
-            
-            # Update cache with new response (keep last 5 responses per topic)
-            self.word_cache[selected_topic].append(related_words)  # Store complete word list
-            self.word_cache[selected_topic] = self.word_cache[selected_topic][-5:]  # Keep only last 5 responses
-            
-            return InitialTopicResponse(topic=selected_topic, related_words=related_words)
+            return [word for word in related_words if word]
             
         except Exception as e:
             print(f"Error processing writing topic response: {e}")
-            # Fallback with generic words if parsing fails
-            fallback_words = [f"{selected_topic.lower()}_word_{i+1}" for i in range(5)]
-            return InitialTopicResponse(topic=selected_topic, related_words=fallback_words)
+            return []
     
-    def get_writing_score(self, input_data: FinalScoreRequest) -> FinalScoreResponse:
+    async def get_writing_score(self, input_data: FinalScoreRequest) -> FinalScoreResponse:
         # Analyze word usage
         words_used = self._check_word_usage(input_data.user_paragraph, input_data.related_words)
         word_usage_score = min(len(words_used) * 2, 10)  # 2 points per word used, max 10
         
         # Get grammar and sentence quality score from AI
-        grammar_score = self._get_grammar_score(input_data.user_paragraph, input_data.topic)
+        grammar_score = await self._get_grammar_score(input_data.user_paragraph, input_data.topic)
         
         # Combined sentence score (grammar + word usage, out of 10)
         sentence_score = min(round((grammar_score + word_usage_score) / 2), 10)
         
         # Get motivation message
-        motivation = self._get_motivation_message(
+        motivation = await self._get_motivation_message(
             input_data.user_paragraph, 
             input_data.topic, 
             input_data.related_words,
@@ -120,7 +108,7 @@ class Writing:
         
         return words_used
     
-    def _get_grammar_score(self, paragraph: str, topic: str) -> int:
+    async def _get_grammar_score(self, paragraph: str, topic: str) -> int:
         """Get grammar and sentence quality score from AI (0-10)"""
         prompt = f"""You are an English writing evaluator. Score the following paragraph on grammar, sentence structure, and overall quality on a scale of 0-10.
 
@@ -134,7 +122,7 @@ Consider:
 Return ONLY a number from 0 to 10. Nothing else."""
 
         try:
-            response = self.get_openai_response(prompt, paragraph)
+            response = await self.get_openai_response(prompt, paragraph)
             # Extract number from response
             score_match = re.search(r'\d+', response)
             if score_match:
@@ -144,7 +132,7 @@ Return ONLY a number from 0 to 10. Nothing else."""
         except:
             return 5  # Default score on error
     
-    def _get_motivation_message(self, paragraph: str, topic: str, related_words: list, 
+    async def _get_motivation_message(self, paragraph: str, topic: str, related_words: list, 
                                words_used: list, sentence_score: int) -> str:
         """Get encouraging motivation message from AI"""
         
@@ -163,7 +151,7 @@ Example format: "Great job writing! Keep practicing and you will improve greatly
 Respond with only the 10-word message."""
 
         try:
-            motivation = self.get_openai_response(motivation_prompt, paragraph)
+            motivation = await self.get_openai_response(motivation_prompt, paragraph)
             # Ensure exactly 10 words
             words = motivation.strip().split()
             if len(words) > 10:
@@ -187,8 +175,8 @@ Respond with only the 10-word message."""
     def create_prompt(self) -> str:
         return f""""""
                 
-    def get_openai_response (self, prompt:str, data:str)->str:
-        completion =self.client.chat.completions.create(
+    async def get_openai_response (self, prompt:str, data:str)->str:
+        completion = await self.client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[{"role":"system", "content": prompt},{"role":"user", "content": data}],
             temperature=0.7            
@@ -1,37 +1,26 @@
-from fastapi import APIRouter, HTTPException, Body, Header, Query
+from fastapi import APIRouter, HTTPException, Body, Header, Query, Depends
 from .writing import Writing
 from .writing_schema import FinalScoreRequest, FinalScoreResponse, InitialTopicResponse, TopicRequest 
-from app.utils.verify_auth import verify_token
+from app.utils.verify_auth import verify_auth_token
+from app.utils.history_store import history_store, exercise_items
 
-router= APIRouter()
+router = APIRouter(dependencies=[Depends(verify_auth_token)])
 writing= Writing()
 
 @router.post("/topic", response_model=InitialTopicResponse)
-async def get_topic(request_data: TopicRequest = None,user_id: str = Query(...), authtoken: str = Header(...)):
+async def get_topic(request_data: TopicRequest = None,user_id: str = Query(...)):
     try:
-        is_valid = verify_token(authtoken)
-        if not is_valid:  # ✅ Explicitly check if token is valid
-            raise HTTPException(status_code=401, detail="Invalid auth token")
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
-    try:
-        response = writing.get_topic(request_data)
+        seen = await history_store.recent(user_id, "writing")
+        response = await writing.get_topic(request_data, exclude=seen, user_id=user_id)
+        await history_store.record(user_id, "writing", exercise_items(response.related_words))
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/final", response_model=FinalScoreResponse)
-async def get_final_score(request_data: FinalScoreRequest, authtoken: str = Header(...)):
-    try:
-        is_valid = verify_token(authtoken)
-        if not is_valid:  # ✅ Explicitly check if token is valid
-            raise HTTPException(status_code=401, detail="Invalid auth token")
-    except Exception as e:
-        raise HTTPException(status_code=401, detail="Invalid auth token")
-    
+async def get_final_score(request_data: FinalScoreRequest):
     try:
-        response = writing.get_writing_score(request_data)
+        response = await writing.get_writing_score(request_data)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
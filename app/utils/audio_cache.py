@@ -0,0 +1,127 @@
+import os
+import asyncio
+import hashlib
+import json
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from app.utils.audio_store import audio_store
+
+AUDIO_DIR = Path("temp_audio")
+
+# Threads doing audio file I/O; a few are enough since each write is a small chunk
+_write_pool = ThreadPoolExecutor(max_workers=int(os.getenv("AUDIO_WRITE_WORKERS", "4")), thread_name_prefix="audio-write")
+# Chunks are gathered up to this size per clip before being handed to a write thread
+AUDIO_WRITE_BUFFER_BYTES = 64 * 1024
+
+
+def audio_cache_key(text: str, voice: str, model: str, response_format: str) -> str:
+    """
+    Stable digest of everything that determines the synthesized audio
+
+    Unlike hash(), the digest is identical across processes and restarts, so
+    every worker maps the same text to the same file.
+    """
+    payload = json.dumps([model, voice, response_format, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def audio_filename(key: str, response_format: str = "mp3") -> str:
+    return f"tts_{key}.{response_format}"
+
+
+def cached_audio_path(text: str, voice: str, model: str, response_format: str = "mp3") -> Path:
+    """Path the audio for these TTS parameters is (or will be) stored at"""
+    key = audio_cache_key(text, voice, model, response_format)
+    return AUDIO_DIR / audio_filename(key, response_format)
+
+
+def lookup_cached_audio(path: Path) -> Optional[str]:
+    """
+    Return the public URL for a cached clip, or None on a miss
+
+    A hit refreshes the file's mtime so recency survives an index rebuild.
+    """
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    audio_store.touch(path.name)
+    return build_audio_url(path.name)
+
+
+class AudioFileWriter:
+    """
+    Streams audio chunks into a temp file and renames it into place on commit
+
+    All file I/O runs on a small dedicated thread pool, so writes never stall
+    the event loop, and at most AUDIO_WRITE_BUFFER_BYTES of a clip is held in
+    memory at a time. Readers only ever see complete files.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.size = 0
+        self._buffer = bytearray()
+        self._file = None
+        self._tmp_name = None
+
+    async def write(self, chunk: bytes):
+        self._buffer += chunk
+        self.size += len(chunk)
+        if len(self._buffer) >= AUDIO_WRITE_BUFFER_BYTES:
+            await self._run(self._flush, bytes(self._buffer))
+            self._buffer.clear()
+
+    async def commit(self):
+        """Publish the file under its final name; a writer that received nothing publishes nothing"""
+        if not self.size:
+            return
+        await self._run(self._replace, bytes(self._buffer))
+        self._buffer.clear()
+        audio_store.record(self.path.name, self.size)
+
+    async def abort(self):
+        """Drop the partial file"""
+        self._buffer.clear()
+        if self._file is not None:
+            await self._run(self._discard)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(_write_pool, func, *args)
+
+    def _flush(self, data: bytes):
+        if self._file is None:
+            self.path.parent.mkdir(exist_ok=True)
+            fd, self._tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=".tts_", suffix=".part")
+            self._file = os.fdopen(fd, "wb")
+        self._file.write(data)
+
+    def _replace(self, data: bytes):
+        try:
+            self._flush(data)
+            self._file.close()
+            os.replace(self._tmp_name, self.path)
+        except BaseException:
+            self._discard()
+            raise
+
+    def _discard(self):
+        if self._file is None:
+            return
+        self._file.close()
+        try:
+            os.unlink(self._tmp_name)
+        except FileNotFoundError:
+            pass
+
+
+def build_audio_url(filename: str) -> str:
+    """Public URL of a file served from the /temp_audio mount"""
+    domain = os.getenv("DOMAIN")
+    if domain:
+        return f"{domain}/temp_audio/{filename}"
+    host = os.getenv("API_HOST", "127.0.0.1")
+    port = os.getenv("API_PORT", "8061")
+    return f"http://{host}:{port}/temp_audio/{filename}"
@@ -0,0 +1,162 @@
+import os
+import asyncio
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+from fastapi import UploadFile
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+# Speech kept on each side of the detected voiced region so word edges are not clipped
+PAD_MS = 200
+# Frames quieter than this are always treated as silence
+SILENCE_DB = -50.0
+# Frames must be this far above the recording's noise floor to count as voiced
+NOISE_MARGIN_DB = 10.0
+# Frames louder than this are always voiced, whatever the noise floor (speech with no pauses)
+SPEECH_DB = SILENCE_DB + 20.0
+
+FFMPEG = shutil.which("ffmpeg")
+AUDIO_PREPROCESS_ENABLED = os.getenv("AUDIO_PREPROCESS", "true").lower() == "true"
+AUDIO_PREPROCESS_WORKERS = int(os.getenv("AUDIO_PREPROCESS_WORKERS", "2"))
+AUDIO_PREPROCESS_BITRATE = os.getenv("AUDIO_PREPROCESS_BITRATE", "24k")
+
+if AUDIO_PREPROCESS_ENABLED and FFMPEG is None:
+    print("ffmpeg not found; uploads are sent to Whisper without preprocessing")
+    AUDIO_PREPROCESS_ENABLED = False
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _decode_to_pcm(data: bytes, suffix: str) -> np.ndarray:
+    """Decode any container ffmpeg understands to 16 kHz mono int16 samples"""
+    # A real file rather than a pipe so formats with trailing headers (m4a/mp4) decode too
+    with tempfile.NamedTemporaryFile(suffix=suffix) as source:
+        source.write(data)
+        source.flush()
+        result = subprocess.run(
+            [FFMPEG, "-hide_banner", "-loglevel", "error", "-i", source.name,
+             "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"],
+            capture_output=True, timeout=60, check=True,
+        )
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+
+def _encode_opus(samples: np.ndarray) -> bytes:
+    result = subprocess.run(
+        [FFMPEG, "-hide_banner", "-loglevel", "error", "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1",
+         "-i", "pipe:0", "-c:a", "libopus", "-b:a", AUDIO_PREPROCESS_BITRATE, "-application", "voip",
+         "-f", "ogg", "pipe:1"],
+        input=samples.tobytes(), capture_output=True, timeout=60, check=True,
+    )
+    return result.stdout
+
+
+def speech_bounds(samples: np.ndarray) -> Optional[tuple]:
+    """
+    Energy-based VAD over 30 ms frames
+
+    Returns:
+        (start, end, voiced_seconds): sample indices of the voiced region including
+        padding and the unpadded voiced length, or None when no frame rises above
+        the silence threshold
+
+    A recording without pauses has no quiet frames to measure the noise floor
+    from, so frames above SPEECH_DB always count, and a clip whose loudest
+    frame is within NOISE_MARGIN_DB of its floor (a short, evenly spoken word)
+    is only held to SILENCE_DB, leaving Whisper to decide.
+    """
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    frame_count = len(samples) // frame
+    if frame_count == 0:
+        return None
+
+    frames = samples[:frame_count * frame].astype(np.float32).reshape(frame_count, frame) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    levels = 20 * np.log10(np.maximum(rms, 1e-10))
+
+    noise_floor = np.percentile(levels, 10)
+    if levels.max() - noise_floor < NOISE_MARGIN_DB:
+        threshold = SILENCE_DB  # too little contrast to tell speech from noise
+    else:
+        threshold = max(noise_floor + NOISE_MARGIN_DB, SILENCE_DB)
+    voiced = np.flatnonzero((levels > threshold) | (levels > SPEECH_DB))
+    if voiced.size == 0:
+        return None
+
+    pad = PAD_MS // FRAME_MS
+    start = max(0, voiced[0] - pad) * frame
+    end = min(frame_count, voiced[-1] + 1 + pad) * frame
+    voiced_seconds = (voiced[-1] + 1 - voiced[0]) * FRAME_MS / 1000
+    return int(start), int(end), float(voiced_seconds)
+
+
+def preprocess_bytes(data: bytes, suffix: str = "") -> dict:
+    """
+    Downmix, resample, trim silence and re-encode one recording
+
+    Runs in a worker process. Returns the re-encoded Ogg/Opus bytes (None when
+    nothing was voiced) plus the durations before and after trimming and the
+    length of the voiced region itself.
+    """
+    samples = _decode_to_pcm(data, suffix)
+    duration = len(samples) / SAMPLE_RATE
+
+    bounds = speech_bounds(samples)
+    if bounds is None:
+        return {"audio": None, "duration": duration, "speech_duration": 0.0, "voiced_duration": 0.0}
+
+    start, end, voiced_duration = bounds
+    trimmed = samples[start:end]
+    return {
+        "audio": _encode_opus(trimmed),
+        "duration": duration,
+        "speech_duration": len(trimmed) / SAMPLE_RATE,
+        "voiced_duration": voiced_duration,
+    }
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=AUDIO_PREPROCESS_WORKERS)
+    return _pool
+
+
+async def preprocess_audio(audio_file: UploadFile) -> Optional[dict]:
+    """
+    Preprocess an upload off the event loop
+
+    Returns:
+        preprocess_bytes' result with the original size added, or None when
+        preprocessing is disabled or failed and the original upload should be sent
+    """
+    if not AUDIO_PREPROCESS_ENABLED:
+        return None
+
+    await audio_file.seek(0)
+    data = await audio_file.read()
+    await audio_file.seek(0)
+    suffix = os.path.splitext(audio_file.filename or "")[1]
+
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_get_pool(), preprocess_bytes, data, suffix)
+    except Exception as e:
+        print(f"Audio preprocessing failed, sending original upload: {e}")
+        return None
+
+    result["original_size"] = len(data)
+    return result
+
+
+def shutdown_audio_preprocess():
+    """Stop the worker processes when the app shuts down"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
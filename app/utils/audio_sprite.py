@@ -0,0 +1,186 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from app.utils.audio_cache import AUDIO_DIR, build_audio_url, lookup_cached_audio
+from app.utils.audio_store import audio_store
+
+# Silence between clips, so seeking a little early or late never plays a neighbour
+AUDIO_SPRITE_GAP_MS = int(os.getenv("AUDIO_SPRITE_GAP_MS", "300"))
+
+# MPEG audio Layer III tables, indexed by the fields of the frame header
+_BITRATES_KBPS = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _parse_header(header: bytes) -> Optional[Tuple[int, int, int]]:
+    """(frame length, sample rate, samples per frame) of a Layer III frame header, or None"""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 3
+    layer = (header[1] >> 1) & 3
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES_KBPS["mpeg1" if mpeg1 else "mpeg2"][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    samples = 1152 if mpeg1 else 576
+    padding = (header[2] >> 1) & 1
+    return samples // 8 * bitrate // sample_rate + padding, sample_rate, samples
+
+
+def _is_info_frame(frame: bytes) -> bool:
+    """Xing/Info/VBRI frames carry the clip's length, which would be wrong for the joined file"""
+    mpeg1 = (frame[1] >> 3) & 3 == 3
+    mono = frame[3] >> 6 == 3
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    offset = 4 + (0 if frame[1] & 1 else 2) + side_info
+    return frame[offset:offset + 4] in (b"Xing", b"Info") or frame[36:40] == b"VBRI"
+
+
+def mp3_frames(data: bytes) -> Tuple[List[bytes], int, int]:
+    """
+    Split an MP3 file into its audio frames
+
+    ID3 tags, Xing/Info headers and stray bytes between frames are dropped.
+
+    Returns:
+        (frames, sample rate, samples per frame)
+
+    Raises:
+        ValueError: If the data holds no Layer III frames or mixes sample rates
+    """
+    position = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        position = 10 + size + (10 if data[5] & 0x10 else 0)
+    end = len(data) - 128 if data[-128:-125] == b"TAG" else len(data)
+
+    frames, sample_rate, samples = [], None, None
+    while position + 4 <= end:
+        parsed = _parse_header(data[position:position + 4])
+        if parsed is None or position + parsed[0] > end:
+            position += 1  # resync on the next frame header
+            continue
+        length, rate, frame_samples = parsed
+        if sample_rate is not None and (rate, frame_samples) != (sample_rate, samples):
+            raise ValueError("mixed sample rates in one clip")
+        sample_rate, samples = rate, frame_samples
+        frame = data[position:position + length]
+        if frames or not _is_info_frame(frame):
+            frames.append(frame)
+        position += length
+
+    if not frames:
+        raise ValueError("no MP3 audio frames found")
+    return frames, sample_rate, samples
+
+
+def _silent_frame(template: bytes) -> bytes:
+    """A frame in the template's format with empty side info, which decodes to silence"""
+    header = bytes([template[0], template[1] | 0x01, template[2] & ~0x02 & 0xFF, template[3]])
+    length, _, _ = _parse_header(header)
+    return header + bytes(length - 4)
+
+
+def _build_sprite(texts: List[str], paths: List[Path], sprite_path: Path, gap_ms: int) -> Tuple[dict, int, int]:
+    """
+    Join the clips into one MP3 and work out where each starts and ends
+
+    The offset map is derived from frame counts, so it is exact to one frame
+    (24 ms for OpenAI speech). The sprite is only written if it does not exist yet.
+
+    Returns:
+        ({text: {"start": ms, "end": ms}}, total duration in ms, bytes written)
+    """
+    parts, clips = [], {}
+    sample_rate = samples = None
+    position = 0
+    silence = []
+    for text, path in zip(texts, paths):
+        frames, rate, frame_samples = mp3_frames(path.read_bytes())
+        if sample_rate is None:
+            sample_rate, samples = rate, frame_samples
+            silence = [_silent_frame(frames[0])] * round(gap_ms * sample_rate / samples / 1000)
+        elif (rate, frame_samples) != (sample_rate, samples):
+            raise ValueError("clips have different sample rates")
+        if parts:
+            parts.extend(silence)
+            position += len(silence)
+        clips[text] = {
+            "start": round(position * samples * 1000 / sample_rate),
+            "end": round((position + len(frames)) * samples * 1000 / sample_rate),
+        }
+        parts.extend(frames)
+        position += len(frames)
+
+    written = 0
+    if not sprite_path.exists():
+        data = b"".join(parts)
+        fd, tmp_name = tempfile.mkstemp(dir=sprite_path.parent, prefix=".sprite_", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_name, sprite_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+            raise
+        written = len(data)
+    return clips, round(position * samples * 1000 / sample_rate), written
+
+
+async def build_audio_sprite(texts: list, urls: list, prefix: str = "audio",
+                             gap_ms: int = AUDIO_SPRITE_GAP_MS) -> Optional[dict]:
+    """
+    Bundle clips that are already in the audio cache into a single MP3 with an offset map
+
+    The clips are joined frame by frame, without re-encoding, into a sprite
+    named after its clips, so the same set of words always maps to the same
+    file. The client downloads one file per exercise and plays each word by
+    seeking to its offsets.
+
+    Args:
+        texts: Texts in playback order; repeats get a single clip
+        urls: Audio URL of each text, as returned by generate_parallel_audio_files ("" if it failed)
+        prefix: Label used in log messages
+        gap_ms: Silence inserted between clips
+
+    Returns:
+        {"url": ..., "duration_ms": ..., "clips": {text: {"start": ms, "end": ms}}},
+        or None if no clip could be joined; texts without a URL are left out of "clips"
+    """
+    available = {}
+    for text, url in zip(texts, urls):
+        if text and url and text not in available:
+            available[text] = AUDIO_DIR / url.rsplit("/", 1)[1]
+    if not available:
+        return None
+
+    sprite_texts = list(available)
+    paths = list(available.values())
+    digest = hashlib.sha256("\n".join([str(gap_ms)] + [path.name for path in paths]).encode()).hexdigest()[:32]
+    sprite_path = AUDIO_DIR / f"sprite_{digest}.mp3"
+
+    try:
+        clips, duration_ms, written = await asyncio.to_thread(_build_sprite, sprite_texts, paths, sprite_path, gap_ms)
+    except (OSError, ValueError) as e:
+        print(f"Audio sprite for {prefix} failed: {e}")
+        return None
+
+    if written:
+        audio_store.record(sprite_path.name, written)
+    url = lookup_cached_audio(sprite_path) or build_audio_url(sprite_path.name)
+    return {"url": url, "duration_ms": duration_ms, "clips": clips}
+
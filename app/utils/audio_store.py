@@ -0,0 +1,174 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from fastapi.staticfiles import StaticFiles
+
+
+class AudioStore:
+    """
+    Size-bounded index of the files in temp_audio
+
+    Keeps an in-memory LRU of file name -> (size, last access). When the total
+    size exceeds the byte budget, the least recently used files are unlinked in
+    small batches on a worker thread so the event loop never walks or deletes
+    large directories itself.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, min_age_seconds: int = 300, evict_batch: int = 64):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        # Evict down to 90% of the budget so we do not evict on every write
+        self.target_bytes = int(max_bytes * 0.9)
+        self.min_age_seconds = min_age_seconds
+        self.evict_batch = evict_batch
+        self._index: "OrderedDict[str, tuple]" = OrderedDict()
+        self._total_bytes = 0
+        self._eviction_task: Optional[asyncio.Task] = None
+        self._evicted_files = 0
+        self._evicted_bytes = 0
+        self._last_rebuild = None
+
+    async def rebuild(self):
+        """Rebuild the index from disk with a single scandir on a worker thread"""
+        scan_started = time.time()
+        entries = await asyncio.to_thread(self._scan_directory)
+        scanned_names = {name for name, _, _ in entries}
+
+        # Files we have seen accessed keep their in-memory recency
+        merged = []
+        for name, size, mtime in entries:
+            known = self._index.get(name)
+            last_access = max(mtime, known[1]) if known else mtime
+            merged.append((last_access, name, size))
+        # Keep files recorded while the scan was running
+        for name, (size, last_access) in self._index.items():
+            if name not in scanned_names and last_access >= scan_started:
+                merged.append((last_access, name, size))
+        merged.sort()
+
+        self._index = OrderedDict((name, (size, last_access)) for last_access, name, size in merged)
+        self._total_bytes = sum(size for _, name, size in merged)
+        self._last_rebuild = time.time()
+        self._schedule_eviction()
+
+    def record(self, name: str, size: int):
+        """Register a newly written file as most recently used"""
+        previous = self._index.pop(name, None)
+        if previous:
+            self._total_bytes -= previous[0]
+        self._index[name] = (size, time.time())
+        self._total_bytes += size
+        self._schedule_eviction()
+
+    def touch(self, name: str):
+        """Mark a file as just accessed"""
+        entry = self._index.get(name)
+        if entry:
+            self._index[name] = (entry[0], time.time())
+            self._index.move_to_end(name)
+
+    def stats(self) -> dict:
+        oldest = next(iter(self._index.values()), None)
+        return {
+            "files": len(self._index),
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "usage": round(self._total_bytes / self.max_bytes, 3) if self.max_bytes else 0.0,
+            "evicted_files": self._evicted_files,
+            "evicted_bytes": self._evicted_bytes,
+            "evicting": bool(self._eviction_task and not self._eviction_task.done()),
+            "oldest_access_age_seconds": round(time.time() - oldest[1]) if oldest else None,
+            "last_rebuild": self._last_rebuild,
+        }
+
+    def _schedule_eviction(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        if self._eviction_task and not self._eviction_task.done():
+            return
+        try:
+            self._eviction_task = asyncio.get_running_loop().create_task(self._evict())
+        except RuntimeError:
+            # No running loop (e.g. during import); the next write or rebuild will evict
+            pass
+
+    async def _evict(self):
+        cutoff = time.time() - self.min_age_seconds
+        while self._total_bytes > self.target_bytes and self._index:
+            batch = []
+            projected = self._total_bytes
+            for name, (size, last_access) in self._index.items():
+                if len(batch) >= self.evict_batch or last_access > cutoff or projected <= self.target_bytes:
+                    break
+                batch.append((name, size))
+                projected -= size
+            if not batch:
+                break
+
+            # Drop from the index first so concurrent lookups treat them as misses
+            for name, size in batch:
+                self._index.pop(name, None)
+                self._total_bytes -= size
+
+            freed = await asyncio.to_thread(self._unlink_files, [name for name, _ in batch])
+            self._evicted_files += len(batch)
+            self._evicted_bytes += freed
+
+    def _scan_directory(self) -> list:
+        self.directory.mkdir(exist_ok=True)
+        stale_cutoff = time.time() - 3600
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                # Leftover partial writes from a crashed worker
+                if entry.name.startswith("."):
+                    if stat.st_mtime < stale_cutoff:
+                        self._unlink_files([entry.name])
+                    continue
+                entries.append((entry.name, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _unlink_files(self, names: list) -> int:
+        freed = 0
+        for name in names:
+            path = self.directory / name
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                freed += size
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Failed to delete {path}: {e}")
+        return freed
+
+
+class AudioStaticFiles(StaticFiles):
+    """StaticFiles mount that reports every served file to the audio store"""
+
+    def __init__(self, *args, store: AudioStore, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.store = store
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304):
+            self.store.touch(os.path.basename(path))
+        return response
+
+
+audio_store = AudioStore(
+    directory="temp_audio",
+    max_bytes=int(float(os.getenv("AUDIO_STORE_MAX_MB", "512")) * 1024 * 1024),
+    min_age_seconds=int(os.getenv("AUDIO_STORE_MIN_AGE_SECONDS", "300")),
+)
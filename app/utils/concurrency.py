@@ -0,0 +1,25 @@
+import asyncio
+from typing import Awaitable, Iterable, Optional
+
+
+async def gather_limited(coros: Iterable[Awaitable], limit: int, semaphore: Optional[asyncio.Semaphore] = None,
+                         return_exceptions: bool = False) -> list:
+    """
+    Await coroutines concurrently with at most `limit` running at once
+
+    Args:
+        coros: Coroutines to run
+        limit: Maximum number running at the same time (ignored when semaphore is given)
+        semaphore: Optional shared semaphore so several callers share one limit
+        return_exceptions: Return exceptions in place of results instead of raising
+
+    Returns:
+        Results in the same order as the input coroutines
+    """
+    semaphore = semaphore or asyncio.Semaphore(max(1, limit))
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros), return_exceptions=return_exceptions)
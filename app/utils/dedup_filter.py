@@ -0,0 +1,251 @@
+import os
+import re
+import math
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from app.utils.near_duplicate import NearDuplicateIndex
+
+# Model calls ask for this many times the items still needed, so a few repeats can be dropped
+DEDUP_OVER_REQUEST = float(os.getenv("DEDUP_OVER_REQUEST", "1.4"))
+# Generated items remembered per exercise scope before the oldest generation is forgotten
+DEDUP_CAPACITY = int(os.getenv("DEDUP_CAPACITY", "1000"))
+# Extra calls made to replace repeats before falling back to serving them
+DEDUP_MAX_TOP_UPS = int(os.getenv("DEDUP_MAX_TOP_UPS", "2"))
+# Learners whose filters are kept; the least recently active are forgotten beyond this
+DEDUP_MAX_USERS = int(os.getenv("DEDUP_MAX_USERS", "10000"))
+
+
+def dedup_key(item) -> str:
+    """Case, punctuation and spacing do not make an item new"""
+    text = re.sub(r"[^\w\s']", " ", str(item).lower()).replace("'", "")
+    return " ".join(text.split())
+
+
+class BloomFilter:
+    """Fixed-size bit array with k hash positions per item (double hashing over one blake2b digest)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class _RotatingBloom:
+    """Two generations of Bloom filters; when the current one is full the older one is dropped"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.current = BloomFilter(capacity)
+        self.previous: Optional[BloomFilter] = None
+
+    def add(self, key: str):
+        if self.current.count >= self.capacity:
+            self.previous, self.current = self.current, BloomFilter(self.capacity)
+        self.current.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.current or (self.previous is not None and key in self.previous)
+
+
+def user_scope(scope: str, user_id: Optional[str] = None) -> str:
+    """Filter name for one learner's generations of a scope; the shared scope when there is no learner"""
+    return f"{scope}@{user_id}" if user_id else scope
+
+
+class DedupFilter:
+    """
+    Remembers which items each exercise scope has generated
+
+    Replaces the exclusion lists that used to be pasted into prompts: repeats
+    are dropped after parsing instead, so prompt size no longer grows with
+    history. Generations made for a learner are remembered per learner, so
+    one learner's exercises never hold back another's; generations without
+    a learner (the shared reservoir) use one filter per scope. Memory is a
+    fixed ~1.8 KB per 1000 remembered items per filter, and at most
+    `max_users` learners' filters are kept.
+    """
+
+    def __init__(self, capacity: int = DEDUP_CAPACITY, max_users: int = DEDUP_MAX_USERS):
+        self.capacity = capacity
+        self.max_users = max_users
+        self._scopes: Dict[str, _RotatingBloom] = {}
+        self._user_scopes: "OrderedDict[str, _RotatingBloom]" = OrderedDict()
+        self._metrics = {"kept": 0, "dropped": 0, "near_dropped": 0, "top_ups": 0, "repeats_served": 0}
+
+    def seen(self, scope: str, key: str, user_id: Optional[str] = None) -> bool:
+        bloom = self._bloom(scope, user_id)
+        return bloom is not None and key in bloom
+
+    def add(self, scope: str, keys: Iterable[str], capacity: Optional[int] = None, user_id: Optional[str] = None):
+        bloom = self._bloom(scope, user_id)
+        if bloom is None:
+            bloom = _RotatingBloom(capacity or self.capacity)
+            if user_id:
+                self._user_scopes[user_scope(scope, user_id)] = bloom
+                while len(self._user_scopes) > self.max_users:
+                    self._user_scopes.popitem(last=False)
+            else:
+                self._scopes[scope] = bloom
+        for key in keys:
+            bloom.add(key)
+
+    def _bloom(self, scope: str, user_id: Optional[str]) -> Optional[_RotatingBloom]:
+        if not user_id:
+            return self._scopes.get(scope)
+        name = user_scope(scope, user_id)
+        bloom = self._user_scopes.get(name)
+        if bloom is not None:
+            self._user_scopes.move_to_end(name)
+        return bloom
+
+    async def generate_unique(
+        self,
+        scope: str,
+        generate: Callable[[int], Awaitable[list]],
+        needed: int,
+        key: Callable[[object], str] = dedup_key,
+        exclude: Iterable[str] = (),
+        capacity: Optional[int] = None,
+        near: Sequence[Tuple[NearDuplicateIndex, Callable[[object], str]]] = (),
+        user_id: Optional[str] = None,
+        ordered: bool = False,
+    ) -> list:
+        """
+        Collect `needed` items that this scope has not generated recently
+
+        Args:
+            scope: Filter name, normally the exercise type plus age band
+            generate: Async callable asking the model for a number of items and returning the parsed list
+            needed: Items to return
+            key: Maps an item to the string it is deduplicated on
+            exclude: Extra keys to treat as seen, e.g. a learner's history
+            capacity: Items this scope remembers (defaults to DEDUP_CAPACITY)
+            near: Near-duplicate indexes to check as well, each with the text of an item it compares;
+                items are looked up and remembered under this same scope
+            user_id: Learner the items are generated for; their filter is used instead of the shared one
+            ordered: The list's order matters (a word chain, easiest to hardest), so items
+                from different responses are never mixed; see _generate_ordered
+
+        Returns:
+            Up to `needed` items; if top-ups run out, repeats fill the remainder
+            rather than serving a short exercise
+        """
+        excluded = {dedup_key(item) for item in exclude}
+        if ordered:
+            kept = await self._generate_ordered(scope, generate, needed, key, excluded, near, user_id)
+            self._metrics["kept"] += len(kept)
+            self.add(scope, [key(item) for item in kept], capacity, user_id)
+            return kept
+
+        near_scope = user_scope(scope, user_id)
+        kept, kept_keys, repeats = [], set(), []
+
+        for attempt in range(1 + DEDUP_MAX_TOP_UPS):
+            missing = needed - len(kept)
+            if missing <= 0:
+                break
+            if attempt:
+                self._metrics["top_ups"] += 1
+            items = await generate(max(missing + 1, math.ceil(missing * DEDUP_OVER_REQUEST)))
+            if not items:
+                continue
+
+            for item in items:
+                item_key = key(item)
+                if not item_key or item_key in kept_keys:
+                    continue
+                if self._is_repeat(scope, item, item_key, excluded, near, user_id):
+                    repeats.append(item)
+                elif len(kept) < needed:
+                    kept.append(item)
+                    kept_keys.add(item_key)
+                    # Remembered straight away so near-duplicates within one response are caught too
+                    for index, text in near:
+                        index.add(text(item), near_scope)
+
+        for item in repeats:
+            if len(kept) >= needed:
+                break
+            if key(item) not in kept_keys:
+                kept.append(item)
+                kept_keys.add(key(item))
+                self._metrics["repeats_served"] += 1
+
+        self._metrics["kept"] += len(kept)
+        self.add(scope, kept_keys, capacity, user_id)
+        return kept
+
+    async def _generate_ordered(self, scope, generate, needed, key, excluded, near, user_id) -> list:
+        """
+        Items of a single response, in the order the model returned them
+
+        Repeats are dropped and the survivors keep their relative order. If too
+        few survive, the whole list is requested once more; when neither
+        response has enough, the one with the most new items is served as
+        returned, repeats included in their places, so the sequence stays whole.
+        """
+        best, best_new = [], -1
+        for attempt in range(1 + min(1, DEDUP_MAX_TOP_UPS)):
+            if attempt:
+                self._metrics["top_ups"] += 1
+            items = await generate(max(needed + 1, math.ceil(needed * DEDUP_OVER_REQUEST)))
+
+            entries, item_keys = [], set()
+            for item in items or []:
+                item_key = key(item)
+                if item_key and item_key not in item_keys:
+                    item_keys.add(item_key)
+                    entries.append((item, self._is_repeat(scope, item, item_key, excluded, near, user_id)))
+
+            survivors = [item for item, repeat in entries if not repeat]
+            if len(survivors) >= needed:
+                kept = survivors[:needed]
+                break
+            if len(survivors) > best_new:
+                best, best_new = entries, len(survivors)
+        else:
+            kept = [item for item, _ in best[:needed]]
+            self._metrics["repeats_served"] += sum(1 for _, repeat in best[:needed] if repeat)
+
+        for index, text in near:
+            for item in kept:
+                index.add(text(item), user_scope(scope, user_id))
+        return kept
+
+    def _is_repeat(self, scope, item, item_key, excluded, near, user_id) -> bool:
+        if item_key in excluded or self.seen(scope, item_key, user_id):
+            self._metrics["dropped"] += 1
+            return True
+        if any(index.find(text(item), user_scope(scope, user_id)) for index, text in near):
+            self._metrics["near_dropped"] += 1
+            return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "scopes": {scope: bloom.current.count + (bloom.previous.count if bloom.previous else 0)
+                       for scope, bloom in self._scopes.items()},
+            "user_filters": len(self._user_scopes),
+            **self._metrics,
+        }
+
+
+dedup_filter = DedupFilter()
@@ -0,0 +1,222 @@
+import os
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.utils.history_store import history_store, exercise_items
+from app.utils.tts_scheduler import tts_priority, BACKGROUND
+
+# Default band for exercises whose prompt does not depend on the learner's age
+DEFAULT_BAND = "all"
+
+# Age bands follow the thresholds the generators already use in their prompts;
+# each band is generated with a representative age.
+AGE_BANDS = {
+    "under-8": "6",
+    "8-11": "10",
+    "12-15": "13",
+    "16-plus": "18",
+}
+
+
+def age_band(age) -> str:
+    """Map a learner's age to the reservoir band it is served from"""
+    try:
+        age_int = int(age)
+    except (TypeError, ValueError):
+        return "8-11"
+
+    if age_int < 8:
+        return "under-8"
+    elif age_int < 12:
+        return "8-11"
+    elif age_int < 16:
+        return "12-15"
+    return "16-plus"
+
+
+def _has_content(exercise) -> bool:
+    """Reject empty fallbacks such as {"words": []} so they are never banked"""
+    if not exercise:
+        return False
+    if hasattr(exercise, "model_dump"):
+        exercise = exercise.model_dump()
+    if isinstance(exercise, dict):
+        return any(value for value in exercise.values())
+    return True
+
+
+class ExerciseReservoir:
+    """
+    Bounded queues of ready-made exercises per (exercise type, band)
+
+    GET handlers pop an exercise from the queue; when a queue drops to the low
+    watermark it is refilled in the background. Live generation only happens
+    when a queue is empty.
+
+    When a user_id is given, banked exercises that repeat anything from the
+    user's history are skipped (they stay banked for other learners) and the
+    served exercise is recorded in the history store. A live fallback for a
+    learner with history is generated with that history excluded.
+    """
+
+    def __init__(self, capacity: int = 5, low_watermark: int = 2, refill_concurrency: int = 4,
+                 fallback_attempts: int = 2):
+        self.capacity = capacity
+        self.fallback_attempts = max(1, fallback_attempts)
+        self.low_watermark = min(low_watermark, capacity)
+        self.refill_concurrency = refill_concurrency
+        self._generators = {}
+        self._queues: Dict[tuple, deque] = {}
+        self._refilling = set()
+        self._tasks = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._metrics = {}
+
+    def register(self, exercise_type: str, generator: Callable[[str], Awaitable], bands=None):
+        """
+        Register a generator for an exercise type
+
+        Args:
+            exercise_type: Name used in metrics and lookups
+            generator: Async callable taking the band name and returning one exercise; for a
+                learner's live fallback it is also given `exclude` (their recent items) and `user_id`
+            bands: Band names to keep warm (defaults to a single age-independent band)
+        """
+        bands = list(bands) if bands else [DEFAULT_BAND]
+        self._generators[exercise_type] = (generator, bands)
+        for band in bands:
+            self._queues.setdefault((exercise_type, band), deque(maxlen=self.capacity))
+        self._metrics.setdefault(exercise_type, {"hits": 0, "misses": 0, "generated": 0, "failures": 0, "seen_skips": 0})
+
+    async def get(self, exercise_type: str, band: str = DEFAULT_BAND, user_id: Optional[str] = None):
+        """Serve a banked exercise, falling back to live generation when no unseen one is queued"""
+        generator, _ = self._generators[exercise_type]
+        queue = self._queues.setdefault((exercise_type, band), deque(maxlen=self.capacity))
+        metrics = self._metrics[exercise_type]
+
+        recent = await history_store.recent(user_id, exercise_type) if user_id else []
+        seen = set(recent)
+        exercise = self._pop_unseen(queue, seen, metrics)
+        if exercise is not None:
+            metrics["hits"] += 1
+        else:
+            metrics["misses"] += 1
+            exercise = await self._generate_unseen(generator, band, queue, recent, user_id, metrics)
+
+        if len(queue) <= self.low_watermark:
+            self._schedule_refill(exercise_type, band)
+
+        if user_id and _has_content(exercise):
+            await history_store.record(user_id, exercise_type, exercise_items(exercise))
+
+        return exercise
+
+    async def _generate_unseen(self, generator, band: str, queue: deque, recent: list, user_id: Optional[str],
+                               metrics: dict):
+        """
+        Live-generate an exercise sharing nothing with the learner's recent items
+
+        The generator is asked to exclude them; a result that still repeats one
+        is banked for other learners and generated again, up to
+        `fallback_attempts` times, and the last result is served regardless.
+        """
+        if not recent:
+            return await generator(band)
+
+        seen = set(recent)
+        for attempt in range(self.fallback_attempts):
+            exercise = await generator(band, exclude=recent, user_id=user_id)
+            if not _has_content(exercise) or seen.isdisjoint(exercise_items(exercise)):
+                return exercise
+            metrics["seen_skips"] += 1
+            if attempt + 1 < self.fallback_attempts and len(queue) < self.capacity:
+                queue.append(exercise)
+        return exercise
+
+    def _pop_unseen(self, queue: deque, seen: set, metrics: dict):
+        """Remove and return the oldest banked exercise sharing no item with `seen`"""
+        for index, exercise in enumerate(queue):
+            if not seen or seen.isdisjoint(exercise_items(exercise)):
+                del queue[index]
+                return exercise
+            metrics["seen_skips"] += 1
+        return None
+
+    def prewarm(self):
+        """Start filling every registered queue in the background"""
+        for exercise_type, (_, bands) in self._generators.items():
+            for band in bands:
+                self._schedule_refill(exercise_type, band)
+
+    async def shutdown(self):
+        """Cancel outstanding refill tasks"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Per-type fill levels and hit metrics"""
+        stats = {}
+        for exercise_type, metrics in self._metrics.items():
+            _, bands = self._generators[exercise_type]
+            served = metrics["hits"] + metrics["misses"]
+            stats[exercise_type] = {
+                "fill": {band: len(self._queues[(exercise_type, band)]) for band in bands},
+                "capacity": self.capacity,
+                "low_watermark": self.low_watermark,
+                "hits": metrics["hits"],
+                "misses": metrics["misses"],
+                "hit_rate": round(metrics["hits"] / served, 3) if served else 0.0,
+                "generated": metrics["generated"],
+                "failures": metrics["failures"],
+                "seen_skips": metrics["seen_skips"],
+                "refilling": sorted(band for t, band in self._refilling if t == exercise_type),
+            }
+        return stats
+
+    def _schedule_refill(self, exercise_type: str, band: str):
+        key = (exercise_type, band)
+        if key in self._refilling:
+            return
+        self._refilling.add(key)
+        task = asyncio.create_task(self._refill(exercise_type, band))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refill(self, exercise_type: str, band: str):
+        generator, _ = self._generators[exercise_type]
+        queue = self._queues[(exercise_type, band)]
+        metrics = self._metrics[exercise_type]
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.refill_concurrency)
+        # Refills run in their own task, so this only lowers the priority of their own speech requests
+        tts_priority.set(BACKGROUND)
+
+        consecutive_failures = 0
+        try:
+            while len(queue) < self.capacity and consecutive_failures < 3:
+                async with self._semaphore:
+                    try:
+                        exercise = await generator(band)
+                    except Exception as e:
+                        print(f"Reservoir refill error for {exercise_type}/{band}: {e}")
+                        exercise = None
+
+                if _has_content(exercise):
+                    queue.append(exercise)
+                    metrics["generated"] += 1
+                    consecutive_failures = 0
+                else:
+                    metrics["failures"] += 1
+                    consecutive_failures += 1
+        finally:
+            self._refilling.discard((exercise_type, band))
+
+
+exercise_reservoir = ExerciseReservoir(
+    capacity=int(os.getenv("RESERVOIR_CAPACITY", "5")),
+    low_watermark=int(os.getenv("RESERVOIR_LOW_WATERMARK", "2")),
+    refill_concurrency=int(os.getenv("RESERVOIR_REFILL_CONCURRENCY", "4")),
+    fallback_attempts=int(os.getenv("RESERVOIR_FALLBACK_ATTEMPTS", "2")),
+)
@@ -0,0 +1,118 @@
+import math
+from typing import List, Optional
+
+from app.utils.phonetic_scoring import normalize_word, phonetic_similarity
+
+# Gaps between words at least this long count as pauses; at least LONG_PAUSE as hesitations
+PAUSE_SECONDS = 0.25
+LONG_PAUSE_SECONDS = 1.0
+# Words from segments below this confidence are flagged as unclear
+LOW_CONFIDENCE = 0.5
+
+# Words-per-minute bands for the precision drill pacing intervals
+PACE_TARGETS = {
+    "slow": (50, 90),
+    "medium": (90, 130),
+    "fast": (130, 180),
+}
+# Used when the learner did not say which interval they were recording
+NATURAL_PACE = (60, 180)
+
+
+def _word_confidence(word: dict, segments: List[dict]) -> Optional[float]:
+    """Whisper only scores segments; a word inherits the confidence of the segment it falls in"""
+    midpoint = (word["start"] + word["end"]) / 2
+    for segment in segments:
+        if segment["start"] <= midpoint <= segment["end"]:
+            return round(math.exp(segment["avg_logprob"]), 3)
+    return None
+
+
+def fluency_metrics(transcript: dict) -> dict:
+    """
+    Words-per-minute, pause distribution and per-word confidence from a verbose transcript
+
+    Args:
+        transcript: Result of convert_audio_to_text
+
+    Returns:
+        Metrics dict; timing values are None when Whisper returned no word timings
+    """
+    words = transcript.get("words") or []
+    segments = transcript.get("segments") or []
+
+    if not words:
+        return {
+            "word_count": len(transcript.get("text", "").split()),
+            "speaking_seconds": None,
+            "words_per_minute": None,
+            "pause_count": 0,
+            "long_pause_count": 0,
+            "mean_pause_seconds": 0.0,
+            "max_pause_seconds": 0.0,
+            "pause_ratio": 0.0,
+            "mean_confidence": None,
+            "word_confidence": [],
+            "low_confidence_words": [],
+        }
+
+    speaking_seconds = max(words[-1]["end"] - words[0]["start"], 0.01)
+    gaps = [max(0.0, nxt["start"] - cur["end"]) for cur, nxt in zip(words, words[1:])]
+    pauses = [gap for gap in gaps if gap >= PAUSE_SECONDS]
+
+    word_confidence = [
+        {"word": word["word"], "confidence": _word_confidence(word, segments)}
+        for word in words
+    ]
+    confidences = [entry["confidence"] for entry in word_confidence if entry["confidence"] is not None]
+
+    return {
+        "word_count": len(words),
+        "speaking_seconds": round(speaking_seconds, 2),
+        "words_per_minute": round(len(words) / speaking_seconds * 60, 1),
+        "pause_count": len(pauses),
+        "long_pause_count": sum(1 for gap in pauses if gap >= LONG_PAUSE_SECONDS),
+        "mean_pause_seconds": round(sum(pauses) / len(pauses), 2) if pauses else 0.0,
+        "max_pause_seconds": round(max(pauses), 2) if pauses else 0.0,
+        "pause_ratio": round(sum(pauses) / speaking_seconds, 3),
+        "mean_confidence": round(sum(confidences) / len(confidences), 3) if confidences else None,
+        "word_confidence": word_confidence,
+        "low_confidence_words": [
+            entry["word"] for entry in word_confidence
+            if entry["confidence"] is not None and entry["confidence"] < LOW_CONFIDENCE
+        ],
+    }
+
+
+def pace_score(words_per_minute: Optional[float], pace: Optional[str]) -> Optional[float]:
+    """1.0 inside the target band, falling off linearly to 0 at 50% outside it"""
+    if words_per_minute is None:
+        return None
+    low, high = PACE_TARGETS.get(pace, NATURAL_PACE)
+    if low <= words_per_minute <= high:
+        return 1.0
+    edge = low if words_per_minute < low else high
+    return max(0.0, 1.0 - abs(words_per_minute - edge) / (edge * 0.5))
+
+
+def match_target_words(targets: List[str], transcript: str) -> tuple:
+    """Split target words into (said, missed), accepting close phonetic matches"""
+    heard = [normalize_word(word) for word in transcript.split()]
+    heard = [word for word in heard if word]
+    said, missed = [], []
+    for target in targets:
+        word = normalize_word(target)
+        if word in heard or any(phonetic_similarity(word, h) >= 0.8 for h in heard):
+            said.append(target)
+        else:
+            missed.append(target)
+    return said, missed
+
+
+def pace_label(words_per_minute: Optional[float]) -> str:
+    if words_per_minute is None:
+        return "unknown"
+    for label, (low, high) in PACE_TARGETS.items():
+        if words_per_minute < high:
+            return label
+    return "fast"
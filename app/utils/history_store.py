@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+load_dotenv()
+
+# Fields that identify what an exercise asks for; options, meanings and audio URLs are left out
+ITEM_FIELDS = {
+    "word", "words", "word1", "word2", "phrase", "phrases", "sentence", "sentences",
+    "prefix", "root", "suffix", "slow", "medium", "fast", "scenario",
+}
+
+
+def exercise_items(exercise) -> List[str]:
+    """Normalized words/phrases/sentences an exercise is made of, in order and without repeats"""
+    if hasattr(exercise, "model_dump"):
+        exercise = exercise.model_dump()
+
+    items = []
+
+    def walk(value, take: bool):
+        if isinstance(value, str):
+            if take:
+                items.append(" ".join(value.lower().split()))
+        elif isinstance(value, dict):
+            for key, child in value.items():
+                walk(child, key in ITEM_FIELDS)
+        elif isinstance(value, (list, tuple)):
+            for child in value:
+                walk(child, take)
+
+    walk(exercise, True)
+    return list(dict.fromkeys(item for item in items if item))
+
+
+class HistoryStore(ABC):
+    """
+    Recently served exercise items per (user, exercise type)
+
+    Each key keeps a ring buffer of the last `size` items. Writes are collected
+    and handed to the backend in batches (every `flush_ms` or `batch_size`
+    items); reads merge the unflushed items so a worker always sees its own
+    writes. Backends implement _load and _store; a backend missing either
+    cannot be instantiated.
+    """
+
+    backend = "base"
+
+    def __init__(self, size: int = 200, flush_ms: int = 200, batch_size: int = 100):
+        self.size = size
+        self.flush_seconds = flush_ms / 1000
+        self.batch_size = batch_size
+        self._pending: Dict[tuple, List[str]] = {}
+        self._pending_count = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._metrics = {"reads": 0, "items_written": 0, "flushes": 0, "flush_errors": 0}
+
+    async def recent(self, user_id: str, exercise_type: str) -> List[str]:
+        """Items served to this user for this exercise type, oldest first"""
+        key = (user_id, exercise_type)
+        self._metrics["reads"] += 1
+        stored = await self._load(key)
+        return (stored + self._pending.get(key, []))[-self.size:]
+
+    async def record(self, user_id: str, exercise_type: str, items: List[str]):
+        """Remember items served to a user; persisted with the next batch"""
+        if not items:
+            return
+        self._pending.setdefault((user_id, exercise_type), []).extend(items)
+        self._pending_count += len(items)
+        self._metrics["items_written"] += len(items)
+
+        if self._pending_count >= self.batch_size:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def flush(self):
+        """Write all pending items to the backend in one batch"""
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_count = self._pending, {}, 0
+        try:
+            await self._store({key: items[-self.size:] for key, items in batch.items()})
+            self._metrics["flushes"] += 1
+        except Exception as e:
+            print(f"History store flush error ({self.backend}): {e}")
+            self._metrics["flush_errors"] += 1
+            # Keep the items for the next attempt, behind anything written since
+            for key, items in batch.items():
+                self._pending[key] = (items + self._pending.get(key, []))[-self.size:]
+            self._pending_count = sum(len(items) for items in self._pending.values())
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "size": self.size,
+            "pending_items": self._pending_count,
+            **self._metrics,
+        }
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.flush_seconds)
+        finally:
+            self._flush_task = None
+        await self.flush()
+
+    @abstractmethod
+    async def _load(self, key: tuple) -> List[str]:
+        """Stored items for a (user, exercise type) key, oldest first"""
+
+    @abstractmethod
+    async def _store(self, batch: Dict[tuple, List[str]]):
+        """Append each key's items, keeping the last `size`"""
+
+
+class MemoryHistoryStore(HistoryStore):
+    """Per-process ring buffers; the least recently active keys are dropped beyond max_keys"""
+
+    backend = "memory"
+
+    def __init__(self, max_keys: int = 100000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_keys = max_keys
+        self._buffers: "OrderedDict[tuple, deque]" = OrderedDict()
+
+    async def _load(self, key: tuple) -> List[str]:
+        buffer = self._buffers.get(key)
+        return list(buffer) if buffer else []
+
+    async def _store(self, batch: Dict[tuple, List[str]]):
+        for key, items in batch.items():
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = deque(maxlen=self.size)
+            buffer.extend(items)
+            self._buffers.move_to_end(key)
+        while len(self._buffers) > self.max_keys:
+            self._buffers.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "keys": len(self._buffers)}
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """
+    One row per (user, exercise type) holding its ring buffer as a JSON list
+
+    WAL mode lets every uvicorn worker on the host read while another writes.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, db_path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    async def _load(self, key: tuple) -> List[str]:
+        return await asyncio.to_thread(self._disk_load, key)
+
+    async def _store(self, batch: Dict[tuple, List[str]]):
+        await asyncio.to_thread(self._disk_store, batch)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "user_id TEXT, exercise_type TEXT, items TEXT, updated_at REAL, "
+                "PRIMARY KEY (user_id, exercise_type))"
+            )
+        return self._db
+
+    def _disk_load(self, key: tuple) -> List[str]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT items FROM history WHERE user_id = ? AND exercise_type = ?", key
+            ).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def _disk_store(self, batch: Dict[tuple, List[str]]):
+        with self._db_lock:
+            db = self._connect()
+            # One transaction per batch; the read-merge-write is atomic across workers
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                for (user_id, exercise_type), items in batch.items():
+                    row = db.execute(
+                        "SELECT items FROM history WHERE user_id = ? AND exercise_type = ?",
+                        (user_id, exercise_type),
+                    ).fetchone()
+                    merged = (json.loads(row[0]) if row else []) + items
+                    db.execute(
+                        "INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?)",
+                        (user_id, exercise_type, json.dumps(merged[-self.size:]), time.time()),
+                    )
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the handful of Redis list commands the history store uses
+
+    Lets the Redis backend run (and be exercised) without a server; state is
+    per-process, so it does not share history across workers.
+    """
+
+    def __init__(self):
+        self._lists: Dict[str, list] = {}
+
+    def pipeline(self, transaction: bool = True):
+        return _LocalPipeline(self)
+
+    async def lrange(self, name: str, start: int, end: int) -> list:
+        values = self._lists.get(name, [])
+        return values[start:] if end == -1 else values[start:end + 1]
+
+    async def rpush(self, name: str, *values):
+        self._lists.setdefault(name, []).extend(values)
+        return len(self._lists[name])
+
+    async def ltrim(self, name: str, start: int, end: int):
+        values = self._lists.get(name, [])
+        self._lists[name] = values[start:] if end == -1 else values[start:end + 1]
+        return True
+
+    async def expire(self, name: str, seconds: int):
+        return name in self._lists
+
+    async def aclose(self):
+        pass
+
+
+class _LocalPipeline:
+    def __init__(self, client: LocalRedis):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self._commands.append((name, args))
+            return self
+        return queue
+
+    async def execute(self):
+        return [await getattr(self._client, name)(*args) for name, args in self._commands]
+
+
+class RedisHistoryStore(HistoryStore):
+    """
+    Ring buffers as capped Redis lists (RPUSH + LTRIM), shared by every worker and host
+
+    A batch is sent as one pipeline. Keys expire after `ttl_seconds` without writes.
+    """
+
+    backend = "redis"
+
+    def __init__(self, client, ttl_seconds: int = 30 * 86400, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, key: tuple) -> str:
+        user_id, exercise_type = key
+        return f"history:{exercise_type}:{user_id}"
+
+    async def _load(self, key: tuple) -> List[str]:
+        values = await self.client.lrange(self._key(key), 0, -1)
+        return [value.decode("utf-8") if isinstance(value, bytes) else value for value in values]
+
+    async def _store(self, batch: Dict[tuple, List[str]]):
+        pipe = self.client.pipeline(transaction=False)
+        for key, items in batch.items():
+            name = self._key(key)
+            pipe.rpush(name, *items)
+            pipe.ltrim(name, -self.size, -1)
+            pipe.expire(name, self.ttl_seconds)
+        await pipe.execute()
+
+    async def close(self):
+        await super().close()
+        await self.client.aclose()
+
+
+def create_history_store() -> HistoryStore:
+    """Build the store selected by HISTORY_BACKEND (memory, sqlite or redis)"""
+    backend = os.getenv("HISTORY_BACKEND", "memory").lower()
+    options = {
+        "size": int(os.getenv("HISTORY_SIZE", "200")),
+        "flush_ms": int(os.getenv("HISTORY_FLUSH_MS", "200")),
+        "batch_size": int(os.getenv("HISTORY_BATCH_SIZE", "100")),
+    }
+
+    if backend == "sqlite":
+        return SQLiteHistoryStore(os.getenv("HISTORY_DB", "history.db"), **options)
+
+    if backend == "redis":
+        url = os.getenv("HISTORY_REDIS_URL")
+        if url and aioredis is not None:
+            client = aioredis.from_url(url, decode_responses=True)
+        else:
+            print("Warning: redis package or HISTORY_REDIS_URL missing; history uses an in-process Redis stand-in")
+            client = LocalRedis()
+        return RedisHistoryStore(client, **options)
+
+    return MemoryHistoryStore(**options)
+
+
+history_store = create_history_store()
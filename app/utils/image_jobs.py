@@ -0,0 +1,309 @@
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import sqlite3
+import threading
+from typing import Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Image generations running at once in this worker
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "2"))
+# Attempts per job before it is marked failed
+IMAGE_JOB_MAX_ATTEMPTS = int(os.getenv("IMAGE_JOB_MAX_ATTEMPTS", "3"))
+# Finished jobs are deleted after this many seconds
+IMAGE_JOB_TTL = int(os.getenv("IMAGE_JOB_TTL", "86400"))
+# A running job's lease: its worker renews it every third of this, and a job whose
+# lease lapses (the worker died) is picked up again by any live process
+IMAGE_JOB_LEASE_SECONDS = float(os.getenv("IMAGE_JOB_LEASE_SECONDS", "60"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class ImageJobQueue:
+    """
+    Background queue for slow image generations, persisted in SQLite
+
+    submit() stores the job and returns its id at once; a fixed number of
+    worker tasks run the registered handler for the job's kind, retrying with
+    backoff. Job state lives in the database, so any uvicorn worker on the
+    host can report it, and jobs that were queued or running when a process
+    stopped are resumed at the next start. A job is claimed with a
+    conditional UPDATE, so two processes never run the same one.
+
+    A claimed job holds a lease (its updated_at) that the worker renews while
+    the job runs. Every lease period each process requeues running jobs whose
+    lease has lapsed, so a job orphaned by a crashed worker is picked up
+    without waiting for a restart.
+    """
+
+    def __init__(self, db_path: str, workers: int = IMAGE_JOB_WORKERS, max_attempts: int = IMAGE_JOB_MAX_ATTEMPTS,
+                 lease_seconds: float = IMAGE_JOB_LEASE_SECONDS):
+        self.db_path = db_path
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.lease_seconds = max(1e-3, lease_seconds)
+        self._handlers: Dict[str, Callable[[dict], Awaitable[str]]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks = []
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._metrics = {"submitted": 0, "done": 0, "failed": 0, "retries": 0, "resumed": 0, "reclaimed": 0}
+
+    def register(self, kind: str, handler: Callable[[dict], Awaitable[str]]):
+        """
+        Handler takes the job payload and returns the image URL, or a dict with an
+        "image" URL plus any extra fields to report; raising or returning no image
+        counts as a failed attempt
+        """
+        self._handlers[kind] = handler
+
+    async def submit(self, kind: str, payload: dict) -> str:
+        """Persist a job and queue it; returns the job id"""
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self._insert, job_id, kind, payload)
+        self._metrics["submitted"] += 1
+        self._finished[job_id] = asyncio.Event()
+        self._ensure_workers()
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._select, job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[dict]:
+        """Job state once it finishes or `timeout` seconds pass, whichever is first"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in (DONE, FAILED) or remaining <= 0:
+                # The event only saves polling; later waiters for a job still running poll instead
+                self._finished.pop(job_id, None)
+                return job
+            event = self._finished.get(job_id)
+            if event is not None:
+                # Ran here: wake as soon as the worker finishes
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                # Ran by another process: poll the shared database
+                await asyncio.sleep(min(0.5, remaining))
+
+    def start(self):
+        """Start the workers, resume jobs left over from a previous run and watch for lapsed leases"""
+        self._ensure_workers()
+        self._worker_tasks.append(asyncio.create_task(self._resume()))
+        self._worker_tasks.append(asyncio.create_task(self._reap()))
+
+    async def shutdown(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._queue = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_attempts": self.max_attempts,
+            "lease_seconds": self.lease_seconds,
+            "queued_here": self._queue.qsize() if self._queue else 0,
+            **self._metrics,
+        }
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._worker_tasks.extend(asyncio.create_task(self._work()) for _ in range(self.workers))
+
+    async def _resume(self):
+        try:
+            job_ids = await asyncio.to_thread(self._pending_ids)
+        except Exception as e:
+            print(f"Image job resume error: {e}")
+            return
+        for job_id in job_ids:
+            self._metrics["resumed"] += 1
+            self._queue.put_nowait(job_id)
+        if job_ids:
+            print(f"[IMAGE JOBS] resumed {len(job_ids)} unfinished jobs")
+
+    async def _reap(self):
+        """Requeue running jobs whose lease lapsed, once per lease period"""
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                job_ids = await asyncio.to_thread(self._expired_ids)
+            except Exception as e:
+                print(f"Image job lease check error: {e}")
+                continue
+            # Every process may queue the same job; the conditional claim lets only one run it
+            for job_id in job_ids:
+                self._metrics["reclaimed"] += 1
+                self._queue.put_nowait(job_id)
+            if job_ids:
+                print(f"[IMAGE JOBS] reclaimed {len(job_ids)} jobs whose worker stopped")
+
+    async def _heartbeat(self, job_id: str):
+        """Renew a running job's lease until cancelled"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self._renew, job_id)
+            except Exception as e:
+                print(f"Image job {job_id} lease renewal error: {e}")
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"Image job {job_id} error: {e}")
+
+    async def _run(self, job_id: str):
+        try:
+            await self._attempt(job_id)
+        finally:
+            event = self._finished.pop(job_id, None)
+            if event is not None:
+                event.set()
+
+    async def _attempt(self, job_id: str):
+        job = await asyncio.to_thread(self._claim, job_id)
+        if job is None:
+            return  # finished, or claimed by another process
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            await self._execute(job_id, job)
+        finally:
+            heartbeat.cancel()
+
+    async def _execute(self, job_id: str, job: dict):
+        handler = self._handlers.get(job["kind"])
+        attempts, error, result = job["attempts"], "", {}
+        while attempts < self.max_attempts:
+            attempts += 1
+            try:
+                if handler is None:
+                    raise RuntimeError(f"no handler registered for {job['kind']}")
+                result = await handler(job["payload"])
+                if isinstance(result, str):
+                    result = {"image": result}
+                if result and result.get("image"):
+                    break
+                result = {}
+                error = "empty result"
+            except Exception as e:
+                error = str(e)
+            print(f"Image job {job_id} attempt {attempts} failed: {error}")
+            await asyncio.to_thread(self._update, job_id, RUNNING, attempts, "", error)
+            if attempts < self.max_attempts and handler is not None:
+                self._metrics["retries"] += 1
+                await asyncio.sleep(2 ** attempts + random.uniform(0, 1))
+            elif handler is None:
+                break
+
+        status = DONE if result else FAILED
+        self._metrics[status] += 1
+        await asyncio.to_thread(self._update, job_id, status, attempts, json.dumps(result) if result else "", "" if result else error)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS image_jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, payload TEXT, status TEXT, attempts INTEGER, "
+                "result TEXT, error TEXT, created_at REAL, updated_at REAL)"
+            )
+        return self._db
+
+    def _insert(self, job_id: str, kind: str, payload: dict):
+        now = time.time()
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                db.execute(
+                    "INSERT INTO image_jobs VALUES (?, ?, ?, ?, 0, '', '', ?, ?)",
+                    (job_id, kind, json.dumps(payload), QUEUED, now, now),
+                )
+                db.execute(
+                    "DELETE FROM image_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                    (DONE, FAILED, now - IMAGE_JOB_TTL),
+                )
+
+    def _select(self, job_id: str) -> Optional[dict]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT status, attempts, result, error FROM image_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, attempts, result, error = row
+        return {"job_id": job_id, "status": status, "attempts": attempts, "image": "", "error": error,
+                **(json.loads(result) if result else {})}
+
+    def _claim(self, job_id: str) -> Optional[dict]:
+        now = time.time()
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                claimed = db.execute(
+                    "UPDATE image_jobs SET status = ?, updated_at = ? "
+                    "WHERE id = ? AND (status = ? OR (status = ? AND updated_at < ?))",
+                    (RUNNING, now, job_id, QUEUED, RUNNING, now - self.lease_seconds),
+                ).rowcount
+                if not claimed:
+                    return None
+                kind, payload, attempts = db.execute(
+                    "SELECT kind, payload, attempts FROM image_jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+        return {"kind": kind, "payload": json.loads(payload), "attempts": attempts}
+
+    def _update(self, job_id: str, status: str, attempts: int, result: str, error: str):
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                db.execute(
+                    "UPDATE image_jobs SET status = ?, attempts = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                    (status, attempts, result, error, time.time(), job_id),
+                )
+
+    def _renew(self, job_id: str):
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                db.execute(
+                    "UPDATE image_jobs SET updated_at = ? WHERE id = ? AND status = ?",
+                    (time.time(), job_id, RUNNING),
+                )
+
+    def _pending_ids(self) -> list:
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT id FROM image_jobs WHERE status = ? OR (status = ? AND updated_at < ?) ORDER BY created_at",
+                (QUEUED, RUNNING, time.time() - self.lease_seconds),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _expired_ids(self) -> list:
+        with self._db_lock:
+            rows = self._connect().execute(
+                "SELECT id FROM image_jobs WHERE status = ? AND updated_at < ? ORDER BY created_at",
+                (RUNNING, time.time() - self.lease_seconds),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+image_jobs = ImageJobQueue(os.getenv("IMAGE_JOB_DB", "image_jobs.db"))
@@ -0,0 +1,144 @@
+import os
+import io
+import asyncio
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.utils.audio_store import AudioStore, AudioStaticFiles
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_DIR = Path(os.getenv("IMAGE_STORE_DIR", "generated_images"))
+IMAGE_VARIANT_SIZES = [int(size) for size in os.getenv("IMAGE_VARIANT_SIZES", "256,512,1024").split(",") if size.strip()]
+IMAGE_STORE_WORKERS = int(os.getenv("IMAGE_STORE_WORKERS", "2"))
+# File names are content hashes, so a served file never changes and can be cached for a year
+IMAGE_CACHE_MAX_AGE = int(os.getenv("IMAGE_CACHE_MAX_AGE", "31536000"))
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+if Image is None:
+    print("Pillow not installed; illustrations are stored as the original PNG without resized variants")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def render_variants(data: bytes, sizes: List[int]) -> Dict[str, bytes]:
+    """
+    Downscale one image to each size as WebP and JPEG
+
+    Runs in a worker process. Returns file suffix -> encoded bytes, e.g.
+    {"512.webp": ..., "512.jpg": ...}; sizes larger than the source are
+    encoded at the source size.
+    """
+    source = Image.open(io.BytesIO(data)).convert("RGB")
+    variants = {}
+    for size in sizes:
+        image = source.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+
+        webp = io.BytesIO()
+        image.save(webp, "WEBP", quality=WEBP_QUALITY, method=4)
+        variants[f"{size}.webp"] = webp.getvalue()
+
+        jpeg = io.BytesIO()
+        image.save(jpeg, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        variants[f"{size}.jpg"] = jpeg.getvalue()
+    return variants
+
+
+def build_image_url(filename: str) -> str:
+    """Public URL of a file served from the /images mount"""
+    domain = os.getenv("DOMAIN")
+    if domain:
+        return f"{domain}/images/{filename}"
+    host = os.getenv("API_HOST", "127.0.0.1")
+    port = os.getenv("API_PORT", "8061")
+    return f"http://{host}:{port}/images/{filename}"
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_STORE_WORKERS)
+    return _pool
+
+
+def _write_files(files: Dict[str, bytes]):
+    """Write each file to a temp name in the store directory and rename it into place"""
+    IMAGE_DIR.mkdir(exist_ok=True)
+    for name, data in files.items():
+        fd, tmp_name = tempfile.mkstemp(dir=IMAGE_DIR, prefix=".img_", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_name, IMAGE_DIR / name)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+            raise
+
+
+async def save_image(data: bytes) -> dict:
+    """
+    Store a generated image and its resized variants under a content-hash name
+
+    Returns:
+        {"image": url of the largest JPEG (or the original PNG without Pillow),
+         "variants": {size: {"webp": url, "jpg": url}}}
+    """
+    image_id = hashlib.sha256(data).hexdigest()[:32]
+
+    if Image is None:
+        files = {f"img_{image_id}.png": data}
+    else:
+        loop = asyncio.get_running_loop()
+        rendered = await loop.run_in_executor(_get_pool(), render_variants, data, IMAGE_VARIANT_SIZES)
+        files = {f"img_{image_id}_{suffix}": encoded for suffix, encoded in rendered.items()}
+
+    await asyncio.to_thread(_write_files, files)
+    for name, encoded in files.items():
+        image_files.record(name, len(encoded))
+
+    if Image is None:
+        return {"image": build_image_url(f"img_{image_id}.png"), "variants": {}}
+
+    variants = {
+        str(size): {fmt: build_image_url(f"img_{image_id}_{size}.{fmt}") for fmt in ("webp", "jpg")}
+        for size in IMAGE_VARIANT_SIZES
+    }
+    largest = str(max(IMAGE_VARIANT_SIZES))
+    return {"image": variants[largest]["jpg"], "variants": variants}
+
+
+def shutdown_image_store():
+    """Stop the worker processes when the app shuts down"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+class ImageStaticFiles(AudioStaticFiles):
+    """Serves stored illustrations with long-lived, immutable cache headers"""
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304):
+            response.headers["Cache-Control"] = f"public, max-age={IMAGE_CACHE_MAX_AGE}, immutable"
+        return response
+
+
+# Same size-bounded LRU as temp_audio, over the illustration files
+image_files = AudioStore(
+    directory=str(IMAGE_DIR),
+    max_bytes=int(float(os.getenv("IMAGE_STORE_MAX_MB", "1024")) * 1024 * 1024),
+    min_age_seconds=int(os.getenv("AUDIO_STORE_MIN_AGE_SECONDS", "300")),
+)
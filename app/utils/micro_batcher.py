@@ -0,0 +1,126 @@
+import os
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+# How long the first request of a batch waits for others to join
+MICRO_BATCH_WINDOW_MS = int(os.getenv("MICRO_BATCH_WINDOW_MS", "50"))
+# Most sets asked for in one call; a full batch is sent without waiting out the window
+MICRO_BATCH_MAX = int(os.getenv("MICRO_BATCH_MAX", "8"))
+
+_batchers = {}
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for an exercise set and generates them with one model call
+
+    The first caller opens a short window; everyone arriving during it shares
+    a single prompt asking for N distinct sets, and each caller gets one set.
+    Each batch runs as its own task, so callers arriving while earlier batches
+    are still generating open the next window straight away instead of
+    queueing behind them. The prompt does not list earlier sets; generators
+    drop repeats locally (see dedup_filter) before dealing sets out.
+    If the model returns fewer sets than asked, the shortfall is requested once
+    more before the remaining callers get the fallback (the same empty response
+    the generator used to return on a parse failure).
+    """
+
+    def __init__(self, name: str, generate_batch: Callable[[int], Awaitable[list]],
+                 fallback: Callable[[], object], window_ms: int = MICRO_BATCH_WINDOW_MS,
+                 max_batch: int = MICRO_BATCH_MAX):
+        self.name = name
+        self.generate_batch = generate_batch
+        self.fallback = fallback
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._waiting: List[asyncio.Future] = []
+        self._worker: Optional[asyncio.Task] = None
+        self._full: Optional[asyncio.Event] = None
+        self._batches = set()
+        self._metrics = {"requests": 0, "batches": 0, "upstream_calls": 0, "sets": 0, "fallbacks": 0, "errors": 0}
+        _batchers[name] = self
+
+    async def get(self):
+        """Wait for this caller's set from the next batch"""
+        if self._full is None:
+            self._full = asyncio.Event()
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append(future)
+        self._metrics["requests"] += 1
+
+        if len(self._waiting) >= self.max_batch:
+            self._full.set()
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._drain())
+
+        # Shield so a caller that goes away does not cancel the batch for everyone else
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        batches = self._metrics["batches"]
+        return {
+            **self._metrics,
+            "waiting": len(self._waiting),
+            "batches_in_flight": len(self._batches),
+            "window_ms": int(self.window * 1000),
+            "max_batch": self.max_batch,
+            "mean_batch_size": round(self._metrics["requests"] / batches, 2) if batches else 0.0,
+        }
+
+    async def _drain(self):
+        try:
+            # Give concurrent callers a moment to join, unless the batch is already full
+            try:
+                await asyncio.wait_for(self._full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+
+            # Everyone who joined during the window goes now, max_batch at a time;
+            # later callers start a new worker and window while these batches run
+            while self._waiting:
+                self._full.clear()
+                batch = self._waiting[:self.max_batch]
+                self._waiting = self._waiting[self.max_batch:]
+                task = asyncio.create_task(self._run_batch(batch))
+                # Keep a reference until it finishes; the event loop only holds weak ones
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+        finally:
+            self._worker = None
+
+    async def _run_batch(self, waiters: List[asyncio.Future]):
+        self._metrics["batches"] += 1
+        pending = list(waiters)
+        try:
+            for _ in range(2):
+                self._metrics["upstream_calls"] += 1
+                sets = await self.generate_batch(len(pending))
+                self._metrics["sets"] += len(sets)
+                for future, result in zip(pending, sets):
+                    if not future.done():
+                        future.set_result(result)
+                pending = pending[len(sets):]
+                if not pending:
+                    return
+                print(f"[BATCH] {self.name}: model returned {len(sets)} sets, {len(pending)} short")
+
+            for future in pending:
+                if not future.done():
+                    self._metrics["fallbacks"] += 1
+                    future.set_result(self.fallback())
+        except Exception as e:
+            print(f"[BATCH] {self.name} generation error: {e}")
+            self._metrics["errors"] += 1
+            for future in pending:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # Resolve anything left over (e.g. the batch task itself was cancelled)
+            for future in pending:
+                if not future.done():
+                    future.cancel()
+
+
+def batching_stats() -> dict:
+    """Per-generator batch sizes and upstream call counts"""
+    return {name: batcher.stats() for name, batcher in _batchers.items()}
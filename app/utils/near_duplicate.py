@@ -0,0 +1,188 @@
+import os
+import re
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Set, Tuple
+
+import numpy as np
+
+# Estimated Jaccard similarity at or above which two texts count as the same exercise
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+# Hash functions per MinHash signature; more is more accurate and slower
+MINHASH_PERMUTATIONS = int(os.getenv("MINHASH_PERMUTATIONS", "128"))
+# Texts remembered per index scope before the oldest is forgotten
+NEAR_DUP_CAPACITY = int(os.getenv("NEAR_DUP_CAPACITY", "5000"))
+# Scopes (e.g. one per learner) kept per index; the least recently used are forgotten beyond this
+NEAR_DUP_MAX_SCOPES = int(os.getenv("NEAR_DUP_MAX_SCOPES", "1000"))
+
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32
+_indexes = {}
+
+
+def shingles(text: str, size: int = 1) -> Set[str]:
+    """
+    Word n-grams of a normalized text
+
+    size=1 compares texts as bags of words, so reordered titles such as
+    "The Brave Little Fox" / "The Little Brave Fox" match; larger sizes
+    compare word order too, which suits longer passages.
+    """
+    words = re.sub(r"[^\w\s]", " ", str(text).lower().replace("'", "")).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _lsh_rows(num_perm: int, threshold: float) -> int:
+    """
+    Rows per LSH band, chosen so texts somewhat below the threshold already collide
+
+    With b bands of r rows, two texts become candidates around similarity
+    (1/b)**(1/r); aiming a little under the threshold keeps misses rare while
+    the exact signature comparison weeds out the extra candidates.
+    """
+    target = threshold * 0.75
+    divisors = [rows for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(divisors, key=lambda rows: abs((rows / num_perm) ** (1 / rows) - target))
+
+
+class _LSHTable:
+    """Signatures of one scope, bucketed by band so lookups only compare likely matches"""
+
+    def __init__(self, bands: int, rows: int, capacity: int):
+        self.bands = bands
+        self.rows = rows
+        self.capacity = capacity
+        self.entries: "OrderedDict[int, Tuple[str, np.ndarray]]" = OrderedDict()
+        self.buckets = [dict() for _ in range(bands)]
+        self._next_id = 0
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def candidates(self, signature: np.ndarray) -> Set[int]:
+        found = set()
+        for band, key in self._band_keys(signature):
+            found.update(self.buckets[band].get(key, ()))
+        return found
+
+    def add(self, text: str, signature: np.ndarray):
+        entry_id = self._next_id
+        self._next_id += 1
+        self.entries[entry_id] = (text, signature)
+        for band, key in self._band_keys(signature):
+            self.buckets[band].setdefault(key, set()).add(entry_id)
+
+        while len(self.entries) > self.capacity:
+            old_id, (_, old_signature) = self.entries.popitem(last=False)
+            for band, key in self._band_keys(old_signature):
+                bucket = self.buckets[band].get(key)
+                if bucket is not None:
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del self.buckets[band][key]
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of generated texts for one exercise type
+
+    Catches content that is nearly, not exactly, the same as something
+    generated recently (reordered titles, one word swapped in a sentence).
+    Each scope (e.g. an age band or a learner) has its own table, and at most
+    `max_scopes` tables are kept. Lookups hash the text
+    once and compare it only against texts sharing an LSH band, so they stay
+    well under a millisecond regardless of how many texts are remembered.
+    """
+
+    def __init__(self, name: str, shingle_size: int = 1, threshold: float = NEAR_DUP_THRESHOLD,
+                 capacity: int = NEAR_DUP_CAPACITY, num_perm: int = MINHASH_PERMUTATIONS, seed: int = 1,
+                 max_scopes: int = NEAR_DUP_MAX_SCOPES):
+        self.name = name
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.capacity = capacity
+        self.max_scopes = max_scopes
+        self.num_perm = num_perm
+        self.rows = _lsh_rows(num_perm, threshold)
+        self.bands = num_perm // self.rows
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self._tables: "OrderedDict[str, _LSHTable]" = OrderedDict()
+        self._metrics = {"lookups": 0, "matches": 0, "added": 0, "lookup_ms_total": 0.0}
+        _indexes[name] = self
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of the text's shingles, or None for empty text"""
+        grams = shingles(text, self.shingle_size)
+        if not grams:
+            return None
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest(), "little") for gram in grams),
+            dtype=np.uint64,
+            count=len(grams),
+        )
+        # Every (a * h + b) stays below 2**63, so uint64 arithmetic cannot overflow
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def find(self, text: str, scope: str = "") -> Optional[Tuple[str, float]]:
+        """The most similar remembered text at or above the threshold, with its estimated similarity"""
+        started = time.perf_counter()
+        self._metrics["lookups"] += 1
+        try:
+            table = self._tables.get(scope)
+            if table is not None:
+                self._tables.move_to_end(scope)
+            signature = self.signature(text)
+            if table is None or signature is None:
+                return None
+
+            best = None
+            for entry_id in table.candidates(signature):
+                other_text, other_signature = table.entries[entry_id]
+                similarity = float(np.mean(signature == other_signature))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (other_text, round(similarity, 3))
+            if best is not None:
+                self._metrics["matches"] += 1
+            return best
+        finally:
+            self._metrics["lookup_ms_total"] += (time.perf_counter() - started) * 1000
+
+    def add(self, text: str, scope: str = ""):
+        signature = self.signature(text)
+        if signature is None:
+            return
+        table = self._tables.get(scope)
+        if table is None:
+            table = self._tables[scope] = _LSHTable(self.bands, self.rows, self.capacity)
+            while len(self._tables) > self.max_scopes:
+                self._tables.popitem(last=False)
+        self._tables.move_to_end(scope)
+        table.add(text, signature)
+        self._metrics["added"] += 1
+
+    def stats(self) -> dict:
+        lookups = self._metrics["lookups"]
+        return {
+            "threshold": self.threshold,
+            "shingle_size": self.shingle_size,
+            "bands": self.bands,
+            "rows": self.rows,
+            "scopes": {scope: len(table.entries) for scope, table in self._tables.items() if "@" not in scope},
+            "learner_scopes": sum(1 for scope in self._tables if "@" in scope),
+            "lookups": lookups,
+            "matches": self._metrics["matches"],
+            "added": self._metrics["added"],
+            "mean_lookup_ms": round(self._metrics["lookup_ms_total"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+def near_duplicate_stats() -> dict:
+    """Per-index sizes, match counts and lookup latency"""
+    return {name: index.stats() for name, index in _indexes.items()}
@@ -0,0 +1,159 @@
+import os
+import asyncio
+import hashlib
+from typing import Optional
+
+import httpx
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Endpoints where identical concurrent requests are safe to answer with one upstream call
+COALESCED_PATHS = ("/chat/completions", "/audio/speech", "/images/generations")
+# Request header that opts a single call out of coalescing, e.g. a streamed TTS
+# response that must reach the client chunk by chunk rather than fully buffered
+SINGLE_FLIGHT_BYPASS_HEADER = "x-single-flight-bypass"
+# Headers describing the body as sent on the wire, which no longer apply once it is decoded
+_DECODED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class SingleFlightTransport(httpx.AsyncBaseTransport):
+    """
+    Transport that collapses identical in-flight requests into one upstream call
+
+    Concurrent POSTs with the same path, credentials and body wait on the first
+    one's response instead of each reaching OpenAI. Later requests are sent
+    normally once the first completes, so this never serves stale results.
+    Requests carrying SINGLE_FLIGHT_BYPASS_HEADER are passed straight through
+    with their response body unbuffered.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, paths=COALESCED_PATHS):
+        self._transport = transport
+        self._paths = tuple(paths)
+        self._in_flight = {}
+        self.metrics = {"executed": 0, "coalesced": 0, "passthrough": 0}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        bypass = SINGLE_FLIGHT_BYPASS_HEADER in request.headers
+        if bypass:
+            del request.headers[SINGLE_FLIGHT_BYPASS_HEADER]
+        if bypass or request.method != "POST" or not request.url.path.endswith(self._paths):
+            self.metrics["passthrough"] += 1
+            return await self._transport.handle_async_request(request)
+
+        body = await request.aread()
+        key = hashlib.sha256(b"\n".join([
+            request.url.raw_path,
+            request.headers.get("authorization", "").encode(),
+            body,
+        ])).hexdigest()
+
+        pending = self._in_flight.get(key)
+        if pending:
+            try:
+                status_code, headers, content = await asyncio.shield(pending)
+                self.metrics["coalesced"] += 1
+                return httpx.Response(status_code, headers=headers, content=content)
+            except asyncio.CancelledError:
+                # Only our own cancellation propagates; if the leading request was
+                # cancelled (client went away) we send the request ourselves
+                if not pending.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            response = await self._transport.handle_async_request(request)
+            try:
+                # aread() decodes gzip/br, so the copies are built from the decoded body
+                content = await response.aread()
+            finally:
+                await response.aclose()
+            self.metrics["executed"] += 1
+            # Without the encoding headers httpx would try to decode the body a second time
+            headers = [(name, value) for name, value in response.headers.multi_items()
+                       if name.lower() not in _DECODED_HEADERS]
+            result = (response.status_code, headers, content)
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else waited on is not logged twice
+            future.exception()
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+        return httpx.Response(result[0], headers=result[1], content=result[2])
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    def stats(self) -> dict:
+        upstream = self.metrics["executed"] + self.metrics["coalesced"]
+        return {
+            **self.metrics,
+            "in_flight": len(self._in_flight),
+            "coalesced_ratio": round(self.metrics["coalesced"] / upstream, 3) if upstream else 0.0,
+        }
+
+
+# Shared HTTP transport: every service reuses the same keep-alive pool instead of
+# opening its own connections to the OpenAI API.
+# Identical concurrent requests are coalesced unless OPENAI_SINGLE_FLIGHT=false.
+_single_flight = SingleFlightTransport(
+    httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=30,
+        ),
+    ),
+    paths=COALESCED_PATHS if os.getenv("OPENAI_SINGLE_FLIGHT", "true").lower() == "true" else (),
+)
+
+_http_client = httpx.AsyncClient(
+    transport=_single_flight,
+    timeout=httpx.Timeout(float(os.getenv("OPENAI_TIMEOUT", "60")), connect=10.0),
+)
+
+_default_client: Optional[openai.AsyncOpenAI] = None
+_keyed_clients = {}
+
+
+def get_openai_client(api_key: Optional[str] = None) -> openai.AsyncOpenAI:
+    """
+    Return the process-wide AsyncOpenAI client
+
+    Args:
+        api_key: Optional API key; a different key gets its own client on the shared transport
+
+    Returns:
+        AsyncOpenAI client backed by the pooled HTTP transport
+    """
+    global _default_client
+
+    default_key = os.getenv("OPENAI_API_KEY")
+    if api_key is None or api_key == default_key:
+        if _default_client is None:
+            _default_client = openai.AsyncOpenAI(api_key=default_key, http_client=_http_client)
+        return _default_client
+
+    if api_key not in _keyed_clients:
+        _keyed_clients[api_key] = openai.AsyncOpenAI(api_key=api_key, http_client=_http_client)
+    return _keyed_clients[api_key]
+
+
+async def close_openai_client():
+    """Close the shared HTTP transport when the app shuts down"""
+    await _http_client.aclose()
+
+
+def upstream_stats() -> dict:
+    """Executed vs coalesced upstream calls"""
+    return _single_flight.stats()
@@ -0,0 +1,300 @@
+import re
+import zlib
+from typing import List, Optional
+
+# Irregular high-frequency words the spelling rules below get wrong (ARPAbet, no stress)
+LEXICON = {
+    "the": ["DH", "AH"], "a": ["AH"], "of": ["AH", "V"], "to": ["T", "UW"], "do": ["D", "UW"],
+    "you": ["Y", "UW"], "was": ["W", "AH", "Z"], "said": ["S", "EH", "D"], "says": ["S", "EH", "Z"],
+    "one": ["W", "AH", "N"], "two": ["T", "UW"], "once": ["W", "AH", "N", "S"], "are": ["AA", "R"],
+    "were": ["W", "ER"], "have": ["HH", "AE", "V"], "give": ["G", "IH", "V"], "live": ["L", "IH", "V"],
+    "come": ["K", "AH", "M"], "some": ["S", "AH", "M"], "done": ["D", "AH", "N"], "gone": ["G", "AO", "N"],
+    "love": ["L", "AH", "V"], "move": ["M", "UW", "V"], "who": ["HH", "UW"], "what": ["W", "AH", "T"],
+    "where": ["W", "EH", "R"], "there": ["DH", "EH", "R"], "their": ["DH", "EH", "R"], "they": ["DH", "EY"],
+    "eye": ["AY"], "i": ["AY"], "friend": ["F", "R", "EH", "N", "D"], "does": ["D", "AH", "Z"],
+    "could": ["K", "UH", "D"], "would": ["W", "UH", "D"], "should": ["SH", "UH", "D"], "laugh": ["L", "AE", "F"],
+    "enough": ["IH", "N", "AH", "F"], "through": ["TH", "R", "UW"], "thought": ["TH", "AO", "T"],
+    "people": ["P", "IY", "P", "AH", "L"], "women": ["W", "IH", "M", "AH", "N"], "island": ["AY", "L", "AH", "N", "D"],
+}
+
+# Grapheme -> phonemes, longest spellings first
+_GRAPHEMES = [
+    ("tch", ["CH"]), ("igh", ["AY"]), ("dge", ["JH"]), ("tion", ["SH", "AH", "N"]), ("sion", ["ZH", "AH", "N"]),
+    ("ough", ["AO"]), ("augh", ["AO"]),
+    ("ch", ["CH"]), ("sh", ["SH"]), ("th", ["TH"]), ("ph", ["F"]), ("wh", ["W"]), ("ck", ["K"]), ("ng", ["NG"]),
+    ("qu", ["K", "W"]), ("gh", []), ("kn", ["N"]), ("wr", ["R"]), ("mb", ["M"]),
+    ("ee", ["IY"]), ("ea", ["IY"]), ("ie", ["IY"]), ("oo", ["UW"]), ("ou", ["AW"]), ("ow", ["OW"]),
+    ("ai", ["EY"]), ("ay", ["EY"]), ("ey", ["EY"]), ("oa", ["OW"]), ("oe", ["OW"]), ("oi", ["OY"]), ("oy", ["OY"]),
+    ("au", ["AO"]), ("aw", ["AO"]), ("ew", ["UW"]), ("ue", ["UW"]),
+    ("ar", ["AA", "R"]), ("or", ["AO", "R"]), ("er", ["ER"]), ("ir", ["ER"]), ("ur", ["ER"]),
+]
+
+_CONSONANTS = {
+    "b": ["B"], "d": ["D"], "f": ["F"], "g": ["G"], "h": ["HH"], "j": ["JH"], "k": ["K"], "l": ["L"],
+    "m": ["M"], "n": ["N"], "p": ["P"], "r": ["R"], "s": ["S"], "t": ["T"], "v": ["V"], "w": ["W"],
+    "x": ["K", "S"], "z": ["Z"],
+}
+_SHORT_VOWELS = {"a": "AE", "e": "EH", "i": "IH", "o": "AA", "u": "AH"}
+_LONG_VOWELS = {"a": "EY", "e": "IY", "i": "AY", "o": "OW", "u": "UW"}
+
+VOWEL_PHONEMES = {"AA", "AE", "AH", "AO", "AW", "AY", "EH", "ER", "EY", "IH", "IY", "OW", "OY", "UH", "UW"}
+
+# Phonemes listeners (and Whisper) confuse most; substituting within a group is half an error
+_SIMILAR_GROUPS = [
+    {"P", "B"}, {"T", "D"}, {"K", "G"}, {"F", "V"}, {"TH", "DH", "F", "S"}, {"S", "Z", "SH", "ZH"},
+    {"CH", "JH", "SH"}, {"M", "N", "NG"}, {"L", "R"}, {"W", "V"},
+]
+
+
+def normalize_word(text: str) -> str:
+    return re.sub(r"[^a-z']", "", text.lower()).replace("'", "")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in (normalize_word(word) for word in text.split()) if token]
+
+
+def to_phonemes(word: str) -> List[str]:
+    """Rule-based grapheme-to-phoneme conversion with a lexicon for irregular words"""
+    word = normalize_word(word)
+    if word in LEXICON:
+        return list(LEXICON[word])
+
+    # Silent final e lengthens the preceding vowel: "make", "time", "hope"
+    magic_e = len(word) > 2 and word.endswith("e") and word[-2] not in "aeiouy" and any(c in "aeiou" for c in word[:-2])
+    if magic_e:
+        word = word[:-1]
+
+    phonemes = []
+    i = 0
+    while i < len(word):
+        for grapheme, sounds in _GRAPHEMES:
+            if word.startswith(grapheme, i):
+                phonemes.extend(sounds)
+                i += len(grapheme)
+                break
+        else:
+            char = word[i]
+            following = word[i + 1] if i + 1 < len(word) else ""
+            if char in _SHORT_VOWELS:
+                phonemes.append(_SHORT_VOWELS[char])
+            elif char == "y":
+                phonemes.append("Y" if i == 0 else ("AY" if len(word) <= 3 else "IY"))
+            elif char == "c":
+                phonemes.append("S" if following in ("e", "i", "y") else "K")
+            elif char in _CONSONANTS and not (char == following):
+                phonemes.extend(_CONSONANTS[char])
+            i += 1
+
+    if magic_e:
+        for j in range(len(phonemes) - 1, -1, -1):
+            if phonemes[j] in VOWEL_PHONEMES:
+                vowel = next((c for c, p in _SHORT_VOWELS.items() if p == phonemes[j]), None)
+                if vowel:
+                    phonemes[j] = _LONG_VOWELS[vowel]
+                break
+    return phonemes
+
+
+def soundex(word: str) -> str:
+    """Classic four-character Soundex code"""
+    word = normalize_word(word)
+    if not word:
+        return ""
+    codes = {}
+    for letters, digit in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6")):
+        for letter in letters:
+            codes[letter] = digit
+
+    encoded = word[0].upper()
+    previous = codes.get(word[0], "")
+    for char in word[1:]:
+        digit = codes.get(char, "")
+        if digit and digit != previous:
+            encoded += digit
+        if char not in "hw":
+            previous = digit
+    return (encoded + "000")[:4]
+
+
+def consonant_skeleton(phonemes: List[str]) -> str:
+    """Metaphone-style key: the consonant sounds in order"""
+    return " ".join(p for p in phonemes if p not in VOWEL_PHONEMES)
+
+
+def _substitution_cost(a: str, b: str) -> float:
+    if a == b:
+        return 0.0
+    if a in VOWEL_PHONEMES and b in VOWEL_PHONEMES:
+        return 0.5
+    if any(a in group and b in group for group in _SIMILAR_GROUPS):
+        return 0.5
+    return 1.0
+
+
+def phoneme_distance(a: List[str], b: List[str]) -> float:
+    """Weighted Levenshtein distance between two phoneme sequences"""
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [float(i)] + [0.0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + _substitution_cost(a[i - 1], b[j - 1]),
+            )
+        previous = current
+    return previous[-1]
+
+
+def phoneme_substitutions(a: List[str], b: List[str]) -> List[tuple]:
+    """(position in a, phoneme in a, phoneme in b) for each substitution on a cheapest alignment"""
+    rows = [[float(j) for j in range(len(b) + 1)]]
+    for i in range(1, len(a) + 1):
+        row = [float(i)] + [0.0] * len(b)
+        for j in range(1, len(b) + 1):
+            row[j] = min(
+                rows[i - 1][j] + 1,
+                row[j - 1] + 1,
+                rows[i - 1][j - 1] + _substitution_cost(a[i - 1], b[j - 1]),
+            )
+        rows.append(row)
+
+    substitutions = []
+    i, j = len(a), len(b)
+    while i > 0 and j > 0:
+        if rows[i][j] == rows[i - 1][j - 1] + _substitution_cost(a[i - 1], b[j - 1]):
+            if a[i - 1] != b[j - 1]:
+                substitutions.append((i - 1, a[i - 1], b[j - 1]))
+            i, j = i - 1, j - 1
+        elif rows[i][j] == rows[i - 1][j] + 1:
+            i -= 1
+        else:
+            j -= 1
+    return list(reversed(substitutions))
+
+
+def is_minimal_pair(target: str, heard: str) -> bool:
+    """
+    Whether `heard` swaps a sound that changes the word ("cat"/"cut", "ship"/"sheep", "elephant"/"elegant")
+
+    Counts a substitution of the initial consonant, of the stressed vowel (taken
+    to be the first vowel, as in most English words) or of a consonant by an
+    unrelated one. Confusable consonants later in the word ("running"/"runnin")
+    and unstressed vowels ("colour"/"color") do not count.
+    """
+    target_phonemes = to_phonemes(target)
+    stressed = next((i for i, p in enumerate(target_phonemes) if p in VOWEL_PHONEMES), None)
+    for position, expected, said in phoneme_substitutions(target_phonemes, to_phonemes(heard)):
+        if position == stressed or (position == 0 and expected not in VOWEL_PHONEMES):
+            return True
+        if expected not in VOWEL_PHONEMES and _substitution_cost(expected, said) >= 1.0:
+            return True
+    return False
+
+
+def phonetic_similarity(target: str, heard: str) -> float:
+    """0.0 (nothing alike) to 1.0 (same sounds)"""
+    target_phonemes = to_phonemes(target)
+    heard_phonemes = to_phonemes(heard)
+    longest = max(len(target_phonemes), len(heard_phonemes))
+    if longest == 0:
+        return 0.0
+    similarity = 1.0 - phoneme_distance(target_phonemes, heard_phonemes) / longest
+    # Same Soundex and consonant skeleton: spelled differently, sounds the same ("their"/"there")
+    if soundex(target) == soundex(heard) and consonant_skeleton(target_phonemes) == consonant_skeleton(heard_phonemes):
+        similarity = max(similarity, 0.9)
+    return max(0.0, similarity)
+
+
+def _candidates(transcript: str) -> List[str]:
+    """Single transcript words plus adjacent pairs joined, for words Whisper splits ("sun flower")"""
+    tokens = tokenize(transcript)
+    return tokens + [tokens[i] + tokens[i + 1] for i in range(len(tokens) - 1)]
+
+
+_EXACT_FEEDBACK = [
+    "Great pronunciation!",
+    "Perfect, that was clear and accurate.",
+    "Excellent! You said it just right.",
+    "Well done, spot-on pronunciation.",
+]
+_CLOSE_FEEDBACK = [
+    "Very close! It sounded like \"{heard}\"; listen again to the sounds in \"{target}\".",
+    "Nearly there. We heard \"{heard}\"; try saying \"{target}\" a little more carefully.",
+    "Good try! \"{heard}\" is close to \"{target}\"; focus on each sound.",
+]
+_MINIMAL_PAIR_FEEDBACK = [
+    "That sounded like \"{heard}\", a different word from \"{target}\". Listen for the sound that changes and try again.",
+    "We heard \"{heard}\" instead of \"{target}\". One sound is different; listen closely and try again.",
+]
+_MISS_FEEDBACK = [
+    "It sounded like \"{heard}\" instead of \"{target}\". Listen to the word and try again.",
+    "We heard \"{heard}\". Try saying \"{target}\" slowly, one sound at a time.",
+    "That didn't sound like \"{target}\" yet. Listen again and give it another try.",
+]
+
+# Similarity at or above this is a clear (near-)match, at or below the lower bound a clear miss;
+# anything in between is left to the LLM
+CLEAR_MATCH = 0.8
+SAME_SOUND = 0.95
+CLEAR_MISS = 0.35
+# Highest score for saying a different word that differs by one contrasting sound
+MINIMAL_PAIR_SCORE = 4
+
+scoring_metrics = {"local": 0, "llm": 0, "minimal_pairs": 0}
+
+
+def _pick(templates: List[str], target: str, heard: str) -> str:
+    # Deterministic per (target, heard) so retries give the same answer, but varied across words
+    index = zlib.crc32(f"{target}|{heard}".encode("utf-8")) % len(templates)
+    return templates[index].format(target=target, heard=heard)
+
+
+def score_word(target: str, transcript: str) -> Optional[dict]:
+    """
+    Score a single spoken word against the Whisper transcript locally
+
+    Returns:
+        A score response dict (score 1-10, feedback, status, message) for clear
+        matches and mismatches, or None when the case is ambiguous and should
+        go to the LLM
+    """
+    target_word = normalize_word(target)
+    candidates = _candidates(transcript)
+    if not target_word or not candidates or " " in target.strip():
+        scoring_metrics["llm"] += 1
+        return None
+
+    if target_word in candidates:
+        score = 10 if tokenize(transcript) == [target_word] else 9
+        feedback = _pick(_EXACT_FEEDBACK, target_word, target_word)
+    else:
+        heard, similarity = max(((c, phonetic_similarity(target_word, c)) for c in candidates), key=lambda x: x[1])
+        heard_text = " ".join(tokenize(transcript)[:4])
+        if similarity >= CLEAR_MATCH and is_minimal_pair(target_word, heard):
+            # Close in sound but a different word: exactly the error the exercise is for
+            score = MINIMAL_PAIR_SCORE
+            feedback = _pick(_MINIMAL_PAIR_FEEDBACK, target.strip(), heard)
+            scoring_metrics["minimal_pairs"] += 1
+        elif similarity >= SAME_SOUND:
+            # A homophone or spelling variant of the target ("their"/"there")
+            score = 9
+            feedback = _pick(_EXACT_FEEDBACK, target_word, heard)
+        elif similarity >= CLEAR_MATCH:
+            score = max(6, min(8, round(similarity * 10) - 1))
+            feedback = _pick(_CLOSE_FEEDBACK, target.strip(), heard_text)
+        elif similarity <= CLEAR_MISS:
+            score = max(1, round(similarity * 10))
+            feedback = _pick(_MISS_FEEDBACK, target.strip(), heard_text)
+        else:
+            scoring_metrics["llm"] += 1
+            return None
+
+    scoring_metrics["local"] += 1
+    return {
+        "score": score,
+        "feedback": feedback,
+        "status": "success",
+        "message": "Evaluation completed successfully."
+    }
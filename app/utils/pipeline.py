@@ -0,0 +1,130 @@
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable
+
+
+class Pipeline:
+    """
+    Small async DAG executor for multi-stage exercise generation
+
+    Each stage declares the stages (or run inputs) it depends on and receives
+    their results as keyword arguments. Every stage starts as soon as its own
+    dependencies finish, so independent stages such as TTS and quiz generation
+    overlap instead of running one after another.
+
+    Example:
+        pipeline = Pipeline("sight_words")
+        pipeline.stage("words", pick_words, depends_on=["age"])
+        pipeline.stage("audio", make_audio, depends_on=["words"])
+        pipeline.stage("items", make_items, depends_on=["words", "age"])
+        results = await pipeline.run(age="6")
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._stages: Dict[str, tuple] = {}
+
+    def stage(self, name: str, func: Callable[..., Awaitable], depends_on: Iterable[str] = ()):
+        """Declare a stage; dependencies must be declared earlier or passed to run()"""
+        self._stages[name] = (func, list(depends_on))
+        return self
+
+    async def run(self, **inputs) -> dict:
+        """
+        Run all stages and return their results keyed by stage name
+
+        Per-stage timings are recorded in pipeline_metrics and logged.
+        """
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        timings: Dict[str, dict] = {}
+
+        async def run_stage(name: str, func, depends_on: list):
+            kwargs = {}
+            for dep in depends_on:
+                kwargs[dep] = await tasks[dep] if dep in tasks else inputs[dep]
+            stage_start = time.perf_counter()
+            try:
+                return await func(**kwargs)
+            finally:
+                stage_end = time.perf_counter()
+                timings[name] = {
+                    "start_ms": round((stage_start - started) * 1000, 1),
+                    "end_ms": round((stage_end - started) * 1000, 1),
+                    "duration_ms": round((stage_end - stage_start) * 1000, 1),
+                }
+
+        for name, (func, depends_on) in self._stages.items():
+            missing = [dep for dep in depends_on if dep not in tasks and dep not in inputs]
+            if missing:
+                raise ValueError(f"Stage '{name}' in pipeline '{self.name}' depends on unknown {missing}")
+            tasks[name] = asyncio.create_task(run_stage(name, func, depends_on))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        critical_path = self._critical_path(timings)
+        pipeline_metrics.record(self.name, timings, total_ms, critical_path)
+        print(f"[PIPELINE] {self.name} {total_ms}ms critical path: "
+              + " -> ".join(f"{stage} ({timings[stage]['duration_ms']}ms)" for stage in critical_path))
+
+        return {name: task.result() for name, task in tasks.items()}
+
+    def _critical_path(self, timings: dict) -> list:
+        """Walk back from the last stage to finish through its latest-finishing dependency"""
+        if not timings:
+            return []
+        current = max(timings, key=lambda stage: timings[stage]["end_ms"])
+        path = [current]
+        while True:
+            deps = [dep for dep in self._stages[current][1] if dep in timings]
+            if not deps:
+                break
+            current = max(deps, key=lambda stage: timings[stage]["end_ms"])
+            path.append(current)
+        return list(reversed(path))
+
+
+class PipelineMetrics:
+    """Running per-stage timing aggregates for every pipeline"""
+
+    def __init__(self):
+        self._pipelines = {}
+
+    def record(self, pipeline: str, timings: dict, total_ms: float, critical_path: list):
+        entry = self._pipelines.setdefault(pipeline, {"runs": 0, "total_ms": 0.0, "stages": {}, "critical_path_counts": {}})
+        entry["runs"] += 1
+        entry["total_ms"] += total_ms
+        for stage, timing in timings.items():
+            stage_entry = entry["stages"].setdefault(stage, {"total_ms": 0.0, "max_ms": 0.0})
+            stage_entry["total_ms"] += timing["duration_ms"]
+            stage_entry["max_ms"] = max(stage_entry["max_ms"], timing["duration_ms"])
+        path_key = " -> ".join(critical_path)
+        entry["critical_path_counts"][path_key] = entry["critical_path_counts"].get(path_key, 0) + 1
+
+    def stats(self) -> dict:
+        stats = {}
+        for pipeline, entry in self._pipelines.items():
+            runs = entry["runs"]
+            stats[pipeline] = {
+                "runs": runs,
+                "avg_total_ms": round(entry["total_ms"] / runs, 1),
+                "stages": {
+                    stage: {
+                        "avg_ms": round(stage_entry["total_ms"] / runs, 1),
+                        "max_ms": stage_entry["max_ms"],
+                    }
+                    for stage, stage_entry in entry["stages"].items()
+                },
+                "critical_paths": entry["critical_path_counts"],
+            }
+        return stats
+
+
+pipeline_metrics = PipelineMetrics()
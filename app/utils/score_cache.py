@@ -0,0 +1,144 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Optional
+
+
+def normalize_transcript(text: str) -> str:
+    """Case, punctuation and whitespace do not change a score"""
+    text = re.sub(r"[^\w\s']", " ", (text or "").lower()).replace("'", "")
+    return " ".join(text.split())
+
+
+class ScoreCache:
+    """
+    Cache of scoring results keyed by (endpoint, target, normalized transcript)
+
+    A bounded in-memory LRU with TTL in front of an optional SQLite tier, so
+    repeat evaluations survive restarts and are shared by workers on one host.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 86400, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+        self._metrics = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+    def make_key(self, endpoint: str, target: str, *transcripts: str) -> str:
+        payload = json.dumps([endpoint, target.strip().lower()] + [normalize_transcript(t) for t in transcripts])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self._metrics["hits"] += 1
+                return value
+            del self._entries[key]
+
+        if self.db_path:
+            row = await asyncio.to_thread(self._disk_get, key)
+            if row:
+                value, expires_at = row
+                self._remember(key, value, expires_at)
+                self._metrics["disk_hits"] += 1
+                return value
+
+        self._metrics["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: dict):
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, value, expires_at)
+        if self.db_path:
+            await asyncio.to_thread(self._disk_set, key, value, expires_at)
+
+    def stats(self) -> dict:
+        served = sum(self._metrics.values())
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_tier": bool(self.db_path),
+            **self._metrics,
+            "hit_rate": round((self._metrics["hits"] + self._metrics["disk_hits"]) / served, 3) if served else 0.0,
+        }
+
+    def _remember(self, key: str, value: dict, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+        return self._db
+
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM scores WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def _disk_set(self, key: str, value: dict, expires_at: float):
+        with self._db_lock:
+            db = self._connect()
+            db.execute("INSERT OR REPLACE INTO scores VALUES (?, ?, ?)", (key, json.dumps(value), expires_at))
+            self._writes += 1
+            # Expired rows are only ever skipped on read; sweep them now and then
+            if self._writes % 1000 == 0:
+                db.execute("DELETE FROM scores WHERE expires_at <= ?", (time.time(),))
+            db.commit()
+
+
+score_cache = ScoreCache(
+    max_entries=int(os.getenv("SCORE_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=int(os.getenv("SCORE_CACHE_TTL", "86400")),
+    db_path=os.getenv("SCORE_CACHE_DB") or None,
+)
+
+
+def cached_score(endpoint: str, target: Callable):
+    """
+    Cache a service's *_score method
+
+    The wrapped method must take (self, input, *transcripts) where every
+    argument after input is a transcript string. Only successful evaluations
+    are cached.
+
+    Args:
+        endpoint: Name that keeps different exercises' scores apart
+        target: Function returning the target text (word, sentence, ...) from the request
+    """
+    def decorator(func):
+        response_model = func.__annotations__["return"]
+
+        @wraps(func)
+        async def wrapper(self, input, *transcripts):
+            key = score_cache.make_key(endpoint, target(input), *transcripts)
+            cached = await score_cache.get(key)
+            if cached is not None:
+                return response_model(**cached)
+
+            response = await func(self, input, *transcripts)
+            if getattr(response, "status", None) == "success":
+                await score_cache.set(key, response.model_dump())
+            return response
+        return wrapper
+    return decorator
@@ -1,14 +1,25 @@
-import openai
 import os
-from typing import Optional
-from dotenv import load_dotenv
+import asyncio
+from typing import List, Optional
 from fastapi import UploadFile
+from app.utils.openai_client import get_openai_client
+from app.utils.audio_preprocess import preprocess_audio
 
-# Load environment variables
-load_dotenv()
+# Whisper calls in flight across all requests; batch and single transcriptions share it
+STT_MAX_CONCURRENCY = int(os.getenv("STT_MAX_CONCURRENCY", "8"))
+_transcription_semaphore: Optional[asyncio.Semaphore] = None
+
+# Recordings with less voiced audio than this are answered locally without Whisper or scoring
+MIN_SPEECH_SECONDS = float(os.getenv("MIN_SPEECH_SECONDS", "0.3"))
+
+
+def _get_transcription_semaphore() -> asyncio.Semaphore:
+    # Created lazily so it binds to the server's event loop, not the import-time one
+    global _transcription_semaphore
+    if _transcription_semaphore is None:
+        _transcription_semaphore = asyncio.Semaphore(STT_MAX_CONCURRENCY)
+    return _transcription_semaphore
 
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 async def convert_audio_to_text(audio_file: UploadFile, language: Optional[str] = None) -> dict:
     """
@@ -19,28 +30,99 @@ async def convert_audio_to_text(audio_file: UploadFile, language: Optional[str]
         language: Optional language code for recognition
         
     Returns:
-        Dictionary with text and success status
+        Dictionary with text and success status; no_speech is True when the
+        recording was empty, silent or too short to score. Successful results
+        also carry duration, word timings and segment log probabilities.
     """
     try:
         await audio_file.seek(0)
+        if not await audio_file.read(1):
+            return _no_speech_result()
+        await audio_file.seek(0)
+        
+        # 16 kHz mono Opus with the silence trimmed is usually a fraction of the upload
+        upload = audio_file.file
+        prepared = await preprocess_audio(audio_file)
+        if prepared and prepared["voiced_duration"] < MIN_SPEECH_SECONDS:
+            return _no_speech_result()
+        if prepared and prepared["audio"] and len(prepared["audio"]) < prepared["original_size"]:
+            upload = ("audio.ogg", prepared["audio"])
         
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file.file,
-            language=language
-        )
+        client = get_openai_client()
+        async with _get_transcription_semaphore():
+            # verbose_json adds word timings and per-segment log probabilities at no extra cost
+            transcript = await client.audio.transcriptions.create(
+                model="whisper-1",
+                file=upload,
+                language=language,
+                response_format="verbose_json",
+                timestamp_granularities=["word", "segment"]
+            )
+        
+        if not transcript.text.strip():
+            return _no_speech_result()
         
         return {
             "text": transcript.text,
             "success": True,
-            "message": "Audio successfully converted to text"
+            "no_speech": False,
+            "message": "Audio successfully converted to text",
+            "duration": transcript.duration,
+            "words": [{"word": w.word, "start": w.start, "end": w.end} for w in transcript.words or []],
+            "segments": [
+                {"start": seg.start, "end": seg.end, "avg_logprob": seg.avg_logprob, "no_speech_prob": seg.no_speech_prob}
+                for seg in transcript.segments or []
+            ]
         }
         
     except Exception as e:
         return {
             "text": "",
             "success": False,
+            "no_speech": False,
             "message": f"Error converting audio to text: {str(e)}"
         }
+
+
+def _no_speech_result() -> dict:
+    return {
+        "text": "",
+        "success": True,
+        "no_speech": True,
+        "message": "No speech detected"
+    }
+
+
+def no_speech_response() -> dict:
+    """Score response for recordings without usable speech; matches every speaking/presentation response model"""
+    return {
+        "score": 0,
+        "feedback": "We couldn't hear you. Please try again and speak clearly into the microphone.",
+        "status": "no_speech",
+        "message": "No speech detected in the recording"
+    }
+
+
+def transcription_error_response(transcript: dict) -> dict:
+    """Score response for recordings Whisper could not transcribe; the learner is not scored on an empty transcript"""
+    return {
+        "score": 0,
+        "feedback": "We couldn't process your recording. Please try again in a moment.",
+        "status": "error",
+        "message": transcript["message"]
+    }
+
+
+async def convert_audio_files_to_text(audio_files: List[UploadFile], language: Optional[str] = None) -> List[dict]:
+    """
+    Transcribe several uploads concurrently
     
-  
\ No newline at end of file
+    Args:
+        audio_files: Uploaded audio files from FastAPI
+        language: Optional language code for recognition
+        
+    Returns:
+        One result per file, in input order, each shaped like convert_audio_to_text's;
+        a failed file reports success=False without affecting the others
+    """
+    return await asyncio.gather(*(convert_audio_to_text(audio_file, language) for audio_file in audio_files))
@@ -1,40 +1,19 @@
 import os
-import time
 import asyncio
-from pathlib import Path
+from app.utils.audio_store import audio_store
 
 async def start_cleanup_service():
-    """Clean temp audio files every 6 hours"""
+    """Index temp_audio at startup, then periodically reconcile with files written by other workers"""
+    rescan_interval = int(os.getenv("AUDIO_STORE_RESCAN_SECONDS", "600"))
+
     while True:
         try:
-            cleanup_temp_files()
-            await asyncio.sleep(6 * 3600)  # Wait 6 hours
+            await audio_store.rebuild()
+            stats = audio_store.stats()
+            print(f"Audio store: {stats['files']} files, {stats['total_bytes']} bytes of {stats['max_bytes']}")
+            await asyncio.sleep(rescan_interval)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Cleanup error: {e}")
-            await asyncio.sleep(3600)  # Wait 1 hour on error
-
-def cleanup_temp_files():
-    """Delete audio files older than 6 hours from temp_audio directory"""
-    temp_dir = Path("temp_audio")
-    
-    if not temp_dir.exists():
-        print("temp_audio directory does not exist, creating it...")
-        temp_dir.mkdir(exist_ok=True)
-        return
-    
-    cutoff_time = time.time() - (6 * 3600)  # 6 hours ago
-    deleted = 0
-    
-    for file_path in temp_dir.glob("*.mp3"):
-        if file_path.stat().st_mtime < cutoff_time:
-            try:
-                file_path.unlink()
-                deleted += 1
-                print(f"Deleted old audio file: {file_path}")
-            except OSError as e:
-                print(f"Failed to delete {file_path}: {e}")
-    
-    if deleted > 0:
-        print(f"Cleanup completed: {deleted} old audio files deleted")
-    else:
-        print("No old audio files to clean up")
\ No newline at end of file
+            await asyncio.sleep(60)  # Retry sooner on error
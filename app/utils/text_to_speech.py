@@ -1,111 +1,205 @@
-import openai
 import os
-from typing import Optional
+import asyncio
+from typing import Dict, Optional
 from dotenv import load_dotenv
-from fastapi.responses import StreamingResponse
-import io
+from fastapi.responses import FileResponse, StreamingResponse
+from app.utils.openai_client import get_openai_client, SINGLE_FLIGHT_BYPASS_HEADER
+from app.utils.audio_cache import cached_audio_path, lookup_cached_audio, AudioFileWriter, build_audio_url
+from app.utils.tts_scheduler import tts_scheduler, INTERACTIVE
 
 load_dotenv()
 
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+TTS_MODEL = os.getenv("TTS_MODEL", "tts-1")
+TTS_FORMAT = "mp3"
+# Bytes forwarded per chunk when streaming speech to the client
+TTS_STREAM_CHUNK_SIZE = int(os.getenv("TTS_STREAM_CHUNK_SIZE", "16384"))
 
-async def convert_text_to_speech(text: str, voice: Optional[str] = "alloy") -> dict:
+# Cache file name -> synthesis in progress in this process
+_in_flight_audio: Dict[str, asyncio.Future] = {}
+
+def _speech_client():
+    """Shared client without SDK retries; tts_scheduler retries with the process-wide rate limit in mind"""
+    return get_openai_client().with_options(max_retries=0)
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """StreamingResponse that runs `on_close` once it is done, even if the body was never sent"""
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Starlette neither closes the body nor runs background tasks after a disconnect
+            await self.body_iterator.aclose()
+            await self._on_close()
+
+async def stream_text_to_speech(text: str, voice: str = "alloy", cache: bool = True):
     """
-    Convert text to speech using OpenAI TTS
+    Stream speech to the client as OpenAI synthesizes it
+    
+    Cached clips are served straight from disk. On a miss, upstream chunks are
+    forwarded as they arrive (the single-flight transport is bypassed so the
+    body is not buffered first) and, when `cache` is set, kept and written to
+    the audio cache, chunk by chunk, and published once the clip has been
+    received in full. A client that disconnects early leaves nothing behind
+    in the cache, and the upstream stream is closed however the response ends.
     
     Args:
         text: Text to convert to speech
-        voice: Optional voice selection (alloy, echo, fable, onyx, nova, shimmer)
+        voice: Voice selection (alloy, echo, fable, onyx, nova, shimmer)
+        cache: Tee the streamed clip into the audio cache
         
     Returns:
-        Dictionary with audio data and success status
+        FileResponse on a cache hit, otherwise a StreamingResponse
+        
+    Raises:
+        openai.APIError: If the upstream request fails before any audio is sent
     """
-    try:
-        response = client.audio.speech.create(
-            model="tts-1",
+    file_path = cached_audio_path(text, voice, TTS_MODEL, TTS_FORMAT)
+    if lookup_cached_audio(file_path):
+        return FileResponse(file_path, media_type="audio/mpeg", headers={"X-Audio-Cache": "hit"})
+    
+    client = _speech_client()
+    
+    opened = []
+    
+    async def open_upstream():
+        upstream = client.audio.speech.with_streaming_response.create(
+            model=TTS_MODEL,
             voice=voice,
-            input=text
+            input=text,
+            response_format=TTS_FORMAT,
+            extra_headers={SINGLE_FLIGHT_BYPASS_HEADER: "1"}
         )
+        response = await upstream.__aenter__()
+        opened.append(upstream)
+        return response
+    
+    async def close_upstream():
+        while opened:
+            await opened.pop().__aexit__(None, None, None)
+    
+    # Opened here so upstream errors surface before the response status is sent.
+    # The scheduler slot covers the request only; the body streams at the client's pace.
+    try:
+        response = await tts_scheduler.run(open_upstream, INTERACTIVE)
+    except BaseException:
+        await close_upstream()
+        raise
+    
+    async def forward_chunks():
+        writer = AudioFileWriter(file_path) if cache else None
+        complete = False
+        try:
+            async for chunk in response.iter_bytes(TTS_STREAM_CHUNK_SIZE):
+                if writer is not None:
+                    await writer.write(chunk)
+                yield chunk
+            complete = True
+        finally:
+            await close_upstream()
+            if writer is not None:
+                await (writer.commit() if complete else writer.abort())
+    
+    return _ClosingStreamingResponse(forward_chunks(), close_upstream, media_type="audio/mpeg",
+                                     headers={"X-Audio-Cache": "miss"})
 
-        audio_buffer = io.BytesIO()
-        for chunk in response.iter_bytes():
-            audio_buffer.write(chunk)
-        audio_buffer.seek(0)
-        
-        return {
-            "audio": audio_buffer,
-            "success": True,
-            "message": "Text successfully converted to speech"
-        }
-        
-    except Exception as e:
-        return {
-            "audio": None,
-            "success": False,
-            "message": f"Error converting text to speech: {str(e)}"
-        }
-
-def create_audio_response(audio_buffer: io.BytesIO) -> StreamingResponse:
+async def synthesize_audio_file(text: str, voice: str = "alloy", priority: Optional[int] = None) -> str:
     """
-    Create a streaming response for audio playback
+    URL of the cached clip for a text, synthesizing it straight to disk on a miss
     
-    Args:
-        audio_buffer: BytesIO object containing audio data
-        
-    Returns:
-        StreamingResponse for audio playback
+    The upstream response is streamed into the cache file chunk by chunk, so
+    memory use does not grow with clip length or burst size. Concurrent
+    requests for the same clip in this process share one synthesis, and
+    syntheses go through tts_scheduler at the given priority (the task's
+    tts_priority by default).
+    
+    Raises:
+        Exception: If synthesis fails; no partial file is left behind
     """
-    return StreamingResponse(
-        io.BytesIO(audio_buffer.read()),
-        media_type="audio/mpeg",
-        headers={"Content-Disposition": "attachment; filename=speech.mp3"}
-    )
+    file_path = cached_audio_path(text, voice, TTS_MODEL, TTS_FORMAT)
+    cached_url = lookup_cached_audio(file_path)
+    if cached_url:
+        return cached_url
+    
+    pending = _in_flight_audio.get(file_path.name)
+    if pending:
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # Only our own cancellation propagates; if the leading request was cancelled we synthesize ourselves
+            if not pending.cancelled():
+                raise
+    
+    future = asyncio.get_running_loop().create_future()
+    _in_flight_audio[file_path.name] = future
+    try:
+        await tts_scheduler.run(lambda: _stream_speech_to_file(text, voice, file_path), priority)
+        url = build_audio_url(file_path.name)
+        future.set_result(url)
+        return url
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        # Mark retrieved so a failure nobody else waited on is not logged twice
+        future.exception()
+        raise
+    finally:
+        if _in_flight_audio.get(file_path.name) is future:
+            del _in_flight_audio[file_path.name]
 
-async def generate_parallel_audio_files(texts: list, prefix: str = "audio") -> list:
+async def _stream_speech_to_file(text: str, voice: str, file_path):
+    client = _speech_client()
+    writer = AudioFileWriter(file_path)
+    try:
+        # Bypass single-flight, which would buffer the whole body; duplicates are shared above instead
+        async with client.audio.speech.with_streaming_response.create(
+            model=TTS_MODEL,
+            voice=voice,
+            input=text,
+            response_format=TTS_FORMAT,
+            extra_headers={SINGLE_FLIGHT_BYPASS_HEADER: "1"}
+        ) as response:
+            async for chunk in response.iter_bytes(TTS_STREAM_CHUNK_SIZE):
+                await writer.write(chunk)
+        if not writer.size:
+            raise RuntimeError("empty audio response")
+        await writer.commit()
+    except BaseException:
+        await writer.abort()
+        raise
+
+async def generate_parallel_audio_files(texts: list, prefix: str = "audio", voice: str = "alloy",
+                                       priority: Optional[int] = None) -> list:
     """
     Generate TTS audio files for multiple texts in parallel
     
+    Files are content-addressed by (text, voice, model, format), so repeated
+    texts are served from disk without calling the TTS API again. Misses are
+    queued on tts_scheduler, which starts them in the order given and keeps
+    the whole process under the TTS rate limit.
+    
     Args:
         texts: List of text strings to convert to speech
-        prefix: Prefix for the generated filenames
+        prefix: Label used in log messages
+        voice: Voice used for every text
+        priority: INTERACTIVE or BACKGROUND (defaults to the task's tts_priority)
         
     Returns:
-        List of file paths to generated audio files
+        One URL per text, in the same order; "" where synthesis failed
     """
-    import asyncio
-    from pathlib import Path
-    
     async def create_single_audio_file(text: str, index: int) -> str:
-        """Create a single TTS audio file"""
+        """Return the cached TTS audio file for a text, synthesizing it on a miss"""
         try:
-            result = await convert_text_to_speech(text)
-            
-            if not result["success"]:
-                print(f"TTS failed for {prefix} {index}: {result['message']}")
-                return None
-
-            temp_dir = Path("temp_audio")
-            temp_dir.mkdir(exist_ok=True)
-            
-            filename = f"{prefix}_{index}_{hash(text) % 10000}.mp3"
-            file_path = temp_dir / filename
-
-            with open(file_path, "wb") as f:
-                f.write(result["audio"].getvalue())
-            
-            domain = os.getenv("DOMAIN")
-            if domain:
-                return f"{domain}/temp_audio/{filename}"
-            else:
-                host = os.getenv("API_HOST", "127.0.0.1")
-                port = os.getenv("API_PORT", "8061")
-                return f"http://{host}:{port}/temp_audio/{filename}"
-            
+            return await synthesize_audio_file(text, voice, priority)
         except Exception as e:
-            print(f"Error creating audio file for {prefix} {index}: {e}")
-            return None
+            print(f"TTS failed for {prefix} {index}: {e}")
+            return ""
     
     tasks = [create_single_audio_file(text, i) for i, text in enumerate(texts)]
-    audio_files = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    return [file_path for file_path in audio_files if isinstance(file_path, str)]
+    return list(await asyncio.gather(*tasks))
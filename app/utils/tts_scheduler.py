@@ -0,0 +1,197 @@
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Speech requests started per minute across this worker
+TTS_RPM = float(os.getenv("TTS_RPM", "500"))
+# Requests that may start back to back before the per-minute rate applies
+TTS_BURST = int(os.getenv("TTS_BURST", "20"))
+# Speech requests in flight at once
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "16"))
+# Retries of one request after a 429 or a transient upstream error
+TTS_MAX_RETRIES = int(os.getenv("TTS_MAX_RETRIES", "3"))
+# Longest pause taken after a 429, whatever Retry-After says
+TTS_MAX_BACKOFF_SECONDS = 30.0
+
+# Lower runs first; within a priority requests start in arrival order
+INTERACTIVE, BACKGROUND = 0, 1
+_PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Priority of speech requests made from the current task; background work such
+# as reservoir refills sets BACKGROUND so it yields to learners waiting on a response
+tts_priority: ContextVar[int] = ContextVar("tts_priority", default=INTERACTIVE)
+
+T = TypeVar("T")
+
+_RETRYABLE = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the API asked us to wait, if it said so"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = response.headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass
+    return None
+
+
+class TTSScheduler:
+    """
+    Process-wide gate in front of the speech API
+
+    Every synthesis takes a token from a bucket refilled at `rpm` per minute
+    and one of `concurrency` slots. Waiting requests are started by priority,
+    then in arrival order, so a learner's request is never queued behind a
+    background refill and the clips of one request start in the order given.
+    A 429 pauses all dispatching for the Retry-After time (or an exponential
+    backoff) and the request is retried with jitter, so a burst slows down
+    instead of losing audio.
+    """
+
+    def __init__(self, rpm: float = TTS_RPM, burst: int = TTS_BURST,
+                 concurrency: int = TTS_MAX_CONCURRENCY, max_retries: int = TTS_MAX_RETRIES):
+        self.rate = max(rpm, 1.0) / 60
+        self.burst = max(1, burst)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._active = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._metrics = {"started": 0, "rate_limited": 0, "retries": 0, "failed": 0}
+        self._wait_ms = {name: [0, 0.0] for name in _PRIORITY_NAMES.values()}
+
+    async def run(self, call: Callable[[], Awaitable[T]], priority: Optional[int] = None) -> T:
+        """
+        Run one speech request under the rate limit, retrying 429s and transient errors
+
+        Args:
+            call: Coroutine factory making the request; called again for each retry
+            priority: INTERACTIVE or BACKGROUND (defaults to the task's tts_priority)
+
+        Returns:
+            Whatever `call` returns
+        """
+        priority = tts_priority.get() if priority is None else priority
+        attempt = 0
+        while True:
+            await self._acquire(priority)
+            try:
+                return await call()
+            except _RETRYABLE as e:
+                if attempt >= self.max_retries:
+                    self._metrics["failed"] += 1
+                    raise
+                backoff = min(TTS_MAX_BACKOFF_SECONDS, 2 ** attempt)
+                if isinstance(e, openai.RateLimitError):
+                    self._metrics["rate_limited"] += 1
+                    backoff = min(TTS_MAX_BACKOFF_SECONDS, _retry_after(e) or backoff)
+                    self._pause(backoff)
+            except Exception:
+                self._metrics["failed"] += 1
+                raise
+            finally:
+                self._release()
+
+            attempt += 1
+            self._metrics["retries"] += 1
+            # Full jitter keeps retries of one burst from arriving together again
+            await asyncio.sleep(random.uniform(0, backoff))
+
+    def stats(self) -> dict:
+        self._refill(time.monotonic())
+        waiting = {name: 0 for name in _PRIORITY_NAMES.values()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                waiting[_PRIORITY_NAMES[priority]] += 1
+        return {
+            "rpm": round(self.rate * 60),
+            "burst": self.burst,
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "tokens": round(max(0.0, self._tokens), 2),
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "waiting": waiting,
+            "mean_wait_ms": {name: round(total / count, 1) if count else 0.0
+                             for name, (count, total) in self._wait_ms.items()},
+            **self._metrics,
+        }
+
+    async def _acquire(self, priority: int):
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just before we were cancelled: hand the slot back
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        stat = self._wait_ms[_PRIORITY_NAMES[priority]]
+        stat[0] += 1
+        stat[1] += (time.perf_counter() - started) * 1000
+
+    def _release(self):
+        self._active -= 1
+        self._dispatch()
+
+    def _pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        # The bucket starts refilling from empty only once the pause is over
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _dispatch(self):
+        """Start as many waiting requests as the slots and tokens allow"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                heapq.heappop(self._waiters)  # cancelled while waiting
+                continue
+            if self._active >= self.concurrency:
+                return  # a release dispatches again
+
+            now = time.monotonic()
+            self._refill(now)
+            delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+
+            heapq.heappop(self._waiters)
+            self._tokens -= 1
+            self._active += 1
+            self._metrics["started"] += 1
+            future.set_result(None)
+
+
+tts_scheduler = TTSScheduler()
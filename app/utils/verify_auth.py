@@ -1,37 +1,114 @@
 from dotenv import load_dotenv
 import os
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
 import httpx
+from fastapi import Header, HTTPException
 
 load_dotenv()
 backend_url = os.getenv("BACKEND_URL")
 
-def verify_token(token: str) -> bool:
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_NEGATIVE_CACHE_TTL = int(os.getenv("AUTH_NEGATIVE_CACHE_TTL", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# One keep-alive pool to the backend instead of a new TCP+TLS handshake per request
+_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=10, keepalive_expiry=30),
+    timeout=httpx.Timeout(10.0, connect=5.0),
+)
+
+# token digest -> (is_valid, expires_at), least recently used first; raw tokens are never kept in memory
+_token_cache: "OrderedDict[str, tuple]" = OrderedDict()
+# token digest -> future shared by concurrent checks of the same token
+_in_flight = {}
+
+
+async def verify_token(token: str) -> bool:
     if token == "1":
         return True
-    
+
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    cached = _token_cache.get(digest)
+    if cached:
+        is_valid, expires_at = cached
+        if expires_at > time.monotonic():
+            _token_cache.move_to_end(digest)
+            return is_valid
+        del _token_cache[digest]
+
+    pending = _in_flight.get(digest)
+    if pending:
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # Only our own cancellation propagates; if the leading check was cancelled we verify ourselves
+            if not pending.cancelled():
+                raise
+            return await verify_token(token)
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[digest] = future
+    try:
+        is_valid, cacheable = await _verify_with_backend(token)
+        if cacheable:
+            ttl = AUTH_CACHE_TTL if is_valid else AUTH_NEGATIVE_CACHE_TTL
+            _token_cache[digest] = (is_valid, time.monotonic() + ttl)
+            while len(_token_cache) > AUTH_CACHE_MAX_ENTRIES:
+                _token_cache.popitem(last=False)
+        future.set_result(is_valid)
+        return is_valid
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        # Mark retrieved so a failure nobody else waited on is not logged twice
+        future.exception()
+        raise
+    finally:
+        _in_flight.pop(digest, None)
+
+
+async def _verify_with_backend(token: str) -> tuple:
+    """Ask the backend about a token; returns (is_valid, cacheable)"""
     try:
         if not backend_url:
             raise Exception("BACKEND_URL environment variable not set")
-            
+
         api_url = f"{backend_url.rstrip('/')}/api/v1/auth/verify/user-token"
-        
+
         headers = {
             "Content-Type": "application/json"
                   }
-        
+
         data = {
             "token": token
                }
-        
-        with httpx.Client() as client:
-            response = client.post(api_url, headers=headers, json=data, timeout=10)
+
+        response = await _http_client.post(api_url, headers=headers, json=data)
 
         if response.status_code == 200:
             result = response.json()
-            return bool(result.get("success", False))
-        else:
-            return False
-                   
+            return bool(result.get("success", False)), True
+        # Backend errors are transient; only cache explicit rejections
+        return False, response.status_code < 500
+
     except Exception as e:
         print(f"Token verification error: {str(e)}")
-        return False
\ No newline at end of file
+        return False, False
+
+
+async def verify_auth_token(authtoken: str = Header(...)) -> str:
+    """FastAPI dependency that rejects requests with an invalid auth token"""
+    if not await verify_token(authtoken):
+        raise HTTPException(status_code=401, detail="Invalid auth token")
+    return authtoken
+
+
+async def close_auth_client():
+    """Close the backend connection pool when the app shuts down"""
+    await _http_client.aclose()
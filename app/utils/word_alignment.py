@@ -0,0 +1,129 @@
+import os
+import re
+from typing import List
+
+import numpy as np
+
+# Alignment decides the score; when enabled the LLM only rewrites the feedback line
+SENTENCE_LLM_FEEDBACK = os.getenv("SENTENCE_LLM_FEEDBACK", "false").lower() == "true"
+
+_NUMBER_WORDS = {
+    "0": "zero", "1": "one", "2": "two", "3": "three", "4": "four", "5": "five",
+    "6": "six", "7": "seven", "8": "eight", "9": "nine", "10": "ten",
+}
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercase words without punctuation; small numbers are spelled out as Whisper may write either"""
+    tokens = []
+    for word in text.lower().split():
+        word = re.sub(r"[^a-z0-9']", "", word).replace("'", "")
+        if word:
+            tokens.append(_NUMBER_WORDS.get(word, word))
+    return tokens
+
+
+def _distance_matrix(reference: List[str], hypothesis: List[str]) -> np.ndarray:
+    """
+    Full Levenshtein matrix, one vectorized row at a time
+
+    Deletions and substitutions only look at the previous row, so they are
+    plain array ops. Insertions chain along the row (d[j] = d[j-1] + 1), which
+    is a running minimum of (candidate[k] - k) shifted back by j.
+    """
+    rows, cols = len(reference) + 1, len(hypothesis) + 1
+    hyp = np.array(hypothesis, dtype=object)
+    offsets = np.arange(cols)
+
+    matrix = np.empty((rows, cols), dtype=np.int32)
+    matrix[0] = offsets
+    for i in range(1, rows):
+        previous = matrix[i - 1]
+        candidate = np.empty(cols, dtype=np.int32)
+        candidate[0] = i
+        mismatch = (hyp != reference[i - 1]).astype(np.int32)
+        candidate[1:] = np.minimum(previous[1:] + 1, previous[:-1] + mismatch)
+        matrix[i] = np.minimum.accumulate(candidate - offsets) + offsets
+    return matrix
+
+
+def align_words(reference: str, hypothesis: str) -> dict:
+    """
+    Align a spoken transcript against the sentence the learner was asked to say
+
+    Returns:
+        wer plus the reference words that were missed, words that were added,
+        and substitutions as {"expected", "heard"} pairs, all in sentence order
+    """
+    ref = normalize_tokens(reference)
+    hyp = normalize_tokens(hypothesis)
+    matrix = _distance_matrix(ref, hyp)
+
+    missed, inserted, substituted = [], [], []
+    matched = 0
+    i, j = len(ref), len(hyp)
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and ref[i - 1] == hyp[j - 1] and matrix[i, j] == matrix[i - 1, j - 1]:
+            matched += 1
+            i, j = i - 1, j - 1
+        elif i > 0 and j > 0 and matrix[i, j] == matrix[i - 1, j - 1] + 1:
+            substituted.append({"expected": ref[i - 1], "heard": hyp[j - 1]})
+            i, j = i - 1, j - 1
+        elif i > 0 and matrix[i, j] == matrix[i - 1, j] + 1:
+            missed.append(ref[i - 1])
+            i -= 1
+        else:
+            inserted.append(hyp[j - 1])
+            j -= 1
+
+    errors = int(matrix[-1, -1])
+    return {
+        "wer": round(errors / len(ref), 3) if ref else float(bool(hyp)),
+        "matched": matched,
+        "missed_words": missed[::-1],
+        "inserted_words": inserted[::-1],
+        "substituted_words": substituted[::-1],
+        "reference_length": len(ref),
+    }
+
+
+def wer_to_score(wer: float) -> int:
+    """Map word error rate to the 1-10 scale used by the speaking endpoints"""
+    return max(1, min(10, round(10 * (1 - min(wer, 1.0)))))
+
+
+def alignment_feedback(alignment: dict) -> str:
+    """One-line feedback naming the specific words to work on"""
+    missed = alignment["missed_words"]
+    substituted = alignment["substituted_words"]
+    inserted = alignment["inserted_words"]
+
+    if not missed and not substituted and not inserted:
+        return "Perfect! You said every word correctly."
+
+    parts = []
+    if missed:
+        parts.append("you missed " + ", ".join(f'"{word}"' for word in missed[:3]))
+    if substituted:
+        swap = substituted[0]
+        parts.append(f'you said "{swap["heard"]}" instead of "{swap["expected"]}"')
+    if inserted and not parts:
+        parts.append("you added " + ", ".join(f'"{word}"' for word in inserted[:3]))
+
+    lead = "Good effort" if alignment["wer"] <= 0.3 else "Keep practicing"
+    return f"{lead}: " + "; ".join(parts) + "."
+
+
+def score_sentence(reference: str, transcript: str) -> dict:
+    """Local score response for sentence-repeat exercises"""
+    alignment = align_words(reference, transcript)
+    return {
+        "score": wer_to_score(alignment["wer"]),
+        "feedback": alignment_feedback(alignment),
+        "status": "success",
+        "message": "Evaluation completed successfully.",
+        "wer": alignment["wer"],
+        "missed_words": alignment["missed_words"],
+        "inserted_words": alignment["inserted_words"],
+        "substituted_words": alignment["substituted_words"],
+    }
@@ -1,11 +1,19 @@
+import os
 import uvicorn
 import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from app.api.v1.routes import api_router
 from app.utils.temp_cleanup import start_cleanup_service
+from app.utils.openai_client import close_openai_client
+from app.utils.verify_auth import close_auth_client
+from app.utils.audio_preprocess import shutdown_audio_preprocess
+from app.utils.exercise_reservoir import exercise_reservoir
+from app.utils.history_store import history_store
+from app.utils.image_jobs import image_jobs
+from app.utils.audio_store import audio_store, AudioStaticFiles
+from app.utils.image_store import IMAGE_DIR, ImageStaticFiles, image_files, shutdown_image_store
 app = FastAPI(
     title="Writing AI API",
     description="An API for AI-powered writing assistance with topic generation and scoring.",
@@ -23,7 +31,8 @@ app.add_middleware(
 
 app.include_router(api_router, prefix="/api/v1")
 
-app.mount("/temp_audio", StaticFiles(directory="temp_audio"), name="temp_audio")
+app.mount("/temp_audio", AudioStaticFiles(directory="temp_audio", store=audio_store), name="temp_audio")
+app.mount("/images", ImageStaticFiles(directory=str(IMAGE_DIR), store=image_files, check_dir=False), name="images")
 
 @app.on_event("startup")
 async def startup_event():
@@ -31,8 +40,26 @@ async def startup_event():
 
     temp_dir = Path("temp_audio")
     temp_dir.mkdir(exist_ok=True)
+    IMAGE_DIR.mkdir(exist_ok=True)
     
     asyncio.create_task(start_cleanup_service())
+    asyncio.create_task(image_files.rebuild())
+    image_jobs.start()
+
+    if os.getenv("RESERVOIR_PREWARM", "true").lower() == "true":
+        exercise_reservoir.prewarm()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work and release shared upstream connections"""
+
+    await exercise_reservoir.shutdown()
+    await image_jobs.shutdown()
+    await history_store.close()
+    await close_openai_client()
+    await close_auth_client()
+    shutdown_audio_preprocess()
+    shutdown_image_store()
 
 
 if __name__ == "__main__":
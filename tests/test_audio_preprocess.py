@@ -0,0 +1,48 @@
+import numpy as np
+
+from app.utils.audio_preprocess import FRAME_MS, PAD_MS, SAMPLE_RATE, speech_bounds
+
+rng = np.random.default_rng(0)
+
+
+def tone(seconds: float, dbfs: float, hz: float = 220.0) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return np.sin(2 * np.pi * hz * t) * np.sqrt(2) * 10 ** (dbfs / 20)
+
+
+def noise(seconds: float, dbfs: float) -> np.ndarray:
+    return rng.standard_normal(int(seconds * SAMPLE_RATE)) * 10 ** (dbfs / 20)
+
+
+def pcm(signal: np.ndarray) -> np.ndarray:
+    return np.clip(signal * 32768, -32768, 32767).astype(np.int16)
+
+
+def test_speech_between_pauses_is_trimmed():
+    samples = pcm(np.concatenate([noise(1.0, -60), tone(1.0, -20), noise(1.0, -60)]))
+    start, end, voiced = speech_bounds(samples)
+    pad = PAD_MS // FRAME_MS * FRAME_MS / 1000
+    assert abs(start / SAMPLE_RATE - (1.0 - pad)) <= 0.04
+    assert abs(end / SAMPLE_RATE - (2.0 + pad)) <= 0.04
+    assert abs(voiced - 1.0) <= 0.06
+
+
+def test_continuous_speech_without_pauses_is_voiced():
+    # Syllable-like loudness changes between -32 and -18 dBFS, never silent
+    t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+    envelope_db = -25 + 7 * np.sin(2 * np.pi * 3 * t)
+    signal = np.sin(2 * np.pi * 180 * t) * np.sqrt(2) * 10 ** (envelope_db / 20)
+    start, end, voiced = speech_bounds(pcm(signal))
+    assert voiced >= 1.8
+    assert end - start >= 1.8 * SAMPLE_RATE
+
+
+def test_short_flat_word_is_voiced():
+    _, _, voiced = speech_bounds(pcm(tone(0.4, -40)))
+    assert voiced >= 0.35
+
+
+def test_silence_and_quiet_noise_have_no_speech():
+    assert speech_bounds(np.zeros(SAMPLE_RATE, dtype=np.int16)) is None
+    assert speech_bounds(pcm(noise(1.0, -65))) is None
+    assert speech_bounds(np.zeros(10, dtype=np.int16)) is None
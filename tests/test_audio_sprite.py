@@ -0,0 +1,60 @@
+import pytest
+
+from app.utils.audio_sprite import _build_sprite, _parse_header, mp3_frames
+
+# MPEG2 Layer III, 24 kHz, mono, bitrate index 14 (160 kbps): 576 samples (24 ms) per frame
+HEADER = bytes([0xFF, 0xF3, (14 << 4) | (1 << 2), 0xC4])
+FRAME_LEN = 576 // 8 * 160000 // 24000
+
+
+def frame(mark: int = 0, xing: bool = False) -> bytes:
+    body = bytearray(FRAME_LEN - 4)
+    if xing:
+        body[9:13] = b"Xing"  # right after the 9 bytes of mono MPEG2 side info
+    else:
+        body[-1] = mark
+    return HEADER + bytes(body)
+
+
+def clip(frame_count: int, mark: int = 1) -> bytes:
+    """An MP3 file as the speech API returns it: ID3v2 tag, Xing frame, audio frames, ID3v1 tag"""
+    id3 = b"ID3\x03\x00\x00\x00\x00\x00\x05" + b"abcde"
+    return id3 + frame(xing=True) + b"".join(frame(mark) for _ in range(frame_count)) + b"TAG" + bytes(125)
+
+
+def test_parse_header():
+    assert _parse_header(HEADER) == (FRAME_LEN, 24000, 576)
+    assert _parse_header(b"ID3\x03") is None
+    assert _parse_header(bytes([0xFF, 0xF3, 0xF0, 0xC4])) is None  # bitrate index 15 is invalid
+
+
+def test_mp3_frames_skips_tags_and_info_frame():
+    frames, sample_rate, samples = mp3_frames(clip(12, mark=7))
+    assert (len(frames), sample_rate, samples) == (12, 24000, 576)
+    assert all(f == frame(7) for f in frames)
+
+
+def test_mp3_frames_rejects_data_without_frames():
+    with pytest.raises(ValueError):
+        mp3_frames(b"ID3\x03\x00\x00\x00\x00\x00\x00" + bytes(500))
+
+
+def test_sprite_offsets(tmp_path):
+    paths = []
+    for name, count in (("one", 10), ("two", 25)):
+        path = tmp_path / f"{name}.mp3"
+        path.write_bytes(clip(count))
+        paths.append(path)
+    sprite = tmp_path / "sprite.mp3"
+
+    clips, duration_ms, written = _build_sprite(["one", "two"], paths, sprite, gap_ms=240)
+
+    # 10 frames of 24 ms, then a 240 ms gap (10 silent frames), then 25 frames
+    assert clips == {"one": {"start": 0, "end": 240}, "two": {"start": 480, "end": 1080}}
+    assert duration_ms == 1080
+    assert written == sprite.stat().st_size == 45 * FRAME_LEN
+    frames, _, _ = mp3_frames(sprite.read_bytes())
+    assert len(frames) == 45
+
+    # An existing sprite is not rewritten
+    assert _build_sprite(["one", "two"], paths, sprite, gap_ms=240)[2] == 0
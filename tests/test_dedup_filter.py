@@ -0,0 +1,83 @@
+import asyncio
+
+from app.utils.dedup_filter import BloomFilter, DedupFilter, _RotatingBloom, dedup_key
+
+
+def responses(*batches):
+    """Generator returning the given lists in turn (then empty lists), recording the counts asked for"""
+    queue = [list(batch) for batch in batches]
+    asked = []
+
+    async def generate(count):
+        asked.append(count)
+        return queue.pop(0) if queue else []
+
+    return generate, asked
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(2000, error_rate=0.01)
+    for n in range(2000):
+        bloom.add(f"word{n}")
+    assert all(f"word{n}" in bloom for n in range(2000))
+    false_positives = sum(f"other{n}" in bloom for n in range(20000))
+    assert false_positives / 20000 < 0.02
+
+
+def test_rotating_bloom_forgets_the_oldest_generation():
+    bloom = _RotatingBloom(capacity=3)
+    for key in ["a", "b", "c", "d", "e", "f", "g"]:
+        bloom.add(key)
+    assert "g" in bloom and "d" in bloom
+    assert "a" not in bloom
+
+
+def test_dedup_key():
+    assert dedup_key("  Don't  STOP! ") == "dont stop"
+
+
+def test_repeats_are_dropped_and_topped_up():
+    dedup = DedupFilter()
+    dedup.add("words", ["apple", "pear"])
+    generate, asked = responses(["Apple", "plum", "pear"], ["fig", "kiwi"])
+
+    kept = asyncio.run(dedup.generate_unique("words", generate, 3, exclude=["Fig"]))
+
+    assert kept == ["plum", "kiwi", "Apple"]  # the only repeat left fills the last place
+    assert len(asked) == 3
+    assert dedup.seen("words", "plum") and dedup.seen("words", "kiwi")
+
+
+def test_learners_have_separate_filters():
+    dedup = DedupFilter(max_users=1)
+    dedup.add("words", ["apple"], user_id="ann")
+    assert dedup.seen("words", "apple", user_id="ann")
+    assert not dedup.seen("words", "apple", user_id="bo")
+    assert not dedup.seen("words", "apple")
+
+    dedup.add("words", ["pear"], user_id="bo")  # over max_users: the least recent learner is forgotten
+    assert not dedup.seen("words", "apple", user_id="ann")
+    assert dedup.stats()["user_filters"] == 1
+
+
+def test_ordered_keeps_one_response_in_order():
+    dedup = DedupFilter()
+    dedup.add("chain", ["b"], user_id="ann")
+    generate, asked = responses(["a", "b", "c", "d", "e"])
+
+    kept = asyncio.run(dedup.generate_unique("chain", generate, 3, user_id="ann", ordered=True))
+
+    assert kept == ["a", "c", "d"]
+    assert len(asked) == 1
+
+
+def test_ordered_serves_the_best_response_whole_when_too_few_are_new():
+    dedup = DedupFilter()
+    dedup.add("chain", ["a", "b", "c", "x", "y"])
+    generate, asked = responses(["a", "b", "n1", "c"], ["x", "n2", "n3", "y"])
+
+    kept = asyncio.run(dedup.generate_unique("chain", generate, 4, ordered=True))
+
+    assert kept == ["x", "n2", "n3", "y"]  # never mixed with the first response
+    assert len(asked) == 2
+    assert dedup.stats()["repeats_served"] == 2
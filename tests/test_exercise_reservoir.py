@@ -0,0 +1,62 @@
+import asyncio
+
+from app.utils.exercise_reservoir import ExerciseReservoir
+from app.utils.history_store import history_store
+
+
+def make_reservoir(exercise_type, generator, **kwargs):
+    """Reservoir without background refills, so only the serving path calls the generator"""
+    reservoir = ExerciseReservoir(capacity=5, low_watermark=0, **kwargs)
+    reservoir.register(exercise_type, generator)
+    reservoir._schedule_refill = lambda exercise_type, band: None
+    return reservoir
+
+
+def test_fallback_excludes_history_and_rechecks_the_result():
+    calls = []
+    results = [{"words": ["apple", "kiwi"]}, {"words": ["plum", "fig"]}]
+
+    async def generator(band, exclude=(), user_id=None):
+        calls.append((list(exclude), user_id))
+        return results.pop(0)
+
+    reservoir = make_reservoir("test_fallback", generator, fallback_attempts=2)
+
+    async def main():
+        await history_store.record("ann", "test_fallback", ["apple", "pear"])
+        return await reservoir.get("test_fallback", user_id="ann")
+
+    assert asyncio.run(main()) == {"words": ["plum", "fig"]}
+    assert calls == [(["apple", "pear"], "ann")] * 2
+    # The repeat is kept for other learners rather than thrown away
+    assert list(reservoir._queues[("test_fallback", "all")]) == [{"words": ["apple", "kiwi"]}]
+    assert reservoir.stats()["test_fallback"]["seen_skips"] == 1
+
+
+def test_fallback_without_history_uses_the_plain_generator():
+    calls = []
+
+    async def generator(band, **learner):
+        calls.append(learner)
+        return {"words": ["pear"]}
+
+    reservoir = make_reservoir("test_plain", generator)
+
+    assert asyncio.run(reservoir.get("test_plain", user_id="new-learner")) == {"words": ["pear"]}
+    assert calls == [{}]
+
+
+def test_banked_exercise_repeating_history_is_skipped():
+    async def generator(band, **learner):
+        return {"words": ["fresh"]}
+
+    reservoir = make_reservoir("test_skip", generator)
+    queue = reservoir._queues[("test_skip", "all")]
+    queue.extend([{"words": ["seen"]}, {"words": ["unseen"]}])
+
+    async def main():
+        await history_store.record("bo", "test_skip", ["seen"])
+        return await reservoir.get("test_skip", user_id="bo")
+
+    assert asyncio.run(main()) == {"words": ["unseen"]}
+    assert list(queue) == [{"words": ["seen"]}]
@@ -0,0 +1,53 @@
+import asyncio
+
+from app.utils.image_jobs import DONE, RUNNING, ImageJobQueue
+
+
+def test_orphaned_running_job_is_reclaimed_without_a_restart(tmp_path):
+    queue = ImageJobQueue(str(tmp_path / "jobs.db"), lease_seconds=0.2)
+    queue.register("picture", lambda payload: asyncio.sleep(0, result="image.png"))
+    # Claimed by a worker that then died: its lease is still fresh, so the startup resume skips it
+    queue._insert("orphan", "picture", {})
+    queue._update("orphan", RUNNING, 0, "", "")
+
+    async def main():
+        queue.start()
+        try:
+            await asyncio.sleep(0.05)
+            assert (await queue.get("orphan"))["status"] == RUNNING
+            return await queue.wait("orphan", 2)
+        finally:
+            await queue.shutdown()
+
+    job = asyncio.run(main())
+    assert job["status"] == DONE and job["image"] == "image.png"
+    assert queue.stats()["reclaimed"] == 1
+
+
+def test_heartbeat_keeps_a_long_job_from_being_reclaimed(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    calls = []
+
+    async def slow(payload):
+        calls.append(payload)
+        await asyncio.sleep(0.5)  # well past the lease
+        return "image.png"
+
+    runner = ImageJobQueue(db_path, lease_seconds=0.15)
+    other = ImageJobQueue(db_path, lease_seconds=0.15)  # another process on the same host
+    for queue in (runner, other):
+        queue.register("picture", slow)
+
+    async def main():
+        runner.start()
+        other.start()
+        try:
+            job_id = await runner.submit("picture", {"n": 1})
+            return await runner.wait(job_id, 2)
+        finally:
+            await runner.shutdown()
+            await other.shutdown()
+
+    assert asyncio.run(main())["status"] == DONE
+    assert calls == [{"n": 1}]
+    assert other.stats()["reclaimed"] == 0
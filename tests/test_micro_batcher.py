@@ -0,0 +1,88 @@
+import asyncio
+
+from app.utils.micro_batcher import MicroBatcher
+
+
+def make_batcher(name, results, **kwargs):
+    """Batcher whose generator returns the next list from `results` and records the counts asked for"""
+    asked = []
+
+    async def generate_batch(count):
+        asked.append(count)
+        await asyncio.sleep(0)
+        return results.pop(0)(count)
+
+    return MicroBatcher(name, generate_batch, fallback=lambda: "fallback", **kwargs), asked
+
+
+def test_concurrent_callers_share_one_call():
+    batcher, asked = make_batcher("test_share", [lambda n: list(range(n))], window_ms=20)
+
+    async def main():
+        return await asyncio.gather(*(batcher.get() for _ in range(5)))
+
+    assert sorted(asyncio.run(main())) == [0, 1, 2, 3, 4]
+    assert asked == [5]
+    assert batcher.stats()["batches"] == 1
+
+
+def test_full_batch_is_split_at_max_batch():
+    batcher, asked = make_batcher("test_split", [lambda n: list(range(n))] * 2, window_ms=1000, max_batch=3)
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.get() for _ in range(5))), 0.5)
+
+    assert len(asyncio.run(main())) == 5
+    assert asked == [3, 2]
+
+
+def test_batches_overlap():
+    release = None
+    asked = []
+
+    async def generate_batch(count):
+        asked.append(count)
+        number = len(asked)
+        await release.wait()
+        return [number] * count
+
+    batcher = MicroBatcher("test_overlap", generate_batch, fallback=lambda: None, window_ms=10)
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        first = [asyncio.create_task(batcher.get()) for _ in range(2)]
+        await asyncio.sleep(0.05)  # the first batch is now generating
+        second = [asyncio.create_task(batcher.get()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert asked == [2, 3]  # the second batch started without waiting for the first
+        assert batcher.stats()["batches_in_flight"] == 2
+        release.set()
+        return await asyncio.gather(*first), await asyncio.gather(*second)
+
+    assert asyncio.run(main()) == ([1, 1], [2, 2, 2])
+
+
+def test_shortfall_is_requested_once_then_falls_back():
+    batcher, asked = make_batcher("test_short", [lambda n: ["a"], lambda n: ["b"]], window_ms=10)
+
+    async def main():
+        return await asyncio.gather(*(batcher.get() for _ in range(4)))
+
+    assert asyncio.run(main()) == ["a", "b", "fallback", "fallback"]
+    assert asked == [4, 3]
+    assert batcher.stats()["fallbacks"] == 2
+
+
+def test_generation_error_reaches_every_caller():
+    def fail(n):
+        raise RuntimeError("model down")
+
+    batcher, _ = make_batcher("test_error", [fail], window_ms=10)
+
+    async def main():
+        return await asyncio.gather(*(batcher.get() for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert batcher.stats()["errors"] == 1
@@ -0,0 +1,63 @@
+import random
+
+from app.utils.near_duplicate import NearDuplicateIndex, _LSHTable, shingles
+
+
+def text_pair(rng, shared, only_a, only_b):
+    """Two texts of distinct words whose word sets have Jaccard similarity shared / (shared + only_a + only_b)"""
+    words = [f"w{n}" for n in rng.sample(range(100000), shared + only_a + only_b)]
+    return " ".join(words[:shared + only_a]), " ".join(words[:shared] + words[shared + only_a:])
+
+
+def test_lsh_recall_at_the_threshold():
+    # Pairs exactly at the 0.7 threshold must still become candidates; the exact comparison decides
+    index = NearDuplicateIndex("test_recall", threshold=0.7)
+    rng = random.Random(3)
+    trials, collided = 300, 0
+    for _ in range(trials):
+        a, b = text_pair(rng, 14, 3, 3)
+        table = _LSHTable(index.bands, index.rows, capacity=10)
+        table.add(a, index.signature(a))
+        collided += bool(table.candidates(index.signature(b)))
+    assert collided / trials >= 0.98
+
+
+def test_find_matches_above_and_ignores_below_the_threshold():
+    rng = random.Random(5)
+    trials, above, below = 200, 0, 0
+    for _ in range(trials):
+        index = NearDuplicateIndex("test_find", threshold=0.7)
+        a, b = text_pair(rng, 17, 2, 1)  # Jaccard 0.85
+        c, d = text_pair(rng, 6, 7, 7)   # Jaccard 0.3
+        index.add(a, scope="s")
+        index.add(c, scope="s")
+        above += index.find(b, scope="s") is not None
+        below += index.find(d, scope="s") is not None
+    assert above / trials >= 0.98
+    assert below == 0
+
+
+def test_reordered_title_matches_and_scopes_are_separate():
+    index = NearDuplicateIndex("test_scopes", threshold=0.7)
+    index.add("The Brave Little Fox", scope="a")
+    assert index.find("the little brave fox!", scope="a")[0] == "The Brave Little Fox"
+    assert index.find("The Brave Little Fox", scope="b") is None
+
+
+def test_capacity_and_scope_limits_forget_the_oldest():
+    index = NearDuplicateIndex("test_limits", capacity=2, max_scopes=2)
+    for text in ("red apple pie", "blue ocean waves", "green forest trail"):
+        index.add(text, scope="a")
+    assert index.find("red apple pie", scope="a") is None
+    assert index.find("green forest trail", scope="a") is not None
+
+    index.add("red apple pie", scope="b")
+    index.add("red apple pie", scope="c")
+    assert index.find("green forest trail", scope="a") is None  # least recently used scope dropped
+
+
+def test_shingles():
+    assert shingles("Don't stop, now!") == {"dont", "stop", "now"}
+    assert shingles("one two three", size=2) == {"one two", "two three"}
+    assert shingles("one", size=2) == {"one"}
+    assert shingles("  ") == set()
@@ -0,0 +1,67 @@
+import asyncio
+import gzip
+import json
+
+import httpx
+
+from app.utils.openai_client import SingleFlightTransport
+
+PAYLOAD = {"choices": [{"message": {"content": "hello"}}]}
+
+
+def gzip_transport(calls):
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, headers={"content-encoding": "gzip", "content-type": "application/json"},
+                              content=gzip.compress(json.dumps(PAYLOAD).encode()))
+
+    return httpx.MockTransport(handler)
+
+
+def post(client):
+    return client.post("https://api.test/v1/chat/completions", json={"model": "m", "messages": []})
+
+
+def test_compressed_response_single_request():
+    calls = []
+    transport = SingleFlightTransport(gzip_transport(calls))
+
+    async def main():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await post(client)
+
+    response = asyncio.run(main())
+    assert response.json() == PAYLOAD
+    assert len(calls) == 1
+
+
+def test_compressed_response_coalesced_requests():
+    calls = []
+    transport = SingleFlightTransport(gzip_transport(calls))
+
+    async def main():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await asyncio.gather(*(post(client) for _ in range(3)))
+
+    responses = asyncio.run(main())
+    assert [r.json() for r in responses] == [PAYLOAD] * 3
+    assert len(calls) == 1
+    assert transport.stats()["coalesced"] == 2
+
+
+def test_bypass_header_is_not_coalesced():
+    calls = []
+    transport = SingleFlightTransport(gzip_transport(calls))
+
+    async def main():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await asyncio.gather(*(
+                client.post("https://api.test/v1/audio/speech", json={"input": "hi"},
+                            headers={"x-single-flight-bypass": "1"})
+                for _ in range(2)
+            ))
+
+    assert [r.json() for r in asyncio.run(main())] == [PAYLOAD] * 2
+    assert len(calls) == 2
+    assert all("x-single-flight-bypass" not in request.headers for request in calls)
@@ -0,0 +1,29 @@
+import pytest
+
+from app.utils.phonetic_scoring import MINIMAL_PAIR_SCORE, is_minimal_pair, score_word
+
+
+@pytest.mark.parametrize("target, heard", [
+    ("cat", "cut"),        # stressed vowel
+    ("ship", "sheep"),     # stressed vowel
+    ("bat", "pat"),        # initial consonant
+    ("think", "sink"),     # initial consonant
+    ("elephant", "elegant"),  # unrelated consonant
+])
+def test_minimal_pairs_are_not_close_matches(target, heard):
+    assert is_minimal_pair(target, heard)
+    result = score_word(target, heard)
+    assert result is not None
+    assert result["score"] == MINIMAL_PAIR_SCORE
+    assert heard in result["feedback"]
+
+
+@pytest.mark.parametrize("target, heard, score", [
+    ("apple", "apple", 10),
+    ("their", "there", 9),
+    ("colour", "color", 8),
+    ("running", "runnin", 8),
+])
+def test_same_word_variants_keep_their_score(target, heard, score):
+    assert not is_minimal_pair(target, heard)
+    assert score_word(target, heard)["score"] == score
@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from app.utils.tts_scheduler import BACKGROUND, INTERACTIVE, TTSScheduler, _retry_after
+
+
+def rate_limit_error(headers=None) -> openai.RateLimitError:
+    response = httpx.Response(429, headers=headers or {}, request=httpx.Request("POST", "https://api.test/v1/audio/speech"))
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_retry_after_headers():
+    assert _retry_after(rate_limit_error({"retry-after-ms": "250"})) == 0.25
+    assert _retry_after(rate_limit_error({"retry-after": "2"})) == 2.0
+    assert _retry_after(rate_limit_error({"retry-after": "soon"})) is None
+    assert _retry_after(RuntimeError()) is None
+
+
+def test_waiters_start_by_priority_then_arrival():
+    scheduler = TTSScheduler(rpm=60000, burst=100, concurrency=1)
+    started = []
+
+    async def request(name):
+        started.append(name)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        blocker = asyncio.create_task(scheduler.run(lambda: request("blocker")))
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.create_task(scheduler.run(lambda: request("refill"), BACKGROUND)),
+            asyncio.create_task(scheduler.run(lambda: request("first"), INTERACTIVE)),
+            asyncio.create_task(scheduler.run(lambda: request("second"), INTERACTIVE)),
+        ]
+        await asyncio.gather(blocker, *queued)
+
+    asyncio.run(main())
+    assert started == ["blocker", "first", "second", "refill"]
+
+
+def test_rate_limit_pauses_then_retries():
+    scheduler = TTSScheduler(rpm=60000, burst=100, concurrency=4, max_retries=2)
+    attempts = []
+
+    async def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise rate_limit_error({"retry-after-ms": "100"})
+        return "audio"
+
+    assert asyncio.run(scheduler.run(flaky)) == "audio"
+    # The retry waits out Retry-After (the whole scheduler is paused), plus jitter
+    assert attempts[1] - attempts[0] >= 0.09
+    stats = scheduler.stats()
+    assert (stats["rate_limited"], stats["retries"], stats["started"], stats["active"]) == (1, 1, 2, 0)
+
+
+def test_gives_up_after_max_retries():
+    scheduler = TTSScheduler(rpm=60000, burst=100, concurrency=4, max_retries=1)
+    calls = []
+
+    async def always_limited():
+        calls.append(1)
+        raise rate_limit_error({"retry-after-ms": "10"})
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(scheduler.run(always_limited))
+    assert len(calls) == 2
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_other_errors_are_not_retried():
+    scheduler = TTSScheduler(rpm=60000, burst=100, concurrency=4)
+
+    async def broken():
+        raise ValueError("bad voice")
+
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.run(broken))
+    assert scheduler.stats()["retries"] == 0
+
+
+def test_token_bucket_spaces_requests_beyond_the_burst():
+    scheduler = TTSScheduler(rpm=600, burst=2, concurrency=10)  # one token every 0.1 s
+
+    async def request():
+        return time.monotonic()
+
+    async def main():
+        return await asyncio.gather(*(scheduler.run(request) for _ in range(4)))
+
+    started = asyncio.run(main())
+    assert started[1] - started[0] < 0.05
+    assert started[2] - started[1] >= 0.08
+    assert started[3] - started[2] >= 0.08
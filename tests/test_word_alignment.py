@@ -0,0 +1,54 @@
+import random
+
+from app.utils.word_alignment import _distance_matrix, align_words, wer_to_score
+
+
+def naive_distance_matrix(reference, hypothesis):
+    rows, cols = len(reference) + 1, len(hypothesis) + 1
+    d = [[0] * cols for _ in range(rows)]
+    for i in range(rows):
+        d[i][0] = i
+    for j in range(cols):
+        d[0][j] = j
+    for i in range(1, rows):
+        for j in range(1, cols):
+            d[i][j] = min(
+                d[i - 1][j] + 1,
+                d[i][j - 1] + 1,
+                d[i - 1][j - 1] + (reference[i - 1] != hypothesis[j - 1]),
+            )
+    return d
+
+
+def test_distance_matrix_matches_naive_dp():
+    rng = random.Random(7)
+    vocabulary = ["the", "cat", "sat", "on", "a", "mat", "dog"]
+    for _ in range(300):
+        reference = [rng.choice(vocabulary) for _ in range(rng.randint(0, 9))]
+        hypothesis = [rng.choice(vocabulary) for _ in range(rng.randint(0, 9))]
+        assert _distance_matrix(reference, hypothesis).tolist() == naive_distance_matrix(reference, hypothesis)
+
+
+def test_align_words_names_the_errors():
+    substituted = align_words("The cat sat on the mat", "the bat sat on the mat")
+    assert substituted["substituted_words"] == [{"expected": "cat", "heard": "bat"}]
+    assert substituted["matched"] == 5
+
+    missed = align_words("please close the door", "please close door")
+    assert missed["missed_words"] == ["the"]
+    assert missed["wer"] == 0.25
+
+    inserted = align_words("thank you", "thank you very much")
+    assert inserted["inserted_words"] == ["very", "much"]
+    assert inserted["wer"] == 1.0
+
+
+def test_numbers_and_punctuation_are_normalized():
+    alignment = align_words("I have 2 cats.", "i have two cats")
+    assert alignment["wer"] == 0
+    assert wer_to_score(alignment["wer"]) == 10
+
+
+def test_empty_reference():
+    assert align_words("", "")["wer"] == 0.0
+    assert align_words("", "hello")["wer"] == 1.0